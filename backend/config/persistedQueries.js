@@ -0,0 +1,84 @@
+const fs = require('fs');
+const path = require('path');
+
+// Persisted documents registered by the LLM service (document id = SHA-256 of
+// the document text). Used as Apollo's automatic persisted query cache, so a
+// client can send just { extensions: { persistedQuery: { sha256Hash } }, variables }.
+// Apollo keeps the parsed and validated document per hash, so repeated
+// operations also skip parse and validate.
+const DEFAULT_REGISTRY_PATH = path.join(__dirname, '..', '..', 'llm_service', 'persisted_queries.json');
+
+// Apollo prefixes the keys it passes to the cache
+const APQ_PREFIX = 'apq:';
+
+// Documents registered by clients (sent in full with their hash) are kept in a
+// bounded LRU of this size, so callers cannot grow the cache without limit
+const MAX_CLIENT_DOCUMENTS = parseInt(process.env.APQ_CACHE_SIZE || '1000', 10);
+
+const createPersistedQueryCache = (registryPath = process.env.PERSISTED_QUERIES_PATH || DEFAULT_REGISTRY_PATH) => {
+  // From the registry file; only ever grows with the LLM service's operation shapes
+  const documents = new Map();
+  // From clients, least recently used first
+  const clientDocuments = new Map();
+  let loadedMtime = 0;
+
+  // (Re)load the registry when the file changed; documents are only ever added
+  const load = () => {
+    let stat;
+    try {
+      stat = fs.statSync(registryPath);
+    } catch (error) {
+      return;
+    }
+    if (stat.mtimeMs === loadedMtime) {
+      return;
+    }
+    try {
+      const registry = JSON.parse(fs.readFileSync(registryPath, 'utf8'));
+      Object.entries(registry).forEach(([hash, document]) => documents.set(hash, document));
+      loadedMtime = stat.mtimeMs;
+    } catch (error) {
+      console.error('Persisted query registry could not be read:', error.message);
+    }
+  };
+
+  load();
+  if (documents.size > 0) {
+    console.log(`Loaded ${documents.size} persisted queries from ${registryPath}`);
+  }
+
+  const hashOf = (key) => (key.startsWith(APQ_PREFIX) ? key.slice(APQ_PREFIX.length) : key);
+
+  return {
+    async get(key) {
+      const hash = hashOf(key);
+      if (clientDocuments.has(hash)) {
+        const document = clientDocuments.get(hash);
+        clientDocuments.delete(hash);
+        clientDocuments.set(hash, document);
+        return document;
+      }
+      if (!documents.has(hash)) {
+        load();
+      }
+      return documents.get(hash);
+    },
+    // Documents sent in full by other clients (regular APQ registration)
+    async set(key, value) {
+      const hash = hashOf(key);
+      if (documents.has(hash)) {
+        return;
+      }
+      clientDocuments.delete(hash);
+      clientDocuments.set(hash, value);
+      if (clientDocuments.size > MAX_CLIENT_DOCUMENTS) {
+        clientDocuments.delete(clientDocuments.keys().next().value);
+      }
+    },
+    async delete(key) {
+      return clientDocuments.delete(hashOf(key));
+    },
+  };
+};
+
+module.exports = { createPersistedQueryCache };
@@ -70,8 +70,13 @@ alumniSchema.pre('save', async function(next) {
 
 alumniSchema.index({ Email: 1 });
 alumniSchema.index({ Alumni_id: 1 });
-alumniSchema.index({ Employer: 1 });
-alumniSchema.index({ Graduation_year: 1 });
+// Equality filters of getAlumniByEmployer and searchAlumni; _id second so
+// search pages (sorted by _id) are read in index order without a sort
+alumniSchema.index({ Employer: 1, _id: 1 });
+alumniSchema.index({ Graduation_year: 1, _id: 1 });
+alumniSchema.index({ Field_of_study: 1, _id: 1 });
+alumniSchema.index({ 'Employer_location.City': 1, _id: 1 });
+alumniSchema.index({ 'Employer_location.State': 1, _id: 1 });
 
 module.exports = mongoose.model('Alumni', alumniSchema);
 
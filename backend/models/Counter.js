@@ -7,14 +7,56 @@ const counterSchema = new mongoose.Schema({
 
 const Counter = mongoose.model('Counter', counterSchema);
 
-const getNextSequence = async (name) => {
+// IDs handed out per counter round-trip. With 1, every document does its own
+// $inc; larger blocks make bulk creation cost one round-trip per block, at the
+// price of gaps when a process exits with part of a block unused.
+const ID_BLOCK_SIZE = Math.max(1, parseInt(process.env.ID_BLOCK_SIZE) || 1);
+
+// Reserve n consecutive sequence numbers with one atomic update; returns the first
+const reserveSequenceBlock = async (name, n) => {
   const counter = await Counter.findByIdAndUpdate(
     name,
-    { $inc: { seq: 1 } },
+    { $inc: { seq: n } },
     { new: true, upsert: true }
   );
-  return counter.seq;
+  return counter.seq - n + 1;
+};
+
+// Hands out IDs from a reserved block, reserving the next block when it runs out.
+// Concurrent callers share a single pending reservation.
+const createBlockAllocator = (name, blockSize) => {
+  let next = 0;
+  let end = 0;
+  let pending = null;
+
+  return async () => {
+    while (next >= end) {
+      if (!pending) {
+        pending = reserveSequenceBlock(name, blockSize)
+          .then((first) => {
+            next = first;
+            end = first + blockSize;
+          })
+          .finally(() => {
+            pending = null;
+          });
+      }
+      await pending;
+    }
+    return next++;
+  };
 };
 
-module.exports = { Counter, getNextSequence };
+const allocators = {};
+
+const getNextSequence = async (name) => {
+  if (ID_BLOCK_SIZE === 1) {
+    return reserveSequenceBlock(name, 1);
+  }
+  if (!allocators[name]) {
+    allocators[name] = createBlockAllocator(name, ID_BLOCK_SIZE);
+  }
+  return allocators[name]();
+};
 
+module.exports = { Counter, getNextSequence, reserveSequenceBlock, createBlockAllocator };
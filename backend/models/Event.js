@@ -42,8 +42,9 @@ eventSchema.pre('save', async function(next) {
 });
 
 eventSchema.index({ Event_id: 1 });
-eventSchema.index({ Date: 1 });
-eventSchema.index({ Organizer_id: 1 });
+// Also serves getEventsByDate; searchEvents pages in (Date, _id) order
+eventSchema.index({ Date: 1, _id: 1 });
+eventSchema.index({ Organizer_id: 1, Date: 1, _id: 1 });
 
 module.exports = mongoose.model('Event', eventSchema);
 
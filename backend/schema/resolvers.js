@@ -5,6 +5,142 @@ const Photo = require('../models/Photo');
 const Admin = require('../models/Admin');
 const bcrypt = require('bcryptjs');
 const jwt = require('jsonwebtoken');
+const mongoose = require('mongoose');
+const { UserInputError } = require('apollo-server-express');
+
+// Search pagination: keyset on the sort fields (ending in _id), so a page costs
+// the same however deep it is. The cursor holds the last item's sort values.
+const DEFAULT_PAGE_SIZE = 20;
+const MAX_PAGE_SIZE = 100;
+
+// Name/Location match any part of the text, case-insensitively. No index can
+// bound such a regex; the scan walks the sort index and stops after one page
+// of matches (listed as known scans in scripts/indexes.py).
+const escapeRegex = (value) => value.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+const containsIgnoringCase = (value) => new RegExp(escapeRegex(value), 'i');
+
+const parseObjectId = (value) => {
+  if (typeof value !== 'string' || !mongoose.Types.ObjectId.isValid(value)) return null;
+  return new mongoose.Types.ObjectId(value);
+};
+const parseDate = (value) => {
+  const date = new Date(value);
+  return typeof value === 'string' && !Number.isNaN(date.getTime()) ? date : null;
+};
+
+// Alumni page in _id order; events in date order, on the { Date, _id } index
+const ALUMNI_SORT = [{ field: '_id', parse: parseObjectId }];
+const EVENT_SORT = [{ field: 'Date', parse: parseDate }, { field: '_id', parse: parseObjectId }];
+
+const encodeCursor = (doc, sort) => Buffer.from(JSON.stringify(sort.map(({ field }) => doc[field]))).toString('base64url');
+const decodeCursor = (cursor, sort) => {
+  let values;
+  try {
+    values = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+  } catch (error) {
+    values = null;
+  }
+  const parsed = Array.isArray(values) && values.length === sort.length
+    ? sort.map(({ parse }, index) => parse(values[index]))
+    : [null];
+  if (parsed.includes(null)) {
+    throw new UserInputError('Invalid cursor');
+  }
+  return parsed;
+};
+
+// Documents after the cursor in sort order: (a > x) or (a = x and b > y) ...
+const afterCursor = (sort, values) => {
+  const clauses = sort.map(({ field }, index) => {
+    const clause = { [field]: { $gt: values[index] } };
+    sort.slice(0, index).forEach((key, previous) => { clause[key.field] = values[previous]; });
+    return clause;
+  });
+  if (clauses.length === 1) return clauses[0];
+  // The leading bound keeps the index scan from starting at the beginning
+  return { [sort[0].field]: { $gte: values[0] }, $or: clauses };
+};
+
+// Top-level fields selected under "items", so only those are read from MongoDB
+const selectedItemFields = (info) => {
+  const items = info.fieldNodes[0].selectionSet.selections
+    .find((selection) => selection.kind === 'Field' && selection.name.value === 'items');
+  if (!items || !items.selectionSet) return null;
+  const fields = [];
+  for (const selection of items.selectionSet.selections) {
+    // Fragments are not expanded here; read whole documents instead
+    if (selection.kind !== 'Field') return null;
+    if (!selection.name.value.startsWith('__')) fields.push(selection.name.value);
+  }
+  return fields.join(' ');
+};
+
+const searchPage = async (Model, query, sort, { limit, cursor }, info) => {
+  const size = Math.min(Math.max(limit || DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE);
+  if (cursor) {
+    query = { $and: [query, afterCursor(sort, decodeCursor(cursor, sort))] };
+  }
+  const order = Object.fromEntries(sort.map(({ field }) => [field, 1]));
+  let find = Model.find(query).sort(order).limit(size + 1);
+  const fields = selectedItemFields(info);
+  if (fields) {
+    // The sort fields are read too, for the cursor
+    find = find.select([fields, ...sort.map(({ field }) => field)].join(' '));
+  }
+  const docs = await find;
+  const hasMore = docs.length > size;
+  const items = hasMore ? docs.slice(0, size) : docs;
+  return {
+    items,
+    hasMore,
+    nextCursor: hasMore ? encodeCursor(items[items.length - 1], sort) : null,
+  };
+};
+
+const alumniQuery = (filter = {}) => {
+  const query = {};
+  if (filter.Name) query.Name = containsIgnoringCase(filter.Name);
+  // An exact year and a range both apply (no match when they disagree)
+  if (filter.Graduation_year || filter.Graduation_year_from || filter.Graduation_year_to) {
+    query.Graduation_year = {
+      ...(filter.Graduation_year ? { $eq: filter.Graduation_year } : {}),
+      ...(filter.Graduation_year_from ? { $gte: filter.Graduation_year_from } : {}),
+      ...(filter.Graduation_year_to ? { $lte: filter.Graduation_year_to } : {}),
+    };
+  }
+  if (filter.Field_of_study) query.Field_of_study = filter.Field_of_study;
+  if (filter.Employer) query.Employer = filter.Employer;
+  if (filter.Employment_title) query.Employment_title = filter.Employment_title;
+  if (filter.Employment_status) query.Employment_status = filter.Employment_status;
+  if (filter.City) query['Employer_location.City'] = filter.City;
+  if (filter.State) query['Employer_location.State'] = filter.State;
+  return query;
+};
+
+// A filter date, or a clear error instead of an Invalid Date in the query
+const filterDate = (filter, field) => {
+  const date = parseDate(filter[field]);
+  if (!date) {
+    throw new UserInputError(`${field} must be a date (YYYY-MM-DD)`, { argumentName: field });
+  }
+  return date;
+};
+
+const eventQuery = (filter = {}) => {
+  const query = {};
+  if (filter.Name) query.Name = containsIgnoringCase(filter.Name);
+  if (filter.Location) query.Location = containsIgnoringCase(filter.Location);
+  if (filter.Organizer_id) query.Organizer_id = filter.Organizer_id;
+  // Dates are stored as midnight UTC; a day filter covers the whole day
+  const fromField = filter.Date ? 'Date' : 'Date_from';
+  const toField = filter.Date ? 'Date' : 'Date_to';
+  if (filter[fromField] || filter[toField]) {
+    query.Date = {};
+    if (filter[fromField]) query.Date.$gte = filterDate(filter, fromField);
+    if (filter[toField]) query.Date.$lt = new Date(filterDate(filter, toField).getTime() + 24 * 60 * 60 * 1000);
+  }
+  return query;
+};
 
 const resolvers = {
   // Field resolvers to ensure dates are properly serialized
@@ -76,6 +212,9 @@ const resolvers = {
     async getAlumniByEmployer(_, { Employer }) {
       return await Alumni.find({ Employer });
     },
+    async searchAlumni(_, { filter, limit, cursor }, context, info) {
+      return await searchPage(Alumni, alumniQuery(filter), ALUMNI_SORT, { limit, cursor }, info);
+    },
 
     // Event queries
     async getEvents() {
@@ -90,6 +229,9 @@ const resolvers = {
     async getEventsByDate(_, { Date }) {
       return await Event.find({ Date });
     },
+    async searchEvents(_, { filter, limit, cursor }, context, info) {
+      return await searchPage(Event, eventQuery(filter), EVENT_SORT, { limit, cursor }, info);
+    },
 
     // Reservation queries
     async getReservations() {
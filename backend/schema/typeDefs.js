@@ -95,6 +95,19 @@ const typeDefs = gql`
     Last_login: String
   }
 
+  # One page of a search; pass nextCursor back as cursor for the next page
+  type AlumniPage {
+    items: [Alumni!]!
+    nextCursor: String
+    hasMore: Boolean!
+  }
+
+  type EventPage {
+    items: [Event!]!
+    nextCursor: String
+    hasMore: Boolean!
+  }
+
   type AuthPayload {
     token: String!
     alumni: Alumni
@@ -108,12 +121,14 @@ const typeDefs = gql`
     getAlumniByAlumniId(Alumni_id: String!): Alumni
     getAlumniByEmail(Email: String!): Alumni
     getAlumniByEmployer(Employer: String!): [Alumni!]!
+    searchAlumni(filter: AlumniFilter, limit: Int, cursor: String): AlumniPage!
     
     # Event queries
     getEvents: [Event!]!
     getEventById(id: ID!): Event
     getEventByEventId(Event_id: String!): Event
     getEventsByDate(Date: String!): [Event!]!
+    searchEvents(filter: EventFilter, limit: Int, cursor: String): EventPage!
     
     # Reservation queries
     getReservations: [Reservation!]!
@@ -133,6 +148,31 @@ const typeDefs = gql`
     getAdminById(id: ID!): Admin
   }
 
+  # Search filters: every given field must match. Name and Location match
+  # case-insensitive substrings, the rest exact values; Date_from/Date_to are
+  # inclusive YYYY-MM-DD bounds.
+  input AlumniFilter {
+    Name: String
+    Graduation_year: Int
+    Graduation_year_from: Int
+    Graduation_year_to: Int
+    Field_of_study: String
+    Employer: String
+    Employment_title: String
+    Employment_status: String
+    City: String
+    State: String
+  }
+
+  input EventFilter {
+    Name: String
+    Location: String
+    Date: String
+    Date_from: String
+    Date_to: String
+    Organizer_id: String
+  }
+
   input EmployerLocationInput {
     City: String
     State: String
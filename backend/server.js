@@ -4,6 +4,7 @@ const { ApolloServer } = require('apollo-server-express');
 const cors = require('cors');
 const mongoose = require('mongoose');
 const connectDB = require('./config/db');
+const { createPersistedQueryCache } = require('./config/persistedQueries');
 const { typeDefs } = require('./schema/typeDefs');
 const { resolvers } = require('./schema/resolvers');
 const { initGridFS, upload, getFileById, createReadStream, deleteFileById } = require('./middleware/gridfs');
@@ -93,6 +94,9 @@ async function startServer() {
       const token = req.headers.authorization || '';
       return { token };
     },
+    persistedQueries: {
+      cache: createPersistedQueryCache(),
+    },
   });
 
   await server.start();
@@ -1,6 +1,5 @@
 import React, { useState } from 'react';
 import { useApolloClient } from '@apollo/client';
-import axios from 'axios';
 import { useAuth } from '../context/AuthContext';
 import {
   Box,
@@ -25,6 +24,13 @@ const ChatInterface = () => {
   const [query, setQuery] = useState('');
   const [chatHistory, setChatHistory] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [streamStatus, setStreamStatus] = useState(null);
+  // The LLM service keeps the conversation's context server-side under this id
+  const [conversationId] = useState(() =>
+    window.crypto && window.crypto.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+  );
   const apolloClient = useApolloClient();
   const { user } = useAuth();
 
@@ -33,12 +39,16 @@ const ChatInterface = () => {
     
     // Get the first key (the query/mutation name)
     const queryKey = Object.keys(data)[0];
-    const results = data[queryKey];
+    const result = data[queryKey];
     
-    if (!results) {
+    if (!result) {
       return <Typography>No results found</Typography>;
     }
     
+    // Search queries return one page: { items, nextCursor, hasMore }
+    const isPage = Array.isArray(result.items);
+    const results = isPage ? result.items : result;
+    
     // Handle single object (mutations often return single item)
     const resultsArray = Array.isArray(results) ? results : [results];
     
@@ -71,10 +81,103 @@ const ChatInterface = () => {
             ))}
           </TableBody>
         </Table>
+        {isPage && result.hasMore && (
+          <Typography variant="caption" sx={{ display: 'block', p: 1 }}>
+            Showing the first {resultsArray.length} results. Ask a more specific question to narrow them down.
+          </Typography>
+        )}
       </TableContainer>
     );
   };
 
+  // Read the LLM service's server-sent events until the final cleaned query arrives
+  const streamLlmQuery = async (body, onEvent) => {
+    const response = await fetch(process.env.REACT_APP_LLM_SERVICE_URI + '/query/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body)
+    });
+
+    if (response.status === 429 || response.status === 503) {
+      // Turned away by the service's admission control while it is overloaded
+      const retryAfter = response.headers.get('Retry-After') || 'a few';
+      throw new Error(`The assistant is busy right now. Please try again in ${retryAfter} seconds.`);
+    }
+    if (!response.ok || !response.body) {
+      throw new Error(`Request failed with status code ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+
+      for (const rawEvent of events) {
+        const eventMatch = rawEvent.match(/^event: (.*)$/m);
+        const dataMatch = rawEvent.match(/^data: (.*)$/m);
+        if (!eventMatch || !dataMatch) continue;
+
+        const data = JSON.parse(dataMatch[1]);
+        if (eventMatch[1] === 'error') throw new Error(data.error);
+        if (eventMatch[1] === 'result') result = data;
+        onEvent(eventMatch[1], data);
+      }
+    }
+
+    if (!result) {
+      throw new Error('Stream ended without a result');
+    }
+    return result;
+  };
+
+  // Put the signed-in alumni's id into the variables, as is done for inline queries
+  const withCurrentUser = (value, key) => {
+    if (Array.isArray(value)) return value.map(item => withCurrentUser(item));
+    if (value && typeof value === 'object') {
+      return Object.fromEntries(Object.entries(value).map(([k, v]) => [k, withCurrentUser(v, k)]));
+    }
+    if (value === 'CURRENT_USER' || key === 'Organizer_id' || key === 'Alumni_id') return user.Alumni_id;
+    return value;
+  };
+
+  // Run a persisted document by its hash (the backend preloads the LLM service's
+  // registry); the full document is only sent if the backend does not know it yet
+  const runPersistedOperation = async ({ document_id, document, variables }) => {
+    const token = localStorage.getItem('token');
+    const send = async (includeDocument) => {
+      const response = await fetch(process.env.REACT_APP_GRAPHQL_URI || 'http://localhost:4000/graphql', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          authorization: token ? `Bearer ${token}` : ''
+        },
+        body: JSON.stringify({
+          ...(includeDocument ? { query: document } : {}),
+          variables: user && user.Alumni_id ? withCurrentUser(variables) : variables,
+          extensions: { persistedQuery: { version: 1, sha256Hash: document_id } }
+        })
+      });
+      return response.json();
+    };
+
+    let body = await send(false);
+    if (body.errors && body.errors.some(error => error.message === 'PersistedQueryNotFound')) {
+      body = await send(true);
+    }
+    if (body.errors && body.errors.length) {
+      throw new Error(body.errors.map(error => error.message).join('; '));
+    }
+    return { data: body.data };
+  };
+
   const handleSendQuery = async () => {
     if (!query.trim()) return;
 
@@ -90,16 +193,22 @@ const ChatInterface = () => {
     }]);
 
     try {
-      // Call LLM service with conversation history
-      const llmResponse = await axios.post(
-        process.env.REACT_APP_LLM_SERVICE_URI + '/query',
-        { 
+      // Call LLM service for this conversation, streaming progress as it generates
+      setStreamStatus({ intent: null, text: '' });
+      const llmResult = await streamLlmQuery(
+        {
           query: userMessage,
-          history: chatHistory
+          conversation_id: conversationId
+        },
+        (event, data) => {
+          if (event === 'intent') {
+            setStreamStatus(prev => ({ ...prev, intent: data }));
+          } else if (event === 'token') {
+            setStreamStatus(prev => ({ ...prev, text: prev.text + data.text }));
+          }
         }
       );
-
-      const { graphql_query } = llmResponse.data;
+      const { graphql_query } = llmResult;
 
       // Check if LLM is asking for more information
       if (graphql_query.includes('NEED_INFO:') || graphql_query.includes('Please provide')) {
@@ -110,6 +219,7 @@ const ChatInterface = () => {
           timestamp: new Date()
         }]);
         setLoading(false);
+        setStreamStatus(null);
         return;
       }
 
@@ -122,26 +232,30 @@ const ChatInterface = () => {
 
       // Execute GraphQL query or mutation
       try {
-        // Remove all newlines and extra whitespace
-        let cleanQuery = graphql_query.replace(/\s+/g, ' ').trim();
-        
-        // Inject user's Alumni_id for event creation and reservations
-        if (user && user.Alumni_id) {
-          cleanQuery = cleanQuery.replace(/"CURRENT_USER"/g, `"${user.Alumni_id}"`);
-          cleanQuery = cleanQuery.replace(/Organizer_id:\s*"[^"]*"/g, `Organizer_id: "${user.Alumni_id}"`);
-          cleanQuery = cleanQuery.replace(/Alumni_id:\s*"[^"]*"/g, `Alumni_id: "${user.Alumni_id}"`);
-        }
-        
-        const dynamicQuery = gql`${cleanQuery}`;
-        
-        // Determine if it's a query or mutation
-        const isMutation = cleanQuery.toLowerCase().startsWith('mutation');
-        
         let result;
-        if (isMutation) {
-          result = await apolloClient.mutate({ mutation: dynamicQuery });
+        if (llmResult.document_id) {
+          result = await runPersistedOperation(llmResult);
         } else {
-          result = await apolloClient.query({ query: dynamicQuery, fetchPolicy: 'network-only' });
+          // Remove all newlines and extra whitespace
+          let cleanQuery = graphql_query.replace(/\s+/g, ' ').trim();
+
+          // Inject user's Alumni_id for event creation and reservations
+          if (user && user.Alumni_id) {
+            cleanQuery = cleanQuery.replace(/"CURRENT_USER"/g, `"${user.Alumni_id}"`);
+            cleanQuery = cleanQuery.replace(/Organizer_id:\s*"[^"]*"/g, `Organizer_id: "${user.Alumni_id}"`);
+            cleanQuery = cleanQuery.replace(/Alumni_id:\s*"[^"]*"/g, `Alumni_id: "${user.Alumni_id}"`);
+          }
+
+          const dynamicQuery = gql`${cleanQuery}`;
+
+          // Determine if it's a query or mutation
+          const isMutation = cleanQuery.toLowerCase().startsWith('mutation');
+
+          if (isMutation) {
+            result = await apolloClient.mutate({ mutation: dynamicQuery });
+          } else {
+            result = await apolloClient.query({ query: dynamicQuery, fetchPolicy: 'network-only' });
+          }
         }
 
         // Add results
@@ -165,6 +279,7 @@ const ChatInterface = () => {
       }]);
     } finally {
       setLoading(false);
+      setStreamStatus(null);
     }
   };
 
@@ -229,8 +344,16 @@ const ChatInterface = () => {
         ))}
 
         {loading && (
-          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Box sx={{ display: 'flex', flexDirection: 'column', alignItems: 'center', gap: 1, mt: 2 }}>
             <CircularProgress size={24} />
+            {streamStatus?.intent?.operation && (
+              <Chip label={`Detected: ${streamStatus.intent.operation}`} size="small" />
+            )}
+            {streamStatus?.text && (
+              <Typography variant="body2" component="pre" sx={{ fontFamily: 'monospace', whiteSpace: 'pre-wrap', color: 'text.secondary' }}>
+                {streamStatus.text}
+              </Typography>
+            )}
           </Box>
         )}
       </Paper>
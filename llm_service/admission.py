@@ -0,0 +1,258 @@
+import heapq
+import itertools
+import logging
+import math
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from telemetry import ADMISSIONS, log
+
+# Admission control for model calls in the threaded (Flask) server:
+#   - at most max_active generations run against Ollama at once; the rest wait
+#     in one bounded queue, interactive chat ahead of batch/evaluation work
+#   - when the queue is full, an interactive request takes the place of the
+#     newest queued batch request; otherwise the newcomer is turned away (429)
+#   - a request that would have to queue past its deadline, judged by the
+#     EWMA generation time, is shed at once (503) instead of timing out after
+#     waiting; with a slot free it always runs, so the estimate keeps updating
+#   - queued requests leave the queue as soon as their deadline passes or
+#     their client disconnects, so dead work never reaches the model
+# Rejections carry a Retry-After estimate of when a slot should be free.
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+# How often a queued request re-checks its deadline and client connection
+POLL_INTERVAL = 0.1
+
+class AdmissionError(Exception):
+    """
+    A model call that was not run; status and retry_after go into the HTTP response
+    """
+
+    def __init__(self, message, status, retry_after, reason):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+    def details(self):
+        return {'error': str(self), 'status': self.status, 'reason': self.reason, 'retry_after': self.retry_after}
+
+class Ticket:
+    """
+    What admission needs to know about one request: its priority class,
+    absolute deadline (time.monotonic(), or None) and how to tell whether
+    its client is still connected
+    """
+
+    def __init__(self, priority=INTERACTIVE, deadline=None, disconnected=None):
+        if priority not in PRIORITIES:
+            raise ValueError(f'Unknown priority {priority!r} (expected one of {", ".join(PRIORITIES)})')
+        self.priority = priority
+        self.deadline = deadline
+        self.disconnected = disconnected
+
+    @classmethod
+    def from_request(cls, priority, deadline_ms, disconnected=None):
+        """
+        Ticket for a request with a relative deadline in milliseconds (None or 0: no deadline)
+        """
+        deadline = time.monotonic() + float(deadline_ms) / 1000 if deadline_ms else None
+        return cls(priority, deadline, disconnected)
+
+    def remaining(self, now):
+        return None if self.deadline is None else self.deadline - now
+
+    def client_gone(self):
+        return self.disconnected is not None and self.disconnected()
+
+class _Waiter:
+    def __init__(self, ticket, sequence):
+        self.ticket = ticket
+        self.key = (PRIORITIES[ticket.priority], sequence)
+        self.granted = False
+        self.evicted = False
+        self.removed = False
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+def socket_disconnected(sock):
+    """
+    True once the peer closed a connection whose request body has been read
+    (a zero-byte peek); False while it is open or when it cannot be told
+    """
+    if sock is None:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+    except (BlockingIOError, InterruptedError, ValueError, AttributeError):
+        # No data yet, or a socket type (TLS) that cannot be peeked without blocking
+        return False
+    except OSError:
+        return True
+
+class AdmissionController:
+    """
+    Bounded, prioritized admission of model calls. Use as
+    with controller.slot(ticket): ...model call...
+    """
+
+    def __init__(self, max_active=4, max_queue=32, ewma_alpha=0.2, enabled=True):
+        self.max_active = max(1, max_active)
+        self.max_queue = max(0, max_queue)
+        self.ewma_alpha = ewma_alpha
+        self.enabled = enabled
+        self.active = 0
+        self.queued = 0
+        self.ewma_service = None
+        self._heap = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.outcomes = {}
+
+    # Estimates
+
+    def _expected_wait(self, ahead):
+        """
+        Seconds until a request with `ahead` requests queued before it gets a slot
+        """
+        if self.active < self.max_active and ahead == 0:
+            return 0.0
+        if self.ewma_service is None:
+            return None
+        return (ahead // self.max_active + 1) * self.ewma_service
+
+    def _retry_after(self):
+        wait = self._expected_wait(self.queued)
+        return max(1, math.ceil(wait)) if wait else 1
+
+    def _count(self, outcome, priority):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        ADMISSIONS.labels(outcome, priority).inc()
+
+    def _reject(self, outcome, ticket, message, status):
+        self._count(outcome, ticket.priority)
+        error = AdmissionError(message, status, self._retry_after(), outcome)
+        log('admission_rejected', level=logging.WARNING, reason=outcome, priority=ticket.priority,
+            active=self.active, queued=self.queued, retry_after=error.retry_after)
+        return error
+
+    # Queue
+
+    def _ahead_of(self, waiter):
+        return sum(1 for other in self._heap if not other.removed and other.key < waiter.key)
+
+    def _remove(self, waiter):
+        waiter.removed = True
+        self.queued -= 1
+
+    def _evict_batch(self):
+        """
+        Make room for an interactive request by dropping the newest queued batch request
+        """
+        candidates = [w for w in self._heap if not w.removed and w.ticket.priority == BATCH]
+        if not candidates:
+            return False
+        newest = max(candidates, key=lambda w: w.key)
+        newest.evicted = True
+        self._remove(newest)
+        self._changed.notify_all()
+        return True
+
+    def _grant_next(self):
+        while self._heap and self.active < self.max_active:
+            waiter = heapq.heappop(self._heap)
+            if waiter.removed:
+                continue
+            waiter.granted = True
+            self._remove(waiter)
+            self.active += 1
+            self._changed.notify_all()
+
+    def _acquire(self, ticket):
+        with self._lock:
+            now = time.monotonic()
+            remaining = ticket.remaining(now)
+            if remaining is not None and remaining <= 0:
+                raise self._reject('deadline_exceeded', ticket, 'Request deadline already passed', 503)
+
+            if self.active < self.max_active and self.queued == 0:
+                self.active += 1
+                self._count('admitted', ticket.priority)
+                return
+
+            waiter = _Waiter(ticket, next(self._sequence))
+            wait = self._expected_wait(self._ahead_of(waiter))
+            if remaining is not None and wait is not None and self.ewma_service is not None \
+                    and wait + self.ewma_service > remaining:
+                raise self._reject('deadline_unreachable', ticket, 'Request deadline cannot be met at the current load', 503)
+
+            if self.queued >= self.max_queue and not (ticket.priority == INTERACTIVE and self._evict_batch()):
+                raise self._reject('queue_full', ticket, 'Too many requests waiting for the model', 429)
+
+            heapq.heappush(self._heap, waiter)
+            self.queued += 1
+            self._grant_next()
+            while not waiter.granted:
+                if waiter.evicted:
+                    raise self._reject('evicted', ticket, 'Batch request displaced by interactive requests', 429)
+                now = time.monotonic()
+                remaining = ticket.remaining(now)
+                if remaining is not None and remaining <= 0:
+                    self._remove(waiter)
+                    raise self._reject('deadline_exceeded', ticket, 'Request deadline passed while queued', 503)
+                if ticket.client_gone():
+                    self._remove(waiter)
+                    raise self._reject('client_gone', ticket, 'Client disconnected while queued', 499)
+                self._changed.wait(POLL_INTERVAL if remaining is None else min(POLL_INTERVAL, remaining))
+            self._count('admitted', ticket.priority)
+
+    def _release(self, seconds):
+        with self._lock:
+            self.active -= 1
+            if seconds is not None:
+                self.ewma_service = seconds if self.ewma_service is None else \
+                    self.ewma_alpha * seconds + (1 - self.ewma_alpha) * self.ewma_service
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, ticket=None, trace=None):
+        """
+        Hold one generation slot for the duration of the block. Raises
+        AdmissionError when the request is turned away or leaves the queue.
+        The time spent queued goes to the trace's 'admission_wait' stage.
+        """
+        if not self.enabled:
+            yield
+            return
+        ticket = ticket or Ticket()
+        start = time.perf_counter()
+        try:
+            self._acquire(ticket)
+        finally:
+            if trace is not None:
+                trace.observe('admission_wait', time.perf_counter() - start)
+        start = time.perf_counter()
+        seconds = None
+        try:
+            yield
+            seconds = time.perf_counter() - start
+        finally:
+            self._release(seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'max_active': self.max_active,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'queued': self.queued,
+                'ewma_generation_ms': round(self.ewma_service * 1000, 1) if self.ewma_service is not None else None,
+                'outcomes': dict(self.outcomes)
+            }
@@ -0,0 +1,153 @@
+import os
+import json
+import logging
+import asyncio
+from quart import Quart, request, jsonify
+from quart_cors import cors
+from dotenv import load_dotenv
+
+# Asyncio version of llm_server.py: requests wait on Ollama without holding a
+# worker, identical in-flight prompts share one generation, and at most
+# LLM_MAX_CONCURRENCY generations run at once.
+#
+# Run with: hypercorn async_server:app --bind 0.0.0.0:5000
+
+load_dotenv()
+
+# Imported after load_dotenv() so .env settings reach the generator
+from query_generator import atranslate_query, atranslate_queries, batch_parallelism, astream_query, query_cache, conversation_store, backend_stats, persisted_queries, warm_up, MAX_CONCURRENT_GENERATIONS
+from telemetry import log, metrics_payload
+
+# Largest batch accepted by /api/llm/query/batch
+BATCH_MAX_SIZE = int(os.getenv('LLM_BATCH_MAX_SIZE', 1000))
+
+app = cors(Quart(__name__))
+
+@app.before_serving
+async def startup():
+    # Load the model before accepting requests so the first user does not wait for it
+    await asyncio.to_thread(warm_up)
+
+@app.route('/api/llm/query', methods=['POST'])
+async def process_query():
+    try:
+        data = await request.get_json()
+        natural_language_query = data.get('query', '')
+        conversation_history = data.get('history', [])
+        conversation_id = data.get('conversation_id')
+
+        if not natural_language_query:
+            return jsonify({'error': 'No query provided'}), 400
+
+        result = await atranslate_query(natural_language_query, conversation_history, conversation_id)
+
+        return jsonify({
+            'success': True,
+            **result,
+            'original_query': natural_language_query,
+            'conversation_id': conversation_id
+        })
+
+    except Exception as e:
+        log('request_error', level=logging.ERROR, exc_info=True, endpoint='query', error=str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/llm/query/batch', methods=['POST'])
+async def process_query_batch():
+    try:
+        data = await request.get_json()
+        queries = data.get('queries', [])
+        parallelism = data.get('parallelism')
+
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'error': 'No queries provided'}), 400
+        if len(queries) > BATCH_MAX_SIZE:
+            return jsonify({'error': f'Batch too large (max {BATCH_MAX_SIZE} queries)'}), 400
+        try:
+            batch_parallelism(parallelism)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        results = await atranslate_queries(queries, parallelism)
+
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results
+        })
+
+    except Exception as e:
+        log('request_error', level=logging.ERROR, exc_info=True, endpoint='query_batch', error=str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def sse_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+@app.route('/api/llm/query/stream', methods=['POST'])
+async def process_query_stream():
+    data = await request.get_json()
+    natural_language_query = data.get('query', '')
+    conversation_history = data.get('history', [])
+    conversation_id = data.get('conversation_id')
+
+    if not natural_language_query:
+        return jsonify({'error': 'No query provided'}), 400
+
+    async def generate():
+        async for event in astream_query(natural_language_query, conversation_history, conversation_id):
+            if event['event'] == 'result':
+                event['data'] = {
+                    'success': True,
+                    **event['data'],
+                    'original_query': natural_language_query,
+                    'conversation_id': conversation_id
+                }
+            yield sse_event(event)
+
+    return generate(), 200, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+
+@app.route('/api/llm/cache/stats', methods=['GET'])
+async def cache_stats():
+    return jsonify(query_cache.stats())
+
+@app.route('/api/llm/cache', methods=['DELETE'])
+async def clear_cache():
+    query_cache.clear()
+    return jsonify({'success': True})
+
+@app.route('/api/llm/conversation/<conversation_id>', methods=['DELETE'])
+async def clear_conversation(conversation_id):
+    conversation_store.clear(conversation_id)
+    return jsonify({'success': True})
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    body, content_type = metrics_payload()
+    return body, 200, {'Content-Type': content_type}
+
+@app.route('/api/llm/health', methods=['GET'])
+async def health_check():
+    return jsonify({
+        'status': 'healthy',
+        'service': 'LLM Query Generator',
+        'mode': 'async',
+        'max_concurrency': MAX_CONCURRENT_GENERATIONS,
+        'backends': backend_stats(),
+        'persisted_queries': persisted_queries.stats()
+    })
+
+if __name__ == '__main__':
+    port = int(os.getenv('PORT', 5000))
+    log('starting', service='Async LLM Service', port=port)
+    app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,171 @@
+"""
+Microbenchmark for clean_graphql_response.
+
+Checks that the single-pass implementation gives byte-for-byte the same output as
+the original chain of re.sub calls (on realistic LLM outputs and on randomly
+generated ones), then times both.
+
+Run from llm_service/: python benchmarks/clean_response_bench.py [--iterations N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_generator import clean_graphql_response
+
+def legacy_clean_graphql_response(response):
+    """
+    clean_graphql_response as it was before the single-pass rewrite
+    """
+    # Remove any markdown code blocks and backticks
+    response = re.sub(r'```graphql\s*', '', response)
+    response = re.sub(r'```\s*', '', response)
+    response = response.replace('`', '')  # Remove stray backticks
+    response = response.strip()
+    
+    # Fix common LLM mistakes: convert SCREAMING_SNAKE_CASE to correct camelCase query names
+    query_name_fixes = {
+        r'\bGET_ALUMNI_BY_EMPLOYER\b': 'getAlumniByEmployer',
+        r'\bGET_ALUMNI_BY_ID\b': 'getAlumniById',
+        r'\bGET_ALUMNI_BY_ALUMNI_ID\b': 'getAlumniByAlumniId',
+        r'\bGET_ALUMNI_BY_EMAIL\b': 'getAlumniByEmail',
+        r'\bGET_ALUMNI\b': 'getAlumni',
+        r'\bGET_EVENTS_BY_DATE\b': 'getEventsByDate',
+        r'\bGET_EVENT_BY_ID\b': 'getEventById',
+        r'\bGET_EVENT_BY_EVENT_ID\b': 'getEventByEventId',
+        r'\bGET_EVENTS\b': 'getEvents',
+        r'\bGET_RESERVATIONS_BY_ALUMNI\b': 'getReservationsByAlumni',
+        r'\bGET_RESERVATIONS_BY_EVENT\b': 'getReservationsByEvent',
+        r'\bGET_RESERVATION_BY_ID\b': 'getReservationById',
+        r'\bGET_RESERVATIONS\b': 'getReservations',
+        r'\bGET_PHOTOS_BY_EVENT\b': 'getPhotosByEvent',
+        r'\bGET_PHOTOS_BY_ALUMNI\b': 'getPhotosByAlumni',
+        r'\bGET_PHOTOS_BY_TAGS\b': 'getPhotosByTags',
+        r'\bGET_PHOTO_BY_ID\b': 'getPhotoById',
+        r'\bGET_PHOTOS\b': 'getPhotos',
+        r'\bGET_ADMIN_BY_ID\b': 'getAdminById',
+        r'\bGET_ADMINS\b': 'getAdmins',
+        r'\bCREATE_ALUMNI\b': 'createAlumni',
+        r'\bUPDATE_ALUMNI\b': 'updateAlumni',
+        r'\bDELETE_ALUMNI\b': 'deleteAlumni',
+        r'\bCREATE_EVENT\b': 'createEvent',
+        r'\bUPDATE_EVENT\b': 'updateEvent',
+        r'\bDELETE_EVENT\b': 'deleteEvent',
+        r'\bCREATE_RESERVATION\b': 'createReservation',
+        r'\bUPDATE_RESERVATION\b': 'updateReservation',
+        r'\bDELETE_RESERVATION\b': 'deleteReservation',
+    }
+    
+    for pattern, replacement in query_name_fixes.items():
+        response = re.sub(pattern, replacement, response, flags=re.IGNORECASE)
+    
+    # If response is asking for info, extract just the NEED_INFO message
+    if 'NEED_INFO' in response.upper() or 'PLEASE PROVIDE' in response.upper():
+        # Extract the actual message
+        match = re.search(r'NEED_INFO:\s*(.+?)(?:\n|"|$)', response, re.IGNORECASE)
+        if match:
+            return f"NEED_INFO: {match.group(1).strip()}"
+        # Fallback: look for "please provide"
+        match = re.search(r'please provide\s+(.+?)(?:\.|$)', response, re.IGNORECASE)
+        if match:
+            return f"NEED_INFO: Please provide {match.group(1).strip()}"
+        return "NEED_INFO: Please provide more information"
+    
+    # Clean up whitespace
+    response = re.sub(r'\s+', ' ', response)
+    
+    # Remove escaped quotes
+    response = response.replace('\\"', '"')
+    response = response.replace("\\'", "'")
+    
+    # If response starts with query/mutation, validate and return
+    if response.lower().startswith(('query', 'mutation')):
+        # Count braces to ensure they're balanced
+        open_braces = response.count('{')
+        close_braces = response.count('}')
+        
+        # Add missing closing braces
+        if open_braces > close_braces:
+            response += ' }' * (open_braces - close_braces)
+        
+        return response.strip()
+    
+    # Try to find query or mutation block
+    match = re.search(r'(query|mutation)\s*\{.+', response, re.DOTALL | re.IGNORECASE)
+    
+    if match:
+        query = match.group(0)
+        # Balance braces
+        open_braces = query.count('{')
+        close_braces = query.count('}')
+        if open_braces > close_braces:
+            query += ' }' * (open_braces - close_braces)
+        return query.strip()
+    
+    # Last resort: wrap in query
+    return f"query {{ {response.strip()} }}"
+
+# Typical raw outputs seen from the model
+SAMPLE_RESPONSES = [
+    'query { getAlumniByEmployer(Employer: "Google") { Name Email Employment_title } }',
+    '```graphql\nquery {\n  getEvents {\n    Event_id\n    Name\n    Date\n    Location\n  }\n}\n```',
+    '```\nquery { GET_ALUMNI_BY_EMPLOYER(Employer: "Microsoft") { Name Email Employment_title } }\n```',
+    'mutation { createEvent(input: { Name: "Tech Talk", Location: "Kansas City", Date: "2025-12-15", Time: "18:00", Organizer_id: "CURRENT_USER" }) { Event_id Name Date }',
+    'Here is the query:\n\nquery { getPhotosByTags(Tags: [\\"reunion\\"]) { Photo_id File_name } }\n\nThis returns photos.',
+    'NEED_INFO: Please provide Location, Date, and Time',
+    'I need more details. Please provide the event date and time.',
+    'getAdmins { Admin_id Username Role Email }',
+    'mutation { create_reservation(input: { Event_id: "E1001", Alumni_id: "CURRENT_USER", Number_of_attendees: 2, Payment_status: "Pending" }) { Reservation_id Event_id } }',
+    '  query{getReservationsByAlumni(Alumni_id: "A1004"){Reservation_id Event_id Number_of_attendees}}  ',
+]
+
+# Pieces that exercise every branch and the tricky interactions between steps
+FUZZ_TOKENS = [
+    '`', '```', '```graphql', 'graphql', ' ', '  ', '\n', '\t', '{', '}', '(', ')', '"', "'",
+    '\\', '\\"', "\\'", 'query', 'Query', 'mutation', 'MUTATION', 'NEED_INFO', 'need_info:',
+    'please provide', 'Please Provide', '.', ':', 'x', 'Name', 'GET_EVENTS', 'get_events',
+    'GET_ALUMNI_BY_ID', 'GET_ALUMNI', 'delete_event', 'DELETE_EVENTS', '_', 'A1001', 'ß', 'é',
+]
+
+def random_response(rng):
+    return ''.join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(0, 40)))
+
+def check_equivalence(fuzz_cases, seed):
+    rng = random.Random(seed)
+    cases = list(SAMPLE_RESPONSES) + [random_response(rng) for _ in range(fuzz_cases)]
+    for case in cases:
+        expected = legacy_clean_graphql_response(case)
+        actual = clean_graphql_response(case)
+        if expected != actual:
+            raise SystemExit(f"MISMATCH for {case!r}:\n  legacy: {expected!r}\n  new:    {actual!r}")
+    print(f"Outputs identical on {len(cases)} responses")
+
+def time_function(function, iterations):
+    def run():
+        for response in SAMPLE_RESPONSES:
+            function(response)
+    seconds = min(timeit.repeat(run, number=iterations, repeat=5))
+    return seconds / (iterations * len(SAMPLE_RESPONSES)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark clean_graphql_response')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--fuzz-cases', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    check_equivalence(args.fuzz_cases, args.seed)
+
+    legacy_us = time_function(legacy_clean_graphql_response, args.iterations)
+    current_us = time_function(clean_graphql_response, args.iterations)
+    print(f"legacy:      {legacy_us:8.2f} us/call")
+    print(f"single-pass: {current_us:8.2f} us/call")
+    print(f"speedup:     {legacy_us / current_us:8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+"""
+Latency, throughput and accuracy benchmark for the query generator.
+
+Replays a labeled corpus of messages (corpus.jsonl: prompt, expected GraphQL,
+category and optional history) through translate_query / atranslate_query and
+reports (items marked "conversation" send their history as earlier turns of
+a server-side conversation instead; items with an "output_mode" only run in
+that mode, and "response" is what the stub answers when it differs from the
+expected result):
+  - exact-match accuracy (whitespace-normalized string equality)
+  - semantic-match accuracy (same operations, root fields and arguments,
+    compared on the parsed GraphQL, so field order and formatting do not matter)
+  - p50/p95/p99 latency and throughput at several concurrency levels
+  - cache hit rate and where answers came from (fast_path, cache, llm)
+
+By default the Ollama model is replaced by StubLLM, which answers from the
+corpus with a configurable latency, so the benchmark runs offline and measures
+the service code rather than the model. Use --model ollama to benchmark the
+real model. Threshold options turn the run into a regression gate (exit code 1).
+
+Run from llm_service/: python benchmarks/run_benchmark.py [--concurrency 1,4,16]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graphql import GraphQLError, parse
+from graphql.language import OperationDefinitionNode
+from graphql.utilities import value_from_ast_untyped
+
+import query_generator
+import telemetry
+from stub_llm import StubLLM, load_responses
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus.jsonl')
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def normalize_query(query):
+    """
+    Collapse whitespace (including around braces and parentheses) for exact matching
+    """
+    query = re.sub(r'\s+', ' ', (query or '').strip())
+    return re.sub(r'\s*([{}():,\[\]])\s*', r'\1', query)
+
+def _canonical_value(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _canonical_value(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_canonical_value(item) for item in value)
+    return value
+
+def semantic_signature(query):
+    """
+    What a query does, ignoring formatting and selection sets:
+    operation types, root fields and their arguments. NEED_INFO answers
+    all share one signature. Returns None if the query does not parse.
+    """
+    query = (query or '').strip()
+    if query.startswith('NEED_INFO'):
+        return ('NEED_INFO',)
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+
+    operations = []
+    for definition in document.definitions:
+        if not isinstance(definition, OperationDefinitionNode):
+            continue
+        fields = []
+        for selection in definition.selection_set.selections:
+            arguments = tuple(sorted(
+                (argument.name.value, _canonical_value(value_from_ast_untyped(argument.value)))
+                for argument in getattr(selection, 'arguments', None) or ()
+            ))
+            fields.append((selection.name.value, arguments))
+        operations.append((definition.operation.value, tuple(sorted(fields))))
+    return tuple(operations)
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of a list of numbers
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(percent / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def latency_summary(latencies):
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2) if latencies else 0.0
+    }
+
+def conversation_history(item):
+    """
+    (history, conversation_id) for a corpus item. A "conversation" item's history
+    is recorded as earlier turns of a new server-side conversation, each user
+    message with the assistant answer after it, so no model call is needed.
+    """
+    if not item.get('conversation'):
+        return item.get('history'), None
+    conversation_id = f'benchmark-{uuid.uuid4().hex}'
+    store = query_generator.conversation_store
+    history = item.get('history', [])
+    for index, msg in enumerate(history):
+        if msg.get('type') != 'user':
+            continue
+        store.begin_turn(conversation_id, msg['content'], query_generator.CONTEXT_TOKEN_BUDGET)
+        answer = history[index + 1] if index + 1 < len(history) else {}
+        if answer.get('type') == 'assistant':
+            store.end_turn(conversation_id, answer.get('content'))
+    return None, conversation_id
+
+def run_item(item):
+    start = time.perf_counter()
+    try:
+        history, conversation_id = conversation_history(item)
+        result = query_generator.translate_query(item['prompt'], history, conversation_id)
+    except Exception as e:
+        result = {'graphql_query': None, 'source': 'error', 'error': str(e)}
+    return result, time.perf_counter() - start
+
+async def arun_item(item):
+    start = time.perf_counter()
+    try:
+        history, conversation_id = conversation_history(item)
+        result = await query_generator.atranslate_query(item['prompt'], history, conversation_id)
+    except Exception as e:
+        result = {'graphql_query': None, 'source': 'error', 'error': str(e)}
+    return result, time.perf_counter() - start
+
+def run_requests(items, concurrency, use_async):
+    """
+    Send all items with at most `concurrency` in flight.
+    Returns [(result, latency)] in input order and the wall time.
+    """
+    start = time.perf_counter()
+    if use_async:
+        async def run_all():
+            # The generation semaphore belongs to the previous event loop
+            query_generator._generation_slots = None
+            query_generator._inflight_generations.clear()
+            slots = asyncio.Semaphore(concurrency)
+
+            async def run_one(item):
+                async with slots:
+                    return await arun_item(item)
+
+            return await asyncio.gather(*(run_one(item) for item in items))
+
+        outcomes = asyncio.run(run_all())
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(run_item, items))
+    return outcomes, time.perf_counter() - start
+
+def cache_counters():
+    stats = query_generator.query_cache.stats()
+    return stats['hits'] + stats['semantic_hits'], stats['misses']
+
+def accuracy_pass(corpus, use_async):
+    """
+    Run every corpus item once on a cold cache and score the answers
+    """
+    query_generator.query_cache.clear()
+    outcomes, _ = run_requests(corpus, 1, use_async)
+
+    exact = semantic = 0
+    by_category = {}
+    failures = []
+    for item, (result, _) in zip(corpus, outcomes):
+        generated = result.get('graphql_query')
+        is_exact = normalize_query(generated) == normalize_query(item['expected'])
+        expected_signature = semantic_signature(item['expected'])
+        is_semantic = expected_signature is not None and semantic_signature(generated) == expected_signature
+
+        exact += is_exact
+        semantic += is_semantic
+        category = by_category.setdefault(item.get('category', 'other'), {'count': 0, 'exact': 0, 'semantic': 0})
+        category['count'] += 1
+        category['exact'] += is_exact
+        category['semantic'] += is_semantic
+        if not is_semantic:
+            failures.append({'prompt': item['prompt'], 'expected': item['expected'],
+                             'generated': generated, 'source': result.get('source')})
+
+    return {
+        'count': len(corpus),
+        'exact_match': exact / len(corpus),
+        'semantic_match': semantic / len(corpus),
+        'by_category': by_category,
+        'sources': dict(Counter(result.get('source') for result, _ in outcomes)),
+        'latency': latency_summary([latency for _, latency in outcomes]),
+        'failures': failures
+    }
+
+def throughput_pass(corpus, concurrency, repeat, use_async):
+    """
+    Replay the corpus `repeat` times at one concurrency level, starting from a cold cache
+    """
+    query_generator.query_cache.clear()
+    hits_before, misses_before = cache_counters()
+
+    items = [item for _ in range(repeat) for item in corpus]
+    outcomes, elapsed = run_requests(items, concurrency, use_async)
+
+    hits_after, misses_after = cache_counters()
+    hits, misses = hits_after - hits_before, misses_after - misses_before
+    return {
+        'concurrency': concurrency,
+        'requests': len(items),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(items) / elapsed, 2) if elapsed else 0.0,
+        'errors': sum(1 for result, _ in outcomes if result.get('source') == 'error'),
+        'cache_hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        'sources': dict(Counter(result.get('source') for result, _ in outcomes)),
+        **latency_summary([latency for _, latency in outcomes])
+    }
+
+def check_thresholds(report, args):
+    failures = []
+    accuracy = report['accuracy']
+    if args.min_exact is not None and accuracy['exact_match'] < args.min_exact:
+        failures.append(f"exact match {accuracy['exact_match']:.3f} < {args.min_exact}")
+    if args.min_semantic is not None and accuracy['semantic_match'] < args.min_semantic:
+        failures.append(f"semantic match {accuracy['semantic_match']:.3f} < {args.min_semantic}")
+    for level in report['throughput']:
+        if args.max_p95_ms is not None and level['p95_ms'] > args.max_p95_ms:
+            failures.append(f"p95 {level['p95_ms']}ms > {args.max_p95_ms}ms at concurrency {level['concurrency']}")
+        if args.min_throughput is not None and level['throughput_rps'] < args.min_throughput:
+            failures.append(f"throughput {level['throughput_rps']} rps < {args.min_throughput} at concurrency {level['concurrency']}")
+    return failures
+
+def print_report(report):
+    accuracy = report['accuracy']
+    print(f"Corpus: {accuracy['count']} messages, model: {report['model']}, mode: {report['mode']}, "
+          f"output: {report['output_mode']}")
+    print(f"Exact match:    {accuracy['exact_match']:.1%}")
+    print(f"Semantic match: {accuracy['semantic_match']:.1%}")
+    for name, category in sorted(accuracy['by_category'].items()):
+        print(f"  {name:<12} {category['semantic']}/{category['count']} semantic, {category['exact']}/{category['count']} exact")
+    print(f"Sources (cold cache): {accuracy['sources']}")
+    for failure in accuracy['failures']:
+        print(f"  MISMATCH [{failure['source']}] {failure['prompt']!r}\n    expected:  {failure['expected']}\n    generated: {failure['generated']}")
+
+    print(f"\n{'conc':>5} {'reqs':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'hit rate':>9} {'errors':>7}")
+    for level in report['throughput']:
+        print(f"{level['concurrency']:>5} {level['requests']:>6} {level['throughput_rps']:>9.2f} "
+              f"{level['p50_ms']:>9.2f} {level['p95_ms']:>9.2f} {level['p99_ms']:>9.2f} "
+              f"{level['cache_hit_rate']:>9.1%} {level['errors']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the query generator')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--model', choices=['stub', 'ollama'], default='stub')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--concurrency', default='1,4,16', help='comma-separated concurrency levels')
+    parser.add_argument('--repeat', type=int, default=3, help='times the corpus is replayed per level')
+    parser.add_argument('--output-mode', choices=['graphql', 'intent'],
+                        help='what the model writes (default: LLM_OUTPUT_MODE)')
+    parser.add_argument('--no-fast-path', action='store_true', help='send every message to the model')
+    parser.add_argument('--no-cache', action='store_true', help='disable the query cache')
+    parser.add_argument('--stub-latency-ms', type=float, default=20.0, help='fixed stub overhead per call')
+    parser.add_argument('--stub-prompt-ms-per-char', type=float, default=0.005)
+    parser.add_argument('--stub-token-ms', type=float, default=2.0)
+    parser.add_argument('--min-exact', type=float, help='fail if exact-match accuracy is below this')
+    parser.add_argument('--min-semantic', type=float, help='fail if semantic-match accuracy is below this')
+    parser.add_argument('--max-p95-ms', type=float, help='fail if p95 latency at any level is above this')
+    parser.add_argument('--min-throughput', type=float, help='fail if throughput at any level is below this')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--verbose', action='store_true', help='keep the generator log output')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if args.model == 'stub':
+        query_generator.llm = StubLLM(
+            load_responses(args.corpus),
+            base_latency_ms=args.stub_latency_ms,
+            prompt_ms_per_char=args.stub_prompt_ms_per_char,
+            token_ms=args.stub_token_ms
+        )
+    if args.output_mode:
+        query_generator.OUTPUT_MODE = args.output_mode
+    corpus = [item for item in corpus if item.get('output_mode', query_generator.OUTPUT_MODE) == query_generator.OUTPUT_MODE]
+    if args.no_fast_path:
+        query_generator.FAST_PATH_ENABLED = False
+    if args.no_cache:
+        query_generator.query_cache.max_size = 0
+
+    use_async = args.mode == 'async'
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    if not args.verbose:
+        telemetry.logger.setLevel(logging.ERROR)
+    output = contextlib.nullcontext() if args.verbose else open(os.devnull, 'w')
+    with output as sink, contextlib.redirect_stdout(sink or sys.stdout):
+        report = {
+            'model': args.model,
+            'mode': args.mode,
+            'output_mode': query_generator.OUTPUT_MODE,
+            'fast_path': query_generator.FAST_PATH_ENABLED,
+            'cache': query_generator.query_cache.enabled,
+            'accuracy': accuracy_pass(corpus, use_async),
+            'throughput': [throughput_pass(corpus, level, args.repeat, use_async) for level in levels]
+        }
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    failures = check_thresholds(report, args)
+    for failure in failures:
+        print(f"THRESHOLD FAILED: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
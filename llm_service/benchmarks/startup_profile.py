@@ -0,0 +1,136 @@
+"""
+Startup-time profile for the LLM service.
+
+Starts a fresh interpreter per run (python -X importtime) that imports the
+server module, runs query_generator.preload() and answers one fast-path
+request, and reports:
+  - import, preload and first-request time (median over the runs)
+  - import time per top-level package (summed self time), e.g. flask, graphql
+  - the slowest individual modules
+
+The server import is kept under a fixed budget (--max-import-ms, exit code 1
+when exceeded), so a heavy import added at module level shows up here rather
+than as a slow cold start in production. langchain is only paid in preload()
+(or on the first model call), not at import.
+
+Run from llm_service/: python benchmarks/startup_profile.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import budget for the server module, in milliseconds
+IMPORT_BUDGET_MS = 400
+
+# Runs in the child interpreter; the last stdout line is the JSON result
+CHILD_CODE = """
+import json, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+import query_generator
+query_generator.preload()
+preloaded = time.perf_counter()
+query_generator.translate_query({message!r})
+answered = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'preload_ms': (preloaded - imported) * 1000,
+    'first_request_ms': (answered - preloaded) * 1000
+}}))
+"""
+
+# A message the fast path answers, so the first request does not need Ollama
+FIRST_MESSAGE = 'Show all events'
+
+def parse_importtime(stderr):
+    """
+    (module, depth, self_us, cumulative_us) for each line of -X importtime output
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+def profile_once(module):
+    env = dict(os.environ)
+    # Keep the registry file untouched and the log lines off stdout
+    env.setdefault('LLM_PERSISTED_QUERIES', 'false')
+    env['LLM_LOG_LEVEL'] = 'WARNING'
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_CODE.format(module=module, message=FIRST_MESSAGE)],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'Profiling run failed:\n{completed.stderr[-2000:]}')
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['modules'] = parse_importtime(completed.stderr)
+    return result
+
+def summarize(runs, top):
+    median_run = sorted(runs, key=lambda run: run['import_ms'])[len(runs) // 2]
+    packages = defaultdict(int)
+    for name, _, self_us, _ in median_run['modules']:
+        packages[name.split('.')[0]] += self_us
+    slowest = sorted(median_run['modules'], key=lambda module: module[2], reverse=True)[:top]
+    return {
+        'runs': len(runs),
+        'import_ms': round(statistics.median(run['import_ms'] for run in runs), 1),
+        'preload_ms': round(statistics.median(run['preload_ms'] for run in runs), 1),
+        'first_request_ms': round(statistics.median(run['first_request_ms'] for run in runs), 1),
+        'packages_ms': {name: round(us / 1000, 1) for name, us in
+                        sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]},
+        'slowest_modules_ms': {name: round(self_us / 1000, 1) for name, _, self_us, _ in slowest}
+    }
+
+def print_report(report, module):
+    print(f"Startup of {module} (median of {report['runs']} runs)")
+    print(f"Import:        {report['import_ms']:>8.1f} ms")
+    print(f"Preload:       {report['preload_ms']:>8.1f} ms")
+    print(f"First request: {report['first_request_ms']:>8.1f} ms")
+    print('\nImport time by package (self time, import and preload, median run):')
+    for name, ms in report['packages_ms'].items():
+        print(f"  {name:<28} {ms:>8.1f} ms")
+    print('\nSlowest modules:')
+    for name, ms in report['slowest_modules_ms'].items():
+        print(f"  {name:<40} {ms:>8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the LLM service startup time')
+    parser.add_argument('--module', choices=['llm_server', 'async_server', 'query_generator'], default='llm_server')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start')
+    parser.add_argument('--top', type=int, default=10, help='packages and modules to list')
+    parser.add_argument('--max-import-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help='fail if the median import time is above this')
+    parser.add_argument('--max-ready-ms', type=float, help='fail if median import plus preload is above this')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    report = summarize([profile_once(args.module) for _ in range(args.runs)], args.top)
+    print_report(report, args.module)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if report['import_ms'] > args.max_import_ms:
+        failures.append(f"import {report['import_ms']}ms > {args.max_import_ms}ms")
+    ready_ms = report['import_ms'] + report['preload_ms']
+    if args.max_ready_ms is not None and ready_ms > args.max_ready_ms:
+        failures.append(f"import + preload {ready_ms:.1f}ms > {args.max_ready_ms}ms")
+    for failure in failures:
+        print(f"BUDGET EXCEEDED: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
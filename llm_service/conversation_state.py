@@ -0,0 +1,283 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Server-side conversation state, keyed by a client-chosen conversation_id.
+# Instead of re-joining the raw message history on every turn, each conversation
+# keeps the createEvent details gathered so far (merged turn by turn) plus a few
+# recent messages, and renders them into a context of bounded size.
+
+SLOT_ORDER = ['Name', 'Location', 'Date', 'Time', 'Capacity']
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+MONTH = r'(?P<month>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+
+# Messages that start (or continue) an event creation flow
+CREATE_EVENT_PATTERN = re.compile(
+    r'\b(?:create|schedule|host|organi[sz]e|plan|add|set\s+up)\b.*\b(?:event|gala|meetup|mixer|reception|talk|workshop|party)\b',
+    re.IGNORECASE
+)
+
+# Results that finish the event flow, or keep it open asking for more details
+CREATE_EVENT_MUTATION = re.compile(r'\s*mutation\s*\{\s*createEvent\b')
+# ("Please provide ..." without the prefix is read as NEED_INFO, as the chat UI does)
+NEED_INFO = re.compile(r'\s*(?:NEED_INFO\b|Please provide\b)', re.IGNORECASE)
+
+# Capitalized words, e.g. "Winter Alumni Reception"; scoped case-sensitive like intent_parser
+TITLE = r'(?-i:[A-Z0-9][\w\'&-]*(?:\s+(?:of\s+|the\s+|and\s+|&\s+)?[A-Z0-9][\w\'&-]*)*)'
+PLACE = r'(?-i:[A-Z][\w\'.&-]*(?:\s+(?:of\s+|the\s+|&\s+)?[A-Z0-9][\w\'.&-]*)*)'
+
+NAME_PATTERNS = [
+    re.compile(r'\b(?:called|named|titled)\s+["\']?(?P<value>[^"\',.]+?)["\']?(?=\s+(?:on|at|in|for|with|next|this)\b|[,.!?]|$)', re.IGNORECASE),
+    re.compile(r'\bcall\s+it\s+["\']?(?P<value>[^"\',.]+?)["\']?(?=\s+(?:on|at|in|for|with)\b|[,.!?]|$)', re.IGNORECASE),
+    re.compile(r'\b(?:name|title)\s+(?:is|should\s+be|:)\s*["\']?(?P<value>[^"\',.]+?)["\']?(?=[,.!?]|$)', re.IGNORECASE),
+    re.compile(rf'\b(?:create|schedule|host|organi[sz]e|plan|add)\s+(?:an?\s+|the\s+|our\s+)?(?:new\s+)?(?:virtual\s+|online\s+)?event\s+(?P<value>{TITLE})', re.IGNORECASE),
+    re.compile(rf'\b(?:create|schedule|host|organi[sz]e|plan|add)\s+(?:an?\s+|the\s+|our\s+)?(?:new\s+)?(?P<value>{TITLE})\s+event\b', re.IGNORECASE),
+    re.compile(rf'\b(?:create|schedule|host|organi[sz]e|plan|add)\s+(?:an?\s+|the\s+|our\s+)?(?:new\s+)?(?P<value>{TITLE})(?=\s+(?:on|at|in|for)\b)', re.IGNORECASE),
+]
+
+LOCATION_PATTERNS = [
+    re.compile(r'\b(?:location|venue|place)\s+(?:is|will\s+be|:)\s*(?:the\s+)?(?P<value>[^,.!?]+?)\s*(?=[,.!?]|$)', re.IGNORECASE),
+    re.compile(r'(?:^|[,.]\s*)(?:the\s+)?(?P<value>[^,.!?]+?)\s+is\s+the\s+(?:location|venue|place)\b', re.IGNORECASE),
+    re.compile(rf'\b(?:in|at)\s+(?:the\s+)?(?P<value>{PLACE})', re.IGNORECASE),
+]
+
+VIRTUAL_PATTERN = re.compile(r'\b(?:virtual(?:ly)?|online|remote|zoom)\b', re.IGNORECASE)
+
+DATE_PATTERNS = [
+    re.compile(r'\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b'),
+    re.compile(rf'\b{MONTH}\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<year>\d{{4}})\b', re.IGNORECASE),
+    re.compile(rf'\b(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{MONTH},?\s+(?P<year>\d{{4}})\b', re.IGNORECASE),
+]
+
+TIME_PATTERNS = [
+    re.compile(r'\b(?P<hour>\d{1,2})(?::(?P<minute>[0-5]\d))?\s*(?P<meridiem>[ap])\.?\s*m\b\.?', re.IGNORECASE),
+    re.compile(r'\b(?P<hour>[01]?\d|2[0-3]):(?P<minute>[0-5]\d)\b'),
+    re.compile(r'\b(?P<noon>noon|midday)\b', re.IGNORECASE),
+]
+
+CAPACITY_PATTERNS = [
+    re.compile(r'\bcapacity\s+(?:of\s+|is\s+|to\s+|:\s*)?(?P<value>\d+)', re.IGNORECASE),
+    re.compile(r'\b(?P<value>\d+)\s+(?:person\s+|people\s+)?capacity\b', re.IGNORECASE),
+    re.compile(r'\b(?:up\s+to|max(?:imum)?\s+of|room\s+for|limit\s+(?:of|to))\s+(?P<value>\d+)\s+(?:people|guests|attendees|persons)\b', re.IGNORECASE),
+]
+
+# Words that look like a location or name after "in"/"at" but are not
+NOT_LOCATIONS = {'january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+                 'september', 'october', 'november', 'december', 'noon', 'midday'}
+
+def estimate_tokens(text):
+    # Same rough 4-characters-per-token estimate the prompt size logging uses
+    return (len(text) + 3) // 4
+
+def _first(patterns, message):
+    for pattern in patterns:
+        match = pattern.search(message)
+        if match:
+            return match
+    return None
+
+def _extract_date(message):
+    match = _first(DATE_PATTERNS, message)
+    if not match:
+        return None
+    month = match.group('month')
+    month = int(month) if month.isdigit() else MONTHS[month[:3].lower()]
+    day = int(match.group('day'))
+    if not 1 <= month <= 12 or not 1 <= day <= 31:
+        return None
+    return f"{match.group('year')}-{month:02d}-{day:02d}"
+
+def _extract_time(message):
+    match = _first(TIME_PATTERNS, message)
+    if not match:
+        return None
+    if 'noon' in match.groupdict() and match.group('noon'):
+        return '12:00'
+    hour = int(match.group('hour'))
+    minute = int(match.group('minute') or 0)
+    meridiem = match.groupdict().get('meridiem')
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+    return f"{hour:02d}:{minute:02d}"
+
+def _extract_location(message):
+    if VIRTUAL_PATTERN.search(message):
+        return 'Virtual'
+    for pattern in LOCATION_PATTERNS:
+        for match in pattern.finditer(message):
+            value = match.group('value').strip()
+            if value and value.split()[0].lower() not in NOT_LOCATIONS:
+                return value
+    return None
+
+def extract_slots(message):
+    """
+    Pull createEvent details out of one message, e.g.
+    {'Name': 'Tech Talk', 'Location': 'Kansas City', 'Date': '2025-12-15', 'Time': '18:00'}
+    """
+    slots = {}
+
+    name = _first(NAME_PATTERNS, message)
+    if name:
+        slots['Name'] = name.group('value').strip()
+
+    location = _extract_location(message)
+    if location and location != slots.get('Name'):
+        slots['Location'] = location
+
+    date = _extract_date(message)
+    if date:
+        slots['Date'] = date
+
+    event_time = _extract_time(message)
+    if event_time:
+        slots['Time'] = event_time
+
+    capacity = _first(CAPACITY_PATTERNS, message)
+    if capacity:
+        slots['Capacity'] = int(capacity.group('value'))
+
+    return slots
+
+class ConversationState:
+    """
+    Merged slot values and the most recent user messages of one conversation
+    """
+
+    def __init__(self, max_messages=3):
+        self.slots = {}
+        self.creating_event = False
+        self.messages = []
+        self.max_messages = max_messages
+        self.updated_at = time.monotonic()
+
+    def observe(self, message):
+        """
+        Merge a new user message into the state (later values win)
+        """
+        if CREATE_EVENT_PATTERN.search(message):
+            self.creating_event = True
+        if self.creating_event:
+            self.slots.update(extract_slots(message))
+        self.updated_at = time.monotonic()
+
+    def remember(self, message):
+        self.messages.append(message)
+        del self.messages[:-self.max_messages]
+
+    def complete_event(self):
+        """
+        Start over once the createEvent mutation has been produced
+        """
+        self.slots = {}
+        self.creating_event = False
+        self.messages = []
+
+    def abandon_event(self):
+        """
+        Drop a pending event flow once a turn answered something else; the
+        recent messages stay and age out as usual
+        """
+        self.slots = {}
+        self.creating_event = False
+
+    def summary(self):
+        if not self.slots:
+            return ''
+        known = ', '.join(f'{slot}: {self.slots[slot]}' for slot in SLOT_ORDER if slot in self.slots)
+        return f'[Event details so far: {known}]'
+
+    def context(self, token_budget):
+        """
+        Context for the next turn: the slot summary plus as many of the most recent
+        earlier messages as fit in token_budget (oldest dropped first)
+        """
+        summary = self.summary()
+        budget = token_budget - estimate_tokens(summary)
+
+        recent = []
+        for message in reversed(self.messages):
+            cost = estimate_tokens(message) + 1
+            if cost > budget:
+                if not recent and budget > 8:
+                    # Keep the tail of a long last message rather than nothing
+                    recent.append('...' + message[-(budget - 2) * 4:])
+                break
+            recent.append(message)
+            budget -= cost
+
+        return ' '.join(part for part in [summary] + recent[::-1] if part)
+
+class ConversationStore:
+    """
+    Bounded, thread-safe map of conversation_id -> ConversationState.
+    Idle conversations expire after ttl seconds; the least recently used
+    ones are evicted beyond max_conversations.
+    """
+
+    def __init__(self, max_conversations=10000, ttl=3600, max_messages=3):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        """
+        Return the state for a conversation, starting a new one if needed
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(conversation_id)
+            if state is not None and self.ttl > 0 and now - state.updated_at > self.ttl:
+                state = None
+            if state is None:
+                state = ConversationState(self.max_messages)
+                self._states[conversation_id] = state
+                while len(self._states) > self.max_conversations:
+                    self._states.popitem(last=False)
+            self._states.move_to_end(conversation_id)
+            return state
+
+    def begin_turn(self, conversation_id, message, token_budget):
+        """
+        Record a new user message and return the history context for it
+        (the current message itself is appended by build_context)
+        """
+        state = self.get(conversation_id)
+        with self._lock:
+            state.observe(message)
+            history_context = state.context(token_budget)
+            state.remember(message)
+        return history_context
+
+    def end_turn(self, conversation_id, graphql_query):
+        """
+        Close the event flow when the turn produced createEvent, or anything but
+        NEED_INFO (the user moved on); NEED_INFO keeps collecting details
+        """
+        if not graphql_query:
+            return
+        state = self.get(conversation_id)
+        with self._lock:
+            if CREATE_EVENT_MUTATION.match(graphql_query):
+                state.complete_event()
+            elif not NEED_INFO.match(graphql_query):
+                state.abandon_event()
+
+    def clear(self, conversation_id=None):
+        with self._lock:
+            if conversation_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(conversation_id, None)
+
+    def __len__(self):
+        return len(self._states)
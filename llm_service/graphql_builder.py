@@ -0,0 +1,76 @@
+import json
+
+# Selection sets used by the examples in SCHEMA_CONTEXT, so rendered queries
+# look exactly like the ones the LLM is taught to write
+DEFAULT_FIELDS = {
+    'getAlumni': ['Name', 'Email', 'Graduation_year'],
+    'getAlumniById': ['Alumni_id', 'Name', 'Email', 'Employer'],
+    'getAlumniByAlumniId': ['Alumni_id', 'Name', 'Email', 'Employer'],
+    'getAlumniByEmail': ['Alumni_id', 'Name', 'Email', 'Employer'],
+    'getAlumniByEmployer': ['Name', 'Email', 'Employment_title'],
+    'searchAlumni': ['Name', 'Email', 'Graduation_year'],
+    'getEvents': ['Event_id', 'Name', 'Date', 'Location'],
+    'getEventById': ['Event_id', 'Name', 'Date', 'Location'],
+    'getEventByEventId': ['Name', 'Date', 'Location'],
+    'getEventsByDate': ['Event_id', 'Name', 'Date', 'Location'],
+    'searchEvents': ['Event_id', 'Name', 'Date', 'Location'],
+    'getReservations': ['Reservation_id', 'Alumni_id', 'Event_id', 'Number_of_attendees'],
+    'getReservationById': ['Reservation_id', 'Alumni_id', 'Event_id', 'Number_of_attendees'],
+    'getReservationsByAlumni': ['Reservation_id', 'Event_id', 'Number_of_attendees'],
+    'getReservationsByEvent': ['Reservation_id', 'Alumni_id', 'Number_of_attendees'],
+    'getPhotos': ['Photo_id', 'File_name', 'Tags'],
+    'getPhotoById': ['Photo_id', 'File_name', 'Tags'],
+    'getPhotosByEvent': ['Photo_id', 'File_name', 'Tags'],
+    'getPhotosByAlumni': ['Photo_id', 'File_name', 'Tags'],
+    'getPhotosByTags': ['Photo_id', 'File_name'],
+    'getAdmins': ['Admin_id', 'Username', 'Role', 'Email'],
+    'getAdminById': ['Admin_id', 'Username', 'Role', 'Email'],
+    'createEvent': ['Event_id', 'Name', 'Date'],
+    'updateEvent': ['Event_id', 'Name', 'Date'],
+    'createReservation': ['Reservation_id', 'Event_id'],
+    'updateReservation': ['Reservation_id', 'Event_id'],
+    'createAlumni': ['Alumni_id', 'Name', 'Email'],
+    'updateAlumni': ['Alumni_id', 'Name', 'Employer'],
+    'createPhoto': ['Photo_id', 'File_name'],
+}
+
+# Operations returning a page ({ items nextCursor hasMore }); their fields are item fields
+PAGED_OPERATIONS = {'searchAlumni', 'searchEvents'}
+PAGE_FIELDS = ['nextCursor', 'hasMore']
+DEFAULT_PAGE_SIZE = 20
+
+def render_value(value):
+    """
+    Render a Python value as a GraphQL literal
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(render_value(item) for item in value) + ']'
+    if isinstance(value, dict):
+        return '{ ' + ', '.join(f'{key}: {render_value(item)}' for key, item in value.items()) + ' }'
+    # JSON string escapes are valid GraphQL string escapes
+    return json.dumps(str(value))
+
+def render_operation(operation_type, name, args=None, fields=None):
+    """
+    Render a single-field GraphQL operation on one line, e.g.
+    query { getEventByEventId(Event_id: "EV2001") { Name Date Location } }
+    For paged operations the fields are wrapped in items { ... } nextCursor hasMore.
+    """
+    field = name
+    if args:
+        field += '(' + ', '.join(f'{key}: {render_value(value)}' for key, value in args.items()) + ')'
+
+    if fields is None:
+        fields = DEFAULT_FIELDS.get(name, [])
+    if fields and name in PAGED_OPERATIONS:
+        field += ' { items { ' + ' '.join(fields) + ' } ' + ' '.join(PAGE_FIELDS) + ' }'
+    elif fields:
+        field += ' { ' + ' '.join(fields) + ' }'
+
+    return f'{operation_type} {{ {field} }}'
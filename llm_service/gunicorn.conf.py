@@ -0,0 +1,70 @@
+import gc
+import os
+import shutil
+import tempfile
+from dotenv import load_dotenv
+
+# Production launcher for the Flask service:
+#   gunicorn -c gunicorn.conf.py llm_server:app
+# The app is imported once in the master (preload_app), warmed up, and then
+# LLM_WORKERS workers are forked from it, sharing the imported modules, schema,
+# prompt text and compiled patterns copy-on-write. Each worker builds its own
+# Ollama client on first use.
+#
+# The query cache, conversations (conversation_id) and admission control live in
+# each worker process, so the default is one worker:
+#   - with N workers, the next turn of a conversation can reach a worker that
+#     has not seen the earlier ones and loses the event details collected so far;
+#     run N > 1 only behind a proxy that routes by conversation_id
+#   - at most N x LLM_MAX_CONCURRENCY generations reach the one Ollama server
+#     and N x LLM_MAX_QUEUE requests wait; size LLM_MAX_CONCURRENCY as
+#     OLLAMA_NUM_PARALLEL / N so the limit still matches what Ollama runs
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('LLM_WORKERS', 1))
+# Threads per worker; requests mostly wait on Ollama. By default one for every
+# request admission control lets run or queue, so overload is answered with
+# 429/503 instead of waiting unseen in gunicorn's connection backlog.
+worker_class = 'gthread'
+threads = int(os.getenv('LLM_WORKER_THREADS', int(os.getenv('LLM_MAX_CONCURRENCY', 4)) + int(os.getenv('LLM_MAX_QUEUE', 32))))
+# Slow CPU-only generations can take well over gunicorn's 30 second default
+timeout = int(os.getenv('LLM_WORKER_TIMEOUT', 180))
+preload_app = True
+
+# Prometheus metrics are kept per process; with several workers they are
+# written to files in this directory and merged by /metrics. It has to be set
+# before the app (and prometheus_client) is imported, and emptied of files
+# from earlier runs.
+if workers > 1:
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='llm_metrics_')
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def when_ready(server):
+    """
+    Runs in the master after the app is loaded and before the workers are forked
+    """
+    if workers > 1:
+        concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+        server.log.warning(
+            f'{workers} workers: up to {workers * concurrency} concurrent generations against Ollama; '
+            'caches, conversations and admission are per worker'
+        )
+    from query_generator import preload, release_llm, warm_up
+    preload()
+    # Loads the model in Ollama once for all workers
+    warm_up()
+    # The client's connections and threads must not be shared with the workers
+    release_llm()
+    # Keep the garbage collector from touching (and so copying) the shared objects
+    gc.collect()
+    gc.freeze()
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,131 @@
+import re
+from graphql_builder import DEFAULT_PAGE_SIZE, render_operation
+
+# Rule-based matcher for the request shapes listed in SCHEMA_CONTEXT.
+# A rule only fires when it matches the WHOLE message, so anything with extra
+# conditions ("alumni at Google in Seattle") still goes to the LLM.
+
+VERB = r'(?:please\s+)?(?:show|list|get|find|display|retrieve|fetch|give)(?:\s+me)?'
+ALL = r'(?:\s+(?:all|every))?(?:\s+(?:of\s+)?the)?'
+EVENT_ID = r'(?P<event_id>EV?\d+)'
+ALUMNI_ID = r'(?P<alumni_id>A\d+)'
+MONGO_ID = r'(?P<id>(?-i:[0-9a-f]{6,24}))'
+# Employer and company names must be capitalized ("Goldman Sachs", "JPMorgan")
+# and start with a letter, so years and counts are never taken for one
+COMPANY = r'(?P<employer>(?-i:[A-Z][\w&.\'-]*(?:\s+(?:&\s+)?[A-Z0-9][\w&.\'-]*)*))'
+# Person names and fields of study, capitalized the same way
+PERSON = r'(?P<name>(?-i:[A-Z][\w.\'-]*(?:\s+[A-Z][\w.\'-]*)*))'
+FIELD_OF_STUDY = r'(?P<field>(?-i:[A-Z][\w&-]*(?:\s+(?:of\s+|and\s+|&\s+)?[A-Z][\w&-]*)*))'
+YEAR = r'(?P<year>(?:19|20)\d{2})'
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+
+def _to_int(value):
+    value = value.lower()
+    return NUMBER_WORDS[value] if value in NUMBER_WORDS else int(value)
+
+def _split_tags(value):
+    tags = re.split(r'\s*(?:,\s*(?:and|or)?|\band\b|\bor\b)\s*', value)
+    return [tag.strip('"\' ') for tag in tags if tag.strip('"\' ')]
+
+def _query(name, **args):
+    return 'query', name, args
+
+def _search_alumni(**search_filter):
+    return _query('searchAlumni', filter=search_filter, limit=DEFAULT_PAGE_SIZE)
+
+def _mutation(name, **args):
+    return 'mutation', name, args
+
+RULES = [
+    # List everything
+    (rf'{VERB}{ALL}\s+events', lambda m: _query('getEvents')),
+    (rf'{VERB}{ALL}\s+alumni', lambda m: _query('getAlumni')),
+    (rf'{VERB}{ALL}\s+reservations', lambda m: _query('getReservations')),
+    (rf'{VERB}{ALL}\s+photos', lambda m: _query('getPhotos')),
+    (rf'{VERB}{ALL}\s+admins', lambda m: _query('getAdmins')),
+
+    # Alumni lookups ("alumni from X" is left to the model: X may be a place or a year)
+    (rf'{VERB}{ALL}\s+alumni\s+(?:who\s+works?\s+(?:at|for)|working\s+(?:at|for)|employed\s+(?:at|by)|at)\s+{COMPANY}',
+     lambda m: _query('getAlumniByEmployer', Employer=m.group('employer'))),
+    (rf'{VERB}\s+(?:the\s+)?alumni\s+(?:with\s+)?(?:alumni[ _])?(?:id\s+)?{ALUMNI_ID}',
+     lambda m: _query('getAlumniByAlumniId', Alumni_id=m.group('alumni_id').upper())),
+    (rf'{VERB}\s+(?:the\s+)?alumni\s+with\s+(?:the\s+)?email\s+(?P<email>[^\s@]+@[^\s@]+\.\w+)',
+     lambda m: _query('getAlumniByEmail', Email=m.group('email'))),
+
+    # Alumni searches (filtered and paginated by the backend)
+    (rf'(?:who|(?:{VERB}{ALL}\s+)?alumni\s+who)\s+graduated\s+in\s+{YEAR}',
+     lambda m: _search_alumni(Graduation_year=int(m.group('year')))),
+    (rf'(?:{VERB}{ALL}\s+)?(?:alumni\s+)?(?:from\s+)?(?:the\s+)?class\s+of\s+{YEAR}',
+     lambda m: _search_alumni(Graduation_year=int(m.group('year')))),
+    (rf'{VERB}{ALL}\s+alumni\s+(?:named|called)\s+{PERSON}',
+     lambda m: _search_alumni(Name=m.group('name'))),
+    (rf'{VERB}{ALL}\s+alumni\s+who\s+(?:studied|majored\s+in)\s+{FIELD_OF_STUDY}',
+     lambda m: _search_alumni(Field_of_study=m.group('field'))),
+
+    # Event lookups
+    (rf'{VERB}{ALL}\s+events(?:\s+(?:happening|scheduled|taking\s+place))?\s+on\s+(?P<date>\d{{4}}-\d{{2}}-\d{{2}})',
+     lambda m: _query('getEventsByDate', Date=m.group('date'))),
+    (rf'{VERB}\s+(?:the\s+)?event\s+(?:with\s+)?(?:event[ _])?(?:id\s+)?{EVENT_ID}',
+     lambda m: _query('getEventByEventId', Event_id=m.group('event_id').upper())),
+
+    # Reservation lookups
+    (rf'{VERB}{ALL}\s+reservations\s+(?:for|by|of|made\s+by)\s+alumni\s+(?:id\s+)?{ALUMNI_ID}',
+     lambda m: _query('getReservationsByAlumni', Alumni_id=m.group('alumni_id').upper())),
+    (rf'{VERB}{ALL}\s+reservations\s+(?:for|to|of)\s+(?:the\s+)?event\s+(?:id\s+)?{EVENT_ID}',
+     lambda m: _query('getReservationsByEvent', Event_id=m.group('event_id').upper())),
+
+    # Photo lookups
+    (rf'{VERB}{ALL}\s+photos\s+(?:for|from|of|at)\s+(?:the\s+)?event\s+(?:id\s+)?{EVENT_ID}',
+     lambda m: _query('getPhotosByEvent', Event_id=m.group('event_id').upper())),
+    (rf'{VERB}{ALL}\s+photos\s+(?:uploaded\s+)?by\s+alumni\s+(?:id\s+)?{ALUMNI_ID}',
+     lambda m: _query('getPhotosByAlumni', Alumni_id=m.group('alumni_id').upper())),
+    (rf'{VERB}{ALL}\s+photos\s+(?:tagged(?:\s+(?:with|as))?|with\s+(?:the\s+)?tags?)\s+(?P<tags>["\']?[\w-]+["\']?(?:\s*(?:,\s*(?:and|or)?|and|or)\s*["\']?[\w-]+["\']?)*)',
+     lambda m: _query('getPhotosByTags', Tags=_split_tags(m.group('tags')))),
+
+    # RSVP
+    (rf'(?:please\s+)?(?:rsvp|register)(?:\s+me)?\s+(?:to|for)\s+(?:the\s+)?event\s+(?:id\s+)?{EVENT_ID}\s+for\s+(?P<count>\d+|{"|".join(NUMBER_WORDS)})\s+(?:people|persons?|guests?|attendees?)',
+     lambda m: _mutation('createReservation', input={
+         'Event_id': m.group('event_id').upper(),
+         'Alumni_id': 'CURRENT_USER',
+         'Number_of_attendees': _to_int(m.group('count')),
+         'Payment_status': 'Pending'
+     })),
+
+    # Updates
+    (rf'(?:update|change)\s+alumni\s+(?:with\s+id\s+)?{MONGO_ID}\s+(?:to\s+change\s+)?(?:their\s+)?employer\s+to\s+{COMPANY}',
+     lambda m: _mutation('updateAlumni', id=m.group('id'), input={'Employer': m.group('employer')})),
+
+    # Deletes (MongoDB _id only)
+    (rf'(?:delete|remove)\s+(?:the\s+)?event\s+(?:with\s+(?:mongo\s+)?id\s+)?{MONGO_ID}',
+     lambda m: _mutation('deleteEvent', id=m.group('id'))),
+    (rf'(?:delete|remove)\s+(?:the\s+)?alumni\s+(?:with\s+(?:mongo\s+)?id\s+)?{MONGO_ID}',
+     lambda m: _mutation('deleteAlumni', id=m.group('id'))),
+]
+
+COMPILED_RULES = [(re.compile(pattern, re.IGNORECASE), build) for pattern, build in RULES]
+
+def match_intent(natural_language_query):
+    """
+    Match a message against the fast-path rules.
+    Returns (operation_type, operation_name, args) or None if no rule covers it.
+    """
+    text = re.sub(r'\s+', ' ', (natural_language_query or '').strip()).rstrip(' ?!.')
+    for pattern, build in COMPILED_RULES:
+        match = pattern.fullmatch(text)
+        if match:
+            return build(match)
+    return None
+
+def fast_path_query(natural_language_query):
+    """
+    Build the GraphQL for a message directly when a rule matches, otherwise None
+    """
+    intent = match_intent(natural_language_query)
+    if intent is None:
+        return None
+    operation_type, name, args = intent
+    return render_operation(operation_type, name, args)
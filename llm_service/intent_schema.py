@@ -0,0 +1,209 @@
+import json
+import re
+from functools import lru_cache
+from graphql import (
+    GraphQLError, get_named_type, is_enum_type, is_input_object_type, is_leaf_type,
+    is_list_type, is_non_null_type, is_object_type, parse
+)
+from graphql.language import OperationDefinitionNode
+from graphql.utilities import value_from_ast_untyped
+from graphql_builder import DEFAULT_FIELDS, render_operation
+
+# Structured intent output: instead of GraphQL text the model writes a small
+# JSON object such as
+#   {"operation": "getAlumniByEmployer", "arguments": {"Employer": "Google"}}
+#   {"operation": "NEED_INFO", "missing": ["Location", "Date"]}
+# constrained by a JSON schema derived from the backend schema, and the service
+# renders the GraphQL itself. "fields" is only given when the defaults
+# (graphql_builder.DEFAULT_FIELDS) are not what the user asked for.
+
+NEED_INFO = 'NEED_INFO'
+
+SCALAR_JSON_TYPES = {'Int': 'integer', 'Float': 'number', 'Boolean': 'boolean'}
+
+class IntentError(ValueError):
+    pass
+
+def _json_type(graphql_type, depth=0):
+    """
+    JSON schema for an input type (scalars, enums, lists and input objects)
+    """
+    if is_non_null_type(graphql_type):
+        return _json_type(graphql_type.of_type, depth)
+    if is_list_type(graphql_type):
+        return {'type': 'array', 'items': _json_type(graphql_type.of_type, depth)}
+    if is_enum_type(graphql_type):
+        return {'type': 'string', 'enum': list(graphql_type.values)}
+    if is_input_object_type(graphql_type) and depth < 3:
+        return _object_schema(graphql_type.fields, depth + 1)
+    if is_input_object_type(graphql_type):
+        return {'type': 'object'}
+    return {'type': SCALAR_JSON_TYPES.get(graphql_type.name, 'string')}
+
+def _object_schema(arguments, depth=0):
+    return {
+        'type': 'object',
+        'properties': {name: _json_type(argument.type, depth) for name, argument in arguments.items()},
+        'required': [name for name, argument in arguments.items() if is_non_null_type(argument.type)],
+        'additionalProperties': False
+    }
+
+@lru_cache(maxsize=4)
+def operation_catalog(schema):
+    """
+    Every query and mutation: operation type, arguments and the scalar fields
+    its result can return (empty for scalar results such as deleteEvent; the
+    item fields for pages such as searchAlumni)
+    """
+    catalog = {}
+    for operation_type, root in (('query', schema.query_type), ('mutation', schema.mutation_type)):
+        if root is None:
+            continue
+        for name, field in root.fields.items():
+            result_type = get_named_type(field.type)
+            if is_object_type(result_type) and 'items' in result_type.fields:
+                result_type = get_named_type(result_type.fields['items'].type)
+            fields = []
+            if is_object_type(result_type):
+                fields = [field_name for field_name, result_field in result_type.fields.items()
+                          if is_leaf_type(get_named_type(result_field.type))]
+            catalog[name] = {'type': operation_type, 'args': field.args, 'fields': fields}
+    return catalog
+
+@lru_cache(maxsize=4)
+def intent_json_schema(schema):
+    """
+    JSON schema for Ollama's `format`: one alternative per operation, each with
+    its own argument types and selectable fields, plus NEED_INFO
+    """
+    alternatives = [{
+        'type': 'object',
+        'properties': {
+            'operation': {'const': NEED_INFO},
+            'missing': {'type': 'array', 'items': {'type': 'string'}}
+        },
+        'required': ['operation', 'missing'],
+        'additionalProperties': False
+    }]
+    for name, operation in operation_catalog(schema).items():
+        properties = {'operation': {'const': name}}
+        required = ['operation']
+        if operation['args']:
+            properties['arguments'] = _object_schema(operation['args'])
+            if any(is_non_null_type(argument.type) for argument in operation['args'].values()):
+                required.append('arguments')
+        if operation['fields']:
+            properties['fields'] = {'type': 'array', 'items': {'enum': operation['fields']}}
+        alternatives.append({
+            'type': 'object',
+            'properties': properties,
+            'required': required,
+            'additionalProperties': False
+        })
+    return {'anyOf': alternatives}
+
+def parse_intent(text):
+    """
+    Parse model output into an intent dict (tolerates text around the object)
+    """
+    text = text.strip()
+    if not text.startswith('{'):
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end < start:
+            raise IntentError('Output is not a JSON intent')
+        text = text[start:end + 1]
+    try:
+        intent = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise IntentError(f'Output is not valid JSON: {e.msg}')
+    if not isinstance(intent, dict) or not isinstance(intent.get('operation'), str):
+        raise IntentError('Intent has no "operation"')
+    return intent
+
+def render_intent(intent, schema):
+    """
+    Deterministic GraphQL (or NEED_INFO message) for an intent
+    """
+    name = intent['operation']
+    if name.upper() == NEED_INFO:
+        missing = [str(item) for item in intent.get('missing') or [] if str(item).strip()]
+        if not missing:
+            return 'NEED_INFO: Please provide more information'
+        if len(missing) == 1:
+            listed = missing[0]
+        elif len(missing) == 2:
+            listed = f'{missing[0]} and {missing[1]}'
+        else:
+            listed = ', '.join(missing[:-1]) + f', and {missing[-1]}'
+        return f'NEED_INFO: Please provide {listed}'
+
+    operation = operation_catalog(schema).get(name)
+    if operation is None:
+        raise IntentError(f'Unknown operation "{name}"')
+
+    arguments = intent.get('arguments') or {}
+    if not isinstance(arguments, dict):
+        raise IntentError('"arguments" must be an object')
+    unknown = [key for key in arguments if key not in operation['args']]
+    if unknown:
+        raise IntentError(f'Unknown argument(s) for {name}: {", ".join(unknown)}')
+    # Keep the schema's argument order so equal intents render identically
+    arguments = {key: arguments[key] for key in operation['args'] if key in arguments}
+
+    fields = None
+    if not operation['fields']:
+        fields = []
+    elif intent.get('fields'):
+        fields = [field for field in intent['fields'] if field in operation['fields']] or None
+    if fields is None and name not in DEFAULT_FIELDS and operation['fields']:
+        fields = operation['fields'][:4]
+
+    return render_operation(operation['type'], name, arguments, fields)
+
+def intent_from_graphql(query):
+    """
+    The intent a GraphQL answer corresponds to (used to write the few-shot
+    examples and the stub model's answers in intent form)
+    """
+    if query.strip().upper().startswith(NEED_INFO):
+        message = query.split(':', 1)[1].strip() if ':' in query else ''
+        message = re.sub(r'(?i)^please provide\s+', '', message).rstrip('.')
+        missing = [item.strip() for item in re.split(r',\s*(?:and\s+)?|\s+and\s+', message) if item.strip()]
+        return {'operation': NEED_INFO, 'missing': missing}
+
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        raise IntentError(e.message)
+    operation = next(d for d in document.definitions if isinstance(d, OperationDefinitionNode))
+    field = operation.selection_set.selections[0]
+    intent = {'operation': field.name.value}
+    if field.arguments:
+        intent['arguments'] = {argument.name.value: value_from_ast_untyped(argument.value)
+                               for argument in field.arguments}
+    if field.selection_set:
+        selections = field.selection_set.selections
+        items = next((s for s in selections if s.name.value == 'items' and s.selection_set), None)
+        if items is not None:
+            selections = items.selection_set.selections
+        fields = [selection.name.value for selection in selections]
+        if fields != DEFAULT_FIELDS.get(intent['operation']):
+            intent['fields'] = fields
+    return intent
+
+def intent_json(intent):
+    return json.dumps(intent, separators=(', ', ': '))
+
+# Few-shot answers in SCHEMA_CONTEXT: "-> query {{ ... }}" and "Output: ..." lines
+EXAMPLE_ANSWER_PATTERN = re.compile(r'(-> |Output: )((?:query|mutation) \{\{.*\}\}|NEED_INFO:.*)$', re.MULTILINE)
+
+def intent_examples(schema_context):
+    """
+    SCHEMA_CONTEXT with every example answer rewritten as its JSON intent
+    (braces doubled, since the context is a format template)
+    """
+    def rewrite(match):
+        answer = match.group(2).replace('{{', '{').replace('}}', '}')
+        rendered = intent_json(intent_from_graphql(answer))
+        return match.group(1) + rendered.replace('{', '{{').replace('}', '}}')
+    return EXAMPLE_ANSWER_PATTERN.sub(rewrite, schema_context)
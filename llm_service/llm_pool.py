@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from telemetry import log
+
+# A pool of model backends (Ollama hosts and/or models) behind the same
+# invoke/ainvoke/stream/astream interface as OllamaLLM, so query_generator can
+# use it in place of a single instance:
+#   - requests go to the backend with the fewest outstanding requests
+#     (ties broken by its EWMA latency)
+#   - a backend that fails repeatedly is skipped for a cooldown period
+#     (circuit breaker), then gets a single probe request
+#   - a request that is slower than its backend usually is gets a hedged
+#     duplicate on a second backend; the first answer wins
+#   - when every primary backend is busy, requests go to a smaller fallback model
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class NoBackendAvailable(Exception):
+    pass
+
+class Backend:
+    """
+    One model endpoint and its routing statistics
+    """
+
+    def __init__(self, name, llm):
+        self.name = name
+        self.llm = llm
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma_latency = None
+        self.state = CLOSED
+        self.opened_at = 0.0
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'state': self.state,
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'failures': self.failures,
+            'ewma_latency_ms': round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None
+        }
+
+class LLMPool:
+    """
+    Load-balancing, failover and hedging over several LLM backends.
+    hedge_after is a delay in seconds, 'auto' (hedge_multiplier x the backend's
+    EWMA latency) or None to disable hedging.
+    """
+
+    def __init__(self, backends, fallback=None, fallback_queue_depth=8, hedge_after=None,
+                 hedge_multiplier=2.0, hedge_min=0.05, failure_threshold=3, cooldown=30.0,
+                 ewma_alpha=0.2, max_workers=32):
+        if not backends:
+            raise ValueError('LLMPool needs at least one backend')
+        self.backends = list(backends)
+        self.fallback = fallback
+        self.fallback_queue_depth = fallback_queue_depth
+        self.hedge_after = hedge_after
+        self.hedge_multiplier = hedge_multiplier
+        self.hedge_min = hedge_min
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.ewma_alpha = ewma_alpha
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-pool')
+
+    # Routing
+
+    def _available(self, backend, now):
+        if backend.state == OPEN and now - backend.opened_at >= self.cooldown:
+            backend.state = HALF_OPEN
+        if backend.state == HALF_OPEN:
+            # One probe at a time while deciding whether the backend recovered
+            return backend.outstanding == 0
+        return backend.state == CLOSED
+
+    def _select(self, exclude=(), allow_fallback=True):
+        """
+        Pick a backend and count the request against it, or return None
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [b for b in self.backends if b not in exclude and self._available(b, now)]
+            best = min(candidates, key=lambda b: (b.outstanding, b.ewma_latency or 0.0), default=None)
+
+            fallback = self.fallback
+            if allow_fallback and fallback is not None and fallback not in exclude and self._available(fallback, now):
+                if best is None or best.outstanding >= self.fallback_queue_depth:
+                    best = fallback
+                    self.fallbacks += 1
+
+            if best is not None:
+                best.outstanding += 1
+                best.requests += 1
+            return best
+
+    def _hedge_delay(self, backend):
+        if self.hedge_after is None or len(self.backends) < 2:
+            return None
+        if self.hedge_after == 'auto':
+            if backend.ewma_latency is None:
+                return None
+            return max(self.hedge_min, backend.ewma_latency * self.hedge_multiplier)
+        return self.hedge_after
+
+    # Bookkeeping
+
+    def _succeeded(self, backend, elapsed):
+        with self._lock:
+            backend.outstanding -= 1
+            backend.consecutive_failures = 0
+            if backend.state != CLOSED:
+                log('backend_recovered', backend=backend.name)
+            backend.state = CLOSED
+            if backend.ewma_latency is None:
+                backend.ewma_latency = elapsed
+            else:
+                backend.ewma_latency += self.ewma_alpha * (elapsed - backend.ewma_latency)
+
+    def _failed(self, backend, error):
+        with self._lock:
+            backend.outstanding -= 1
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.state == HALF_OPEN or backend.consecutive_failures >= self.failure_threshold:
+                if backend.state != OPEN:
+                    log('backend_disabled', level=logging.WARNING, backend=backend.name,
+                        cooldown_seconds=self.cooldown, error=str(error))
+                backend.state = OPEN
+                backend.opened_at = time.monotonic()
+
+    def _abandoned(self, backend):
+        # Cancelled hedge or closed stream: neither a success nor a failure
+        with self._lock:
+            backend.outstanding -= 1
+
+    def _call(self, backend, prompt, kwargs):
+        start = time.perf_counter()
+        try:
+            response = backend.llm.invoke(prompt, **kwargs)
+        except Exception as e:
+            self._failed(backend, e)
+            raise
+        self._succeeded(backend, time.perf_counter() - start)
+        return response
+
+    async def _acall(self, backend, prompt, kwargs):
+        start = time.perf_counter()
+        try:
+            response = await backend.llm.ainvoke(prompt, **kwargs)
+        except asyncio.CancelledError:
+            self._abandoned(backend)
+            raise
+        except Exception as e:
+            self._failed(backend, e)
+            raise
+        self._succeeded(backend, time.perf_counter() - start)
+        return response
+
+    # OllamaLLM interface
+
+    def invoke(self, prompt, **kwargs):
+        tried = []
+        last_error = None
+        while True:
+            backend = self._select(tried)
+            if backend is None:
+                raise last_error or NoBackendAvailable('No LLM backend available')
+            tried.append(backend)
+
+            delay = self._hedge_delay(backend)
+            if delay is None:
+                try:
+                    return self._call(backend, prompt, kwargs)
+                except Exception as e:
+                    last_error = e
+                    continue
+
+            first = self._executor.submit(self._call, backend, prompt, kwargs)
+            pending = {first}
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                hedge = self._select(tried, allow_fallback=False)
+                if hedge is not None:
+                    tried.append(hedge)
+                    self.hedges += 1
+                    pending.add(self._executor.submit(self._call, hedge, prompt, kwargs))
+
+            # The slower copy keeps running in its thread; its answer is discarded
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not first:
+                            self.hedge_wins += 1
+                        return future.result()
+                    last_error = future.exception()
+
+    async def ainvoke(self, prompt, **kwargs):
+        tried = []
+        last_error = None
+        while True:
+            backend = self._select(tried)
+            if backend is None:
+                raise last_error or NoBackendAvailable('No LLM backend available')
+            tried.append(backend)
+
+            delay = self._hedge_delay(backend)
+            if delay is None:
+                try:
+                    return await self._acall(backend, prompt, kwargs)
+                except Exception as e:
+                    last_error = e
+                    continue
+
+            first = asyncio.ensure_future(self._acall(backend, prompt, kwargs))
+            pending = {first}
+            try:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    hedge = self._select(tried, allow_fallback=False)
+                    if hedge is not None:
+                        tried.append(hedge)
+                        self.hedges += 1
+                        pending.add(asyncio.ensure_future(self._acall(hedge, prompt, kwargs)))
+
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is not first:
+                                self.hedge_wins += 1
+                            return task.result()
+                        last_error = task.exception()
+            finally:
+                # Cancel the losing copy (or both, if the caller went away)
+                for task in pending:
+                    task.cancel()
+
+    def stream(self, prompt, **kwargs):
+        """
+        Stream from one backend. Streams are not hedged; a backend that fails before
+        producing any output is retried on the next one.
+        """
+        tried = []
+        last_error = None
+        while True:
+            backend = self._select(tried)
+            if backend is None:
+                raise last_error or NoBackendAvailable('No LLM backend available')
+            tried.append(backend)
+
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in backend.llm.stream(prompt, **kwargs):
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                # The consumer stopped reading
+                self._abandoned(backend)
+                raise
+            except Exception as e:
+                self._failed(backend, e)
+                if started:
+                    raise
+                last_error = e
+                continue
+            self._succeeded(backend, time.perf_counter() - start)
+            return
+
+    async def astream(self, prompt, **kwargs):
+        """
+        Async version of stream
+        """
+        tried = []
+        last_error = None
+        while True:
+            backend = self._select(tried)
+            if backend is None:
+                raise last_error or NoBackendAvailable('No LLM backend available')
+            tried.append(backend)
+
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in backend.llm.astream(prompt, **kwargs):
+                    started = True
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                self._abandoned(backend)
+                raise
+            except Exception as e:
+                self._failed(backend, e)
+                if started:
+                    raise
+                last_error = e
+                continue
+            self._succeeded(backend, time.perf_counter() - start)
+            return
+
+    def invoke_all(self, prompt, **kwargs):
+        """
+        Send a prompt to every backend (used to warm them all up)
+        """
+        for backend in self.backends + ([self.fallback] if self.fallback else []):
+            try:
+                backend.llm.invoke(prompt, **kwargs)
+            except Exception as e:
+                log('warm_up_failed', level=logging.WARNING, backend=backend.name, error=str(e))
+
+    def close(self):
+        """
+        Stop the hedging threads; calls already running finish
+        """
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backends': [backend.stats() for backend in self.backends],
+                'fallback': self.fallback.stats() if self.fallback else None,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'fallbacks': self.fallbacks
+            }
@@ -1,47 +1,191 @@
 import os
-from flask import Flask, request, jsonify
+import json
+import logging
+import itertools
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from query_generator import generate_graphql_query
 
 load_dotenv()
 
+# Imported after load_dotenv() so .env settings reach the generator
+from query_generator import translate_query, translate_queries, batch_parallelism, stream_query, query_cache, conversation_store, backend_stats, persisted_queries, warm_up, admission
+from admission import BATCH, INTERACTIVE, AdmissionError, Ticket, socket_disconnected
+from telemetry import log, metrics_payload
+
+# Largest batch accepted by /api/llm/query/batch
+BATCH_MAX_SIZE = int(os.getenv('LLM_BATCH_MAX_SIZE', 1000))
+
+# Deadlines (milliseconds) for requests that do not send "deadline_ms"; 0 means none
+DEADLINE_MS = float(os.getenv('LLM_DEADLINE_MS', 60000))
+BATCH_DEADLINE_MS = float(os.getenv('LLM_BATCH_DEADLINE_MS', 0))
+
 app = Flask(__name__)
 CORS(app)
 
+def admission_ticket(data, default_priority, default_deadline_ms):
+    """
+    Admission ticket from the request's optional "priority" and "deadline_ms";
+    raises ValueError for values it cannot use
+    """
+    # The connection, to drop queued work once the client has gone away
+    sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+    deadline_ms = data.get('deadline_ms', default_deadline_ms)
+    if deadline_ms is not None and (isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms < 0):
+        raise ValueError('deadline_ms must be a non-negative number of milliseconds')
+    return Ticket.from_request(data.get('priority', default_priority), deadline_ms, lambda: socket_disconnected(sock))
+
+def shed_response(details):
+    """
+    429/503 response with Retry-After for a request admission control turned away
+    """
+    response = jsonify({'success': False, **details})
+    response.status_code = details['status']
+    response.headers['Retry-After'] = str(details['retry_after'])
+    return response
+
 @app.route('/api/llm/query', methods=['POST'])
 def process_query():
     try:
         data = request.json
         natural_language_query = data.get('query', '')
         conversation_history = data.get('history', [])
+        conversation_id = data.get('conversation_id')
         
         if not natural_language_query:
             return jsonify({'error': 'No query provided'}), 400
+        try:
+            ticket = admission_ticket(data, INTERACTIVE, DEADLINE_MS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        graphql_query = generate_graphql_query(natural_language_query, conversation_history)
+        result = translate_query(natural_language_query, conversation_history, conversation_id, ticket)
         
         return jsonify({
             'success': True,
-            'graphql_query': graphql_query,
-            'original_query': natural_language_query
+            **result,
+            'original_query': natural_language_query,
+            'conversation_id': conversation_id
+        })
+
+    except AdmissionError as e:
+        return shed_response(e.details())
+    except Exception as e:
+        log('request_error', level=logging.ERROR, exc_info=True, endpoint='query', error=str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/llm/query/batch', methods=['POST'])
+def process_query_batch():
+    try:
+        data = request.json
+        queries = data.get('queries', [])
+        parallelism = data.get('parallelism')
+
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'error': 'No queries provided'}), 400
+        if len(queries) > BATCH_MAX_SIZE:
+            return jsonify({'error': f'Batch too large (max {BATCH_MAX_SIZE} queries)'}), 400
+        try:
+            batch_parallelism(parallelism)
+            ticket = admission_ticket(data, BATCH, BATCH_DEADLINE_MS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        results = translate_queries(queries, parallelism, ticket)
+
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'failed': sum(1 for result in results if not result['success']),
+            'results': results
         })
-    
+
     except Exception as e:
-        print(f"ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log('request_error', level=logging.ERROR, exc_info=True, endpoint='query_batch', error=str(e))
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def sse_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+@app.route('/api/llm/query/stream', methods=['POST'])
+def process_query_stream():
+    data = request.json
+    natural_language_query = data.get('query', '')
+    conversation_history = data.get('history', [])
+    conversation_id = data.get('conversation_id')
+
+    if not natural_language_query:
+        return jsonify({'error': 'No query provided'}), 400
+    try:
+        ticket = admission_ticket(data, INTERACTIVE, DEADLINE_MS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Run up to the first event here, so a request turned away by admission
+    # control gets a 429/503 instead of an error event inside a 200 stream
+    events = stream_query(natural_language_query, conversation_history, conversation_id, ticket)
+    first = next(events)
+    if first['event'] == 'error' and 'retry_after' in first['data']:
+        return shed_response(first['data'])
+
+    def generate():
+        for event in itertools.chain([first], events):
+            if event['event'] == 'result':
+                event['data'] = {
+                    'success': True,
+                    **event['data'],
+                    'original_query': natural_language_query,
+                    'conversation_id': conversation_id
+                }
+            yield sse_event(event)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/llm/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(query_cache.stats())
+
+@app.route('/api/llm/cache', methods=['DELETE'])
+def clear_cache():
+    query_cache.clear()
+    return jsonify({'success': True})
+
+@app.route('/api/llm/conversation/<conversation_id>', methods=['DELETE'])
+def clear_conversation(conversation_id):
+    conversation_store.clear(conversation_id)
+    return jsonify({'success': True})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    body, content_type = metrics_payload()
+    return Response(body, content_type=content_type)
+
 @app.route('/api/llm/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'service': 'LLM Query Generator'})
+    return jsonify({
+        'status': 'healthy',
+        'service': 'LLM Query Generator',
+        'backends': backend_stats(),
+        'admission': admission.stats(),
+        'persisted_queries': persisted_queries.stats()
+    })
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
-    print(f'LLM Service starting on port {port}...')
-    app.run(host='0.0.0.0', port=port, debug=True)
+    log('starting', service='LLM Service', port=port)
+    # Load the model before accepting requests so the first user does not wait for it
+    warm_up()
+    # Debug mode reloads and serializes requests; opt in with FLASK_DEBUG=true
+    debug = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
+    app.run(host='0.0.0.0', port=port, debug=debug, threaded=True)
 
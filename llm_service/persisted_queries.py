@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process lock, fine for a single development process
+    fcntl = None
+from graphql import GraphQLError, parse, parse_type, value_from_ast
+from graphql.language import (
+    ArgumentNode, FieldNode, NameNode, OperationDefinitionNode, VariableDefinitionNode, VariableNode
+)
+from graphql.pyutils import Undefined
+from schema_validator import compact_print
+from telemetry import log
+
+# Persisted documents: every generated operation is canonicalized with its
+# literal arguments lifted into variables, so "Find alumni at Google" and
+# "Find alumni at Amazon" become one document,
+#   query GetAlumniByEmployer($Employer: String!) { getAlumniByEmployer(Employer: $Employer) { ... } }
+# with different variables. The document id is the SHA-256 of the document
+# text, the hash Apollo's automatic persisted queries use, and the registry
+# file lets the backend know the documents before any client sends them.
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'persisted_queries.json')
+
+# Canonical forms remembered per generated query string
+MAX_MEMOIZED_DOCUMENTS = 2048
+
+def document_id(document):
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+def _variable_name(argument_name, used):
+    name = argument_name
+    suffix = 2
+    while name in used:
+        name = f'{argument_name}{suffix}'
+        suffix += 1
+    used.add(name)
+    return name
+
+def canonicalize(query, schema):
+    """
+    (document, variables) for a generated operation, or None when it cannot be
+    persisted (NEED_INFO, unparsable, or not in the schema)
+    """
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+    operations = [d for d in document.definitions if isinstance(d, OperationDefinitionNode)]
+    if len(operations) != 1 or len(document.definitions) != 1 or operations[0].variable_definitions:
+        return None
+
+    operation = operations[0]
+    root = schema.mutation_type if operation.operation.value == 'mutation' else schema.query_type
+    if root is None:
+        return None
+
+    variables = {}
+    definitions = []
+    used = set()
+    for selection in operation.selection_set.selections:
+        field = root.fields.get(selection.name.value) if isinstance(selection, FieldNode) else None
+        if field is None:
+            return None
+        arguments = []
+        for argument in selection.arguments:
+            definition = field.args.get(argument.name.value)
+            if definition is None:
+                return None
+            value = value_from_ast(argument.value, definition.type)
+            if value is Undefined:
+                return None
+            name = _variable_name(argument.name.value, used)
+            variables[name] = value
+            definitions.append(VariableDefinitionNode(
+                variable=VariableNode(name=NameNode(value=name)),
+                type=parse_type(str(definition.type)),
+                directives=()
+            ))
+            arguments.append(ArgumentNode(name=argument.name, value=VariableNode(name=NameNode(value=name))))
+        selection.arguments = tuple(arguments)
+
+    # Named after the (first) root field, so the backend's logs show what ran
+    first = operation.selection_set.selections[0].name.value
+    operation.name = NameNode(value=first[0].upper() + first[1:])
+    operation.variable_definitions = tuple(definitions)
+    return compact_print(document), variables
+
+class PersistedQueryRegistry:
+    """
+    Document id -> document, mirrored to a JSON file the backend preloads.
+    The file is rewritten atomically (and merged with what other service
+    processes wrote, under a lock file) only when a new document appears,
+    which stops happening once every operation shape has been seen.
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self.documents = {}
+        self._canonical = {}
+        self._lock = threading.Lock()
+        self.documents.update(self._read())
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        # Held from read to replace, so gunicorn workers registering documents
+        # at the same time do not drop each other's entries
+        with open(self.path + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = {**self._read(), **self.documents}
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.persisted_queries.')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+        self.documents = merged
+
+    def persist(self, query, schema):
+        """
+        {'document_id', 'document', 'variables'} for a generated query, or None
+        """
+        canonical = self._canonical.get(query)
+        if canonical is None:
+            canonical = canonicalize(query, schema)
+            if canonical is None:
+                return None
+            document, variables = canonical
+            canonical = (document, document_id(document), json.dumps(variables))
+            if len(self._canonical) >= MAX_MEMOIZED_DOCUMENTS:
+                self._canonical = {}
+            self._canonical[query] = canonical
+
+        document, digest, variables = canonical
+        if digest not in self.documents:
+            with self._lock:
+                if digest not in self.documents:
+                    self.documents[digest] = document
+                    try:
+                        self._write()
+                        log('persisted_document', document_id=digest, document=document)
+                    except OSError as e:
+                        log('persisted_document_write_failed', level=logging.WARNING, error=str(e))
+        return {'document_id': digest, 'document': document, 'variables': json.loads(variables)}
+
+    def stats(self):
+        return {'documents': len(self.documents), 'path': self.path}
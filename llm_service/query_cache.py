@@ -0,0 +1,210 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from telemetry import log
+
+# Tokens that carry the "meaning" of a request: ids (EV2001, A1004), numbers,
+# dates, quoted strings and capitalized names (Google, Kansas City).
+LITERAL_PATTERN = re.compile(r'"[^"]*"|\'[^\']*\'|\b\w*\d\w*\b|\b[A-Z][\w-]*')
+# A capitalized first word is just the start of the sentence ("Show", "Find")
+SENTENCE_START = re.compile(r'^\s*[A-Z][a-z]*\b')
+
+# Embeddings of recent semantic misses, kept until the generated value is put
+MAX_PENDING_EMBEDDINGS = 256
+
+
+def normalize_text(text):
+    """
+    Normalize a message for cache lookups (case, whitespace, trailing punctuation).
+    Literal tokens keep their case: MongoDB matches Employer, Name and Tags
+    case-sensitively, so "Google" and "google" must not share a cached query.
+    """
+    text = re.sub(r'\s+', ' ', (text or '').strip()).rstrip(' ?!.')
+    start = SENTENCE_START.match(text)
+    head = start.group(0).lower() if start else ''
+    rest = text[len(head):]
+
+    parts = [head]
+    last = 0
+    for match in LITERAL_PATTERN.finditer(rest):
+        parts.append(rest[last:match.start()].lower())
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(rest[last:].lower())
+    return ''.join(parts)
+
+
+def literal_signature(text):
+    """
+    Collect the literal tokens of a message so near-duplicates that differ in an
+    id, a date or a company name (including its case) are never treated as the
+    same request
+    """
+    return frozenset(LITERAL_PATTERN.findall(SENTENCE_START.sub('', text or '')))
+
+
+def cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class CacheEntry:
+    __slots__ = ('value', 'created_at', 'embedding', 'signature')
+
+    def __init__(self, value, created_at, embedding=None, signature=None):
+        self.value = value
+        self.created_at = created_at
+        self.embedding = embedding
+        self.signature = signature
+
+
+class QueryCache:
+    """
+    LRU + TTL cache for generated GraphQL, keyed on the normalized query text and
+    the conversation context it was asked in.
+
+    When an embedding function is given, a miss on the exact key falls back to the
+    most similar cached query with the same context and the same literal tokens.
+    """
+
+    def __init__(self, max_size=1024, ttl=3600, embed_fn=None, similarity_threshold=0.95):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._pending_embeddings = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def make_key(self, query, context=''):
+        return (normalize_text(context), normalize_text(query))
+
+    def _is_expired(self, entry, now):
+        return self.ttl > 0 and now - entry.created_at > self.ttl
+
+    def _embed(self, query):
+        if self.embed_fn is None:
+            return None
+        try:
+            return self.embed_fn(normalize_text(query))
+        except Exception as e:
+            # Semantic matching is best effort; exact matching keeps working
+            log('cache_embedding_failed', level=logging.WARNING, error=str(e))
+            return None
+
+    def get(self, query, context=''):
+        """
+        Return the cached value for a query, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(query, context)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_expired(entry, now):
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+
+        embedding = self._embed(query)
+        if embedding is not None:
+            value = self._semantic_lookup(key[0], embedding, literal_signature(query), now)
+            if value is not None:
+                return value
+
+        with self._lock:
+            self.misses += 1
+            if embedding is not None:
+                # put() reuses it instead of embedding the same query again
+                self._pending_embeddings[key] = embedding
+                while len(self._pending_embeddings) > MAX_PENDING_EMBEDDINGS:
+                    self._pending_embeddings.popitem(last=False)
+        return None
+
+    def _semantic_lookup(self, context_key, embedding, signature, now):
+        # Snapshot the candidates under the lock and score them outside it,
+        # so the O(n) scan does not hold up other cache accesses
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if key[0] == context_key and entry.embedding is not None
+                and entry.signature == signature and not self._is_expired(entry, now)
+            ]
+
+        best_key, best_entry, best_score = None, None, self.similarity_threshold
+        for key, entry in candidates:
+            score = cosine_similarity(embedding, entry.embedding)
+            if score >= best_score:
+                best_key, best_entry, best_score = key, entry, score
+
+        if best_key is None:
+            return None
+
+        with self._lock:
+            if self._entries.get(best_key) is best_entry:
+                self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+        return best_entry.value
+
+    def put(self, query, value, context=''):
+        """
+        Store a generated value, evicting the least recently used entry when full
+        """
+        if not self.enabled:
+            return
+
+        key = self.make_key(query, context)
+        with self._lock:
+            embedding = self._pending_embeddings.pop(key, None)
+        if embedding is None:
+            embedding = self._embed(query)
+        entry = CacheEntry(value, time.monotonic(), embedding, literal_signature(query))
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending_embeddings.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'semantic': self.embed_fn is not None,
+                'hits': self.hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': (self.hits + self.semantic_hits) / lookups if lookups else 0.0
+            }
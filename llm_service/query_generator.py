@@ -1,10 +1,183 @@
-from langchain_ollama.llms import OllamaLLM
-from langchain_core.prompts import PromptTemplate
+from concurrent.futures import ThreadPoolExecutor
+from query_cache import QueryCache
+from intent_parser import fast_path_query
+from schema_validator import SchemaValidator, DEFAULT_SCHEMA_PATH
+from schema_slicer import SchemaSlicer
+from persisted_queries import PersistedQueryRegistry, DEFAULT_REGISTRY_PATH
+from query_pushdown import push_down
+from intent_schema import (
+    IntentError, intent_examples, intent_json_schema, operation_catalog, parse_intent, render_intent
+)
+from conversation_state import ConversationStore
+from llm_pool import LLMPool, Backend
+from admission import AdmissionController, AdmissionError
+from telemetry import RequestTrace, log, COALESCED, FALLBACK_WRAPS, VALIDATIONS
+from functools import lru_cache
+import asyncio
+import logging
 import re
 import os
+import threading
+import time
+
+def parse_keep_alive(value):
+    """
+    Ollama accepts a duration ("30m") or a number of seconds (-1 keeps the model loaded)
+    """
+    if not value:
+        return None
+    return int(value) if re.fullmatch(r'-?\d+', value) else value
+
+def create_backend_llm(spec):
+    """
+    Build one model backend from a spec: "model@http://host:11434", "http://host:11434",
+    a model name (on the default Ollama host) or "stub" for the offline fake model
+    """
+    if spec == 'stub':
+        from stub_llm import create_stub_llm
+        return create_stub_llm()
+
+    model, base_url = spec, None
+    if '@' in spec:
+        model, base_url = spec.rsplit('@', 1)
+    elif spec.startswith('http'):
+        model, base_url = None, spec
+    options = {
+        'model': model or os.getenv('OLLAMA_MODEL', 'mistral'),
+        'keep_alive': parse_keep_alive(os.getenv('OLLAMA_KEEP_ALIVE', '30m'))
+    }
+    if base_url:
+        options['base_url'] = base_url
+    # langchain is most of the service's import time, so it is only imported
+    # when the first Ollama client is built
+    from langchain_ollama.llms import OllamaLLM
+    return OllamaLLM(**options)
+
+def create_llm():
+    """
+    A single Ollama model, or an LLMPool when OLLAMA_BACKENDS lists several
+    backends or OLLAMA_FALLBACK_MODEL names a model for overload
+    """
+    specs = [spec.strip() for spec in os.getenv('OLLAMA_BACKENDS', '').split(',') if spec.strip()]
+    fallback_spec = os.getenv('OLLAMA_FALLBACK_MODEL', '').strip()
+    if len(specs) <= 1 and not fallback_spec:
+        return create_backend_llm(specs[0] if specs else os.getenv('OLLAMA_MODEL', 'mistral'))
+
+    specs = specs or [os.getenv('OLLAMA_MODEL', 'mistral')]
+    backends = [Backend(f'{index}:{spec}', create_backend_llm(spec)) for index, spec in enumerate(specs)]
+    fallback = Backend(f'fallback:{fallback_spec}', create_backend_llm(fallback_spec)) if fallback_spec else None
+
+    hedge_after = os.getenv('LLM_HEDGE_AFTER_MS', '').strip().lower()
+    if hedge_after and hedge_after != 'auto':
+        hedge_after = float(hedge_after) / 1000
+
+    return LLMPool(
+        backends,
+        fallback=fallback,
+        fallback_queue_depth=int(os.getenv('LLM_FALLBACK_QUEUE_DEPTH', 8)),
+        hedge_after=hedge_after or None,
+        failure_threshold=int(os.getenv('LLM_CIRCUIT_FAILURES', 3)),
+        cooldown=float(os.getenv('LLM_CIRCUIT_COOLDOWN', 30))
+    )
+
+# Ollama LLM (or a pool of them), kept resident between requests for OLLAMA_KEEP_ALIVE.
+# Built on first use by get_llm(), so importing this module stays cheap and a
+# pre-forking server does not share one client's connections between workers.
+llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """
+    The model client, created on first use
+    """
+    global llm
+    if llm is None:
+        with _llm_lock:
+            if llm is None:
+                llm = create_llm()
+    return llm
+
+def release_llm():
+    """
+    Drop the model client (and a pool's threads); the next request builds a new one.
+    A pre-forking server calls this in the master after warm-up.
+    """
+    global llm
+    with _llm_lock:
+        if isinstance(llm, LLMPool):
+            llm.close()
+        llm = None
+
+def create_query_cache():
+    """
+    Build the response cache from LLM_CACHE_* environment settings
+    """
+    embed_fn = None
+    if os.getenv('LLM_CACHE_SEMANTIC', 'false').lower() == 'true':
+        from langchain_ollama import OllamaEmbeddings
+        embeddings = OllamaEmbeddings(model=os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text'))
+        embed_fn = embeddings.embed_query
+
+    return QueryCache(
+        max_size=int(os.getenv('LLM_CACHE_SIZE', 1024)),
+        ttl=float(os.getenv('LLM_CACHE_TTL', 3600)),
+        embed_fn=embed_fn,
+        similarity_threshold=float(os.getenv('LLM_CACHE_SIMILARITY', 0.95))
+    )
+
+# Cache of generated queries (LLM_CACHE_SIZE=0 disables it)
+query_cache = create_query_cache()
+
+# Answer common request shapes without the LLM (LLM_FAST_PATH=false disables it)
+FAST_PATH_ENABLED = os.getenv('LLM_FAST_PATH', 'true').lower() == 'true'
+
+# Rewrite generated list queries that fetch a whole collection into filtered,
+# paginated searches when the message names a filter (LLM_FILTER_PUSHDOWN=false disables it)
+FILTER_PUSHDOWN_ENABLED = os.getenv('LLM_FILTER_PUSHDOWN', 'true').lower() == 'true'
+
+# Validate generated queries against the backend schema (LLM_SCHEMA_VALIDATION=false disables it)
+SCHEMA_VALIDATION_ENABLED = os.getenv('LLM_SCHEMA_VALIDATION', 'true').lower() == 'true'
+schema_validator = SchemaValidator(os.getenv('GRAPHQL_SCHEMA_PATH', DEFAULT_SCHEMA_PATH))
 
-# Initialize Ollama LLM
-llm = OllamaLLM(model=os.getenv('OLLAMA_MODEL', 'mistral'))
+# 'graphql' has the model write GraphQL text; 'intent' has it write a small JSON
+# intent (operation, arguments, fields) that is rendered into GraphQL here.
+# LLM_INTENT_FORMAT: 'schema' constrains decoding to the JSON schema of the
+# backend's operations, 'json' only to valid JSON, 'none' relies on the prompt.
+OUTPUT_MODE = os.getenv('LLM_OUTPUT_MODE', 'graphql').lower()
+INTENT_FORMAT = os.getenv('LLM_INTENT_FORMAT', 'schema').lower()
+
+# Return each query as a persisted document (literals lifted into variables,
+# SHA-256 id) and record it in the registry file the backend preloads
+# (LLM_PERSISTED_QUERIES=false disables it)
+PERSISTED_QUERIES_ENABLED = os.getenv('LLM_PERSISTED_QUERIES', 'true').lower() == 'true'
+persisted_queries = PersistedQueryRegistry(os.getenv('LLM_PERSISTED_QUERIES_PATH', DEFAULT_REGISTRY_PATH))
+
+# At most this many generations run against Ollama at once (per process)
+MAX_CONCURRENT_GENERATIONS = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+_generation_slots = None
+_inflight_generations = {}
+
+# Threaded server: model calls beyond MAX_CONCURRENT_GENERATIONS wait in a
+# queue of at most LLM_MAX_QUEUE requests, interactive ahead of batch, and are
+# turned away (429/503 with Retry-After) when it is full or their deadline
+# cannot be met (LLM_ADMISSION_CONTROL=false disables it)
+admission = AdmissionController(
+    max_active=MAX_CONCURRENT_GENERATIONS,
+    max_queue=int(os.getenv('LLM_MAX_QUEUE', 32)),
+    enabled=os.getenv('LLM_ADMISSION_CONTROL', 'true').lower() == 'true'
+)
+
+# Batch translation: default parallel model calls and the most a caller may ask for
+BATCH_PARALLELISM = int(os.getenv('LLM_BATCH_PARALLELISM', 4))
+BATCH_MAX_PARALLELISM = int(os.getenv('LLM_BATCH_MAX_PARALLELISM', 16))
+
+# Server-side conversation state for clients that send a conversation_id
+# instead of the full history; earlier turns are summarized within this many tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv('LLM_CONTEXT_TOKEN_BUDGET', 160))
+conversation_store = ConversationStore(
+    max_conversations=int(os.getenv('LLM_CONVERSATION_MAX', 10000)),
+    ttl=float(os.getenv('LLM_CONVERSATION_TTL', 3600))
+)
 
 # GraphQL Schema Context
 SCHEMA_CONTEXT = """
@@ -18,15 +191,17 @@ Available Types:
 5. Admin: _id, Admin_id, Username, Role, Email
 
 Available Queries:
-- getAlumni: Get all alumni
+- getAlumni: Get all alumni (only when no condition is given)
 - getAlumniById(id: ID!): Get alumni by MongoDB _id
 - getAlumniByAlumniId(Alumni_id: String!): Get alumni by Alumni_id
 - getAlumniByEmail(Email: String!): Get alumni by email
 - getAlumniByEmployer(Employer: String!): Get alumni by employer name
-- getEvents: Get all events
+- searchAlumni(filter: AlumniFilter, limit: Int, cursor: String): Alumni matching every filter field, one page of items at a time; filter fields: Name, Graduation_year, Graduation_year_from, Graduation_year_to, Field_of_study, Employer, Employment_title, Employment_status, City, State; select {{ items {{ fields }} nextCursor hasMore }}
+- getEvents: Get all events (only when no condition is given)
 - getEventById(id: ID!): Get event by MongoDB _id
 - getEventByEventId(Event_id: String!): Get event by Event_id
 - getEventsByDate(Date: String!): Get events by date
+- searchEvents(filter: EventFilter, limit: Int, cursor: String): Events matching every filter field, one page of items at a time; filter fields: Name, Location, Date, Date_from, Date_to (YYYY-MM-DD), Organizer_id; select {{ items {{ fields }} nextCursor hasMore }}
 - getReservations: Get all reservations
 - getReservationsByAlumni(Alumni_id: String!): Get reservations by alumni
 - getReservationsByEvent(Event_id: String!): Get reservations by event
@@ -85,8 +260,10 @@ Step 4: Generate mutation
 Query Examples:
 - "Find alumni at Google" -> query {{ getAlumniByEmployer(Employer: "Google") {{ Name Email Employment_title }} }}
 - "Show all events" -> query {{ getEvents {{ Event_id Name Date Location }} }}
-- "Who graduated in 2024?" -> query {{ getAlumni {{ Name Email Graduation_year }} }}
-- "Find alumni named John Smith" -> query {{ getAlumni {{ Name Email Graduation_year }} }}
+- "Who graduated in 2024?" -> query {{ searchAlumni(filter: {{ Graduation_year: 2024 }}, limit: 20) {{ items {{ Name Email Graduation_year }} nextCursor hasMore }} }}
+- "Find alumni named John Smith" -> query {{ searchAlumni(filter: {{ Name: "John Smith" }}, limit: 20) {{ items {{ Name Email Graduation_year }} nextCursor hasMore }} }}
+- "Alumni in Kansas City who studied Computer Science" -> query {{ searchAlumni(filter: {{ Field_of_study: "Computer Science", City: "Kansas City" }}, limit: 20) {{ items {{ Name Email Field_of_study }} nextCursor hasMore }} }}
+- "Events in Boston after 2026-01-01" -> query {{ searchEvents(filter: {{ Location: "Boston", Date_from: "2026-01-01" }}, limit: 20) {{ items {{ Event_id Name Date Location }} nextCursor hasMore }} }}
 - "Show all events happening on 2025-12-20" -> query {{ getEventsByDate(Date: "2025-12-20") {{ Event_id Name Date Location }} }}
 - "Get alumni who work at Microsoft" -> query {{ getAlumniByEmployer(Employer: "Microsoft") {{ Name Email Employment_title }} }}
 - "Retrieve event with id EV2001" -> query {{ getEventByEventId(Event_id: "EV2001") {{ Name Date Location }} }}
@@ -134,16 +311,50 @@ DELETE EXAMPLES:
 - "Delete alumni with id 65fb11aa" -> mutation {{ deleteAlumni(id: "65fb11aa") }}
 """
 
-# Create prompt template
-prompt_template = PromptTemplate(
-    input_variables=["query"],
-    template=SCHEMA_CONTEXT + """
+MESSAGE_SECTION = """
 
 User's Complete Message (may include context from previous messages): {query}
+"""
+
+TASK_SECTION = """
+TASK:
+1. Read the ENTIRE message above carefully
+2. Extract ALL information present (Name, Location, Date, Time, etc.)
+3. If creating event and have all 4 required fields (Name, Location, Date, Time): generate createEvent mutation
+4. If missing required fields: return "NEED_INFO: Please provide [missing fields]"
+5. For queries (not creating): generate appropriate query
 
+OUTPUT FORMAT:
+- Return ONLY the GraphQL query/mutation OR "NEED_INFO: [message]"
+- NO explanations, NO extra text, NO markdown
+- Use exact GraphQL syntax from examples above
+"""
+
+PROMPT_SUFFIX = MESSAGE_SECTION + TASK_SECTION
+
+INTENT_TASK_SECTION = """
 TASK:
 1. Read the ENTIRE message above carefully
 2. Extract ALL information present (Name, Location, Date, Time, etc.)
+3. If creating event and have all 4 required fields (Name, Location, Date, Time): answer the createEvent intent
+4. If missing required fields: answer {{"operation": "NEED_INFO", "missing": [missing fields]}}
+5. For queries (not creating): answer the matching query intent
+
+OUTPUT FORMAT:
+- Return ONLY one JSON object like the examples above
+- "arguments" uses the argument names from the schema; leave out "fields" unless specific fields were asked for
+- NO explanations, NO extra text, NO markdown
+"""
+
+INTENT_PROMPT_SUFFIX = MESSAGE_SECTION + INTENT_TASK_SECTION
+
+# Prefix layout: everything before the user message is identical between
+# requests, so Ollama can reuse the cached prompt prefix instead of re-evaluating it
+PREFIX_TASK_SECTION = """
+
+TASK:
+1. Read the ENTIRE user message at the end of this prompt carefully
+2. Extract ALL information present (Name, Location, Date, Time, etc.)
 3. If creating event and have all 4 required fields (Name, Location, Date, Time): generate createEvent mutation
 4. If missing required fields: return "NEED_INFO: Please provide [missing fields]"
 5. For queries (not creating): generate appropriate query
@@ -153,136 +364,772 @@ OUTPUT FORMAT:
 - NO explanations, NO extra text, NO markdown
 - Use exact GraphQL syntax from examples above
 """
+
+PREFIX_INTENT_TASK_SECTION = "\n" + INTENT_TASK_SECTION.replace(
+    'Read the ENTIRE message above', 'Read the ENTIRE user message at the end of this prompt'
 )
 
-def generate_graphql_query(natural_language_query, conversation_history=None):
+PREFIX_MESSAGE_SECTION = """
+User's Complete Message (may include context from previous messages): {query}
+"""
+
+# 'sliced' sends only the schema fragments and examples relevant to the message,
+# 'full' always sends the whole SCHEMA_CONTEXT
+PROMPT_MODE = os.getenv('LLM_PROMPT_MODE', 'sliced').lower()
+schema_slicer = SchemaSlicer(SCHEMA_CONTEXT)
+
+# Intent mode: the same context with every example answer written as its JSON intent
+INTENT_SCHEMA_CONTEXT = intent_examples(SCHEMA_CONTEXT)
+intent_slicer = SchemaSlicer(INTENT_SCHEMA_CONTEXT)
+
+# 'classic' puts the user message between the schema and the task instructions,
+# 'prefix' puts it last so the rest of the prompt is a byte-stable prefix
+PROMPT_LAYOUT = os.getenv('LLM_PROMPT_LAYOUT', 'classic').lower()
+
+# Warm-up generation at service start (LLM_WARMUP=false disables it)
+WARMUP_ENABLED = os.getenv('LLM_WARMUP', 'true').lower() == 'true'
+WARMUP_MESSAGE = 'Show all events'
+
+def estimate_tokens(text):
     """
-    Convert natural language query to GraphQL using LLM
+    Rough token count (about 4 characters per token for English prompts)
+    """
+    return (len(text) + 3) // 4
+
+def render_prompt(context):
+    """
+    Build the full prompt text sent to the LLM for a context
+    """
+    if OUTPUT_MODE == 'intent':
+        slicer, full_context, suffix = intent_slicer, INTENT_SCHEMA_CONTEXT, INTENT_PROMPT_SUFFIX
+    else:
+        slicer, full_context, suffix = schema_slicer, SCHEMA_CONTEXT, PROMPT_SUFFIX
+    schema_context = slicer.select(context) if PROMPT_MODE == 'sliced' else full_context
+    if PROMPT_LAYOUT == 'prefix':
+        return static_prefix(schema_context) + PREFIX_MESSAGE_SECTION.format(query=context)
+    # Same formatting PromptTemplate applies: {{ }} become braces, {query} is filled in
+    return (schema_context + suffix).format(query=context)
+
+@lru_cache(maxsize=64)
+def static_prefix(schema_context):
+    """
+    The part of a prefix-layout prompt that comes before the user message
+    """
+    task_section = PREFIX_INTENT_TASK_SECTION if OUTPUT_MODE == 'intent' else PREFIX_TASK_SECTION
+    return (schema_context + task_section).format()
+
+def generation_kwargs():
+    """
+    Extra model call arguments: in intent mode, Ollama's `format`, which
+    restricts sampling to tokens that keep the output valid JSON (or valid
+    against the intent schema)
+    """
+    if OUTPUT_MODE != 'intent' or INTENT_FORMAT == 'none':
+        return {}
+    schema = schema_validator.get_schema() if INTENT_FORMAT == 'schema' else None
+    return {'format': intent_json_schema(schema) if schema is not None else 'json'}
+
+def warm_up():
+    """
+    Load the model and prime Ollama's prompt cache with a one-token generation,
+    so the first user request pays neither the model load nor the prefix evaluation.
+    Returns the warm-up time in seconds, or None if skipped or failed.
     """
+    if not WARMUP_ENABLED:
+        return None
     try:
-        # Build context from conversation history
-        context = natural_language_query
-        if conversation_history and len(conversation_history) > 0:
-            # Get last few user messages to build context
-            recent_messages = []
-            for msg in conversation_history[-6:]:  # Last 3 exchanges
-                if msg.get('type') == 'user':
-                    recent_messages.append(msg.get('content', ''))
-            
-            if recent_messages:
-                context = ' '.join(recent_messages) + ' ' + natural_language_query
-        
-        print(f"\n=== CONTEXT SENT TO LLM ===")
-        print(f"{context}")
-        print(f"=== END CONTEXT ===\n")
-        
-        # Generate query using LLM
-        chain = prompt_template | llm
-        response = chain.invoke({"query": context})
-        
-        print(f"RAW LLM OUTPUT: {response}")
-        
-        # Clean up response
-        graphql_query = clean_graphql_response(response)
-        
-        print(f"CLEANED LLM OUTPUT: {graphql_query}")
-        
-        return graphql_query
-    
+        start = time.perf_counter()
+        model = get_llm()
+        if isinstance(model, LLMPool):
+            model.invoke_all(render_prompt(WARMUP_MESSAGE), options={'num_predict': 1}, **generation_kwargs())
+        else:
+            model.invoke(render_prompt(WARMUP_MESSAGE), options={'num_predict': 1}, **generation_kwargs())
+        elapsed = time.perf_counter() - start
+        log('warm_up', seconds=round(elapsed, 2), prompt_layout=PROMPT_LAYOUT, prompt_mode=PROMPT_MODE)
+        return elapsed
+    except Exception as e:
+        log('warm_up_failed', level=logging.WARNING, error=str(e))
+        return None
+
+def preload():
+    """
+    Build the read-only state every request needs (parsed schema, intent JSON
+    schema, static prompt text) and import the model client library, without
+    creating a client. A pre-forking server calls this once in the master so the
+    workers share the result copy-on-write instead of each building it.
+    """
+    start = time.perf_counter()
+    schema_validator.get_schema()
+    generation_kwargs()
+    render_prompt(WARMUP_MESSAGE)
+    # Pay the langchain import here, unless only the offline stub is configured
+    specs = {spec.strip() for spec in os.getenv('OLLAMA_BACKENDS', '').split(',') if spec.strip()}
+    if specs != {'stub'}:
+        import langchain_ollama.llms
+    elapsed = time.perf_counter() - start
+    log('preload', seconds=round(elapsed, 3))
+    return elapsed
+
+def backend_stats():
+    """
+    Routing statistics per backend when a pool is configured, otherwise None.
+    Never builds the client (health checks must not import langchain or undo
+    release_llm() in a pre-forking master); before the first model call it
+    reports {'status': 'not_initialized'}.
+    """
+    model = llm
+    if model is None:
+        return {'status': 'not_initialized'}
+    return model.stats() if isinstance(model, LLMPool) else None
+
+def build_history_context(conversation_history):
+    """
+    Join the user messages from the last few exchanges into one string
+    """
+    if not conversation_history:
+        return ''
+
+    recent_messages = []
+    for msg in conversation_history[-6:]:  # Last 3 exchanges
+        if msg.get('type') == 'user':
+            recent_messages.append(msg.get('content', ''))
+
+    return ' '.join(recent_messages)
+
+def resolve_history_context(natural_language_query, conversation_history, conversation_id):
+    """
+    History context for a turn: from the stored conversation state when the client
+    sent a conversation_id, otherwise from the history it sent
+    """
+    if conversation_id:
+        return conversation_store.begin_turn(conversation_id, natural_language_query, CONTEXT_TOKEN_BUDGET)
+    return build_history_context(conversation_history)
+
+def end_turn(conversation_id, result):
+    """
+    Record a finished translation: conversation state, and the persisted
+    document ('document_id', 'document', 'variables') added to the result
+    """
+    if conversation_id:
+        conversation_store.end_turn(conversation_id, result.get('graphql_query'))
+    if PERSISTED_QUERIES_ENABLED and 'validation_errors' not in result:
+        schema = schema_validator.get_schema()
+        persisted = persisted_queries.persist(result['graphql_query'], schema) if schema is not None else None
+        if persisted is not None:
+            result.update(persisted)
+
+def build_context(natural_language_query, history_context):
+    """
+    Combine earlier user messages with the new one into the text sent to the LLM
+    """
+    if history_context:
+        return history_context + ' ' + natural_language_query
+    return natural_language_query
+
+def lookup_query(natural_language_query, history_context):
+    """
+    Return a result that needs no model call (fast path or cache), or None
+    """
+    # Well-known request shapes are built directly, no model call needed
+    if FAST_PATH_ENABLED:
+        fast_query = fast_path_query(natural_language_query)
+        if fast_query is not None:
+            return {'graphql_query': fast_query, 'source': 'fast_path'}
+
+    cached_query = query_cache.get(natural_language_query, history_context)
+    if cached_query is not None:
+        return {'graphql_query': cached_query, 'source': 'cache'}
+
+    return None
+
+def finish_query(natural_language_query, history_context, response, prompt, trace):
+    """
+    Clean the raw LLM output (or render it, in intent mode), check it against the
+    schema and remember it for repeats. Invalid queries that could not be repaired
+    carry 'validation_errors' and are not cached.
+    """
+    result = {
+        'graphql_query': response.strip(),
+        'source': 'llm',
+        'prompt_chars': len(prompt),
+        'prompt_tokens': estimate_tokens(prompt)
+    }
+
+    with trace.stage('cleanup'):
+        try:
+            if OUTPUT_MODE == 'intent':
+                graphql_query, cleanup_path = render_intent_response(response)
+            else:
+                graphql_query, cleanup_path = clean_graphql_response_with_path(response)
+        except IntentError as e:
+            VALIDATIONS.labels('invalid').inc()
+            log('invalid_intent', level=logging.WARNING, raw_output=response, error=str(e))
+            result['validation_errors'] = [str(e)]
+            return result
+    trace.detail(raw_output=response, cleanup_path=cleanup_path)
+    if cleanup_path == 'wrapped':
+        FALLBACK_WRAPS.inc()
+    if FILTER_PUSHDOWN_ENABLED and graphql_query.startswith('query'):
+        with trace.stage('pushdown'):
+            pushed_query = push_down(natural_language_query, graphql_query)
+        if pushed_query is not None:
+            trace.detail(unpushed_query=graphql_query)
+            graphql_query = pushed_query
+            result['pushed_down'] = True
+    result['graphql_query'] = graphql_query
+
+    if SCHEMA_VALIDATION_ENABLED and not graphql_query.startswith('NEED_INFO'):
+        with trace.stage('validation'):
+            errors = schema_validator.validate(graphql_query)
+            repaired_query = schema_validator.repair(graphql_query) if errors else None
+        if errors:
+            if repaired_query is None:
+                VALIDATIONS.labels('invalid').inc()
+                log('invalid_output', level=logging.WARNING, graphql_query=graphql_query, errors=errors)
+                result['validation_errors'] = errors
+                return result
+            VALIDATIONS.labels('repaired').inc()
+            trace.detail(unrepaired_query=graphql_query)
+            result['graphql_query'] = repaired_query
+            result['repaired'] = True
+        else:
+            VALIDATIONS.labels('valid').inc()
+
+    query_cache.put(natural_language_query, result['graphql_query'], history_context)
+
+    return result
+
+def render_intent_response(response):
+    """
+    GraphQL for a JSON intent answer, with 'intent' as the cleanup path. Output
+    that is not JSON at all (LLM_INTENT_FORMAT=none and the model answered in
+    GraphQL) goes through the regular cleanup instead.
+    """
+    try:
+        intent = parse_intent(response)
+    except IntentError:
+        return clean_graphql_response_with_path(response)
+    schema = schema_validator.get_schema()
+    if schema is None:
+        raise IntentError('Backend schema is not available to render intents')
+    return render_intent(intent, schema), 'intent'
+
+def build_retry_context(context, result):
+    """
+    Re-prompt text for a query that failed schema validation
+    """
+    return (
+        f"{context}\n\n"
+        f"Your previous answer was not valid for this schema:\n{result['graphql_query']}\n"
+        f"Validation errors: {'; '.join(result['validation_errors'])}\n"
+        f"Use only the queries, mutations and fields listed above."
+    )
+
+def prepare_query(natural_language_query, conversation_history, conversation_id, trace):
+    """
+    First half of every translation: build the context, answer from the fast path
+    or cache when possible, otherwise render the prompt.
+    Returns (history_context, result, context, prompt); result is None when the model is needed.
+    """
+    with trace.stage('context_build'):
+        history_context = resolve_history_context(natural_language_query, conversation_history, conversation_id)
+        context = build_context(natural_language_query, history_context)
+
+    with trace.stage('lookup'):
+        result = lookup_query(natural_language_query, history_context)
+    if result is not None:
+        return history_context, result, context, None
+
+    with trace.stage('prompt_render'):
+        prompt = render_prompt(context)
+    trace.detail(context=context, prompt_mode=PROMPT_MODE, prompt_layout=PROMPT_LAYOUT)
+    return history_context, None, context, prompt
+
+def _retry_query(natural_language_query, history_context, context, result, ticket, trace):
+    """
+    Re-prompt once with the validation errors. When admission turns the retry
+    away, the first (invalid) answer is returned with its validation_errors.
+    """
+    prompt = render_prompt(build_retry_context(context, result))
+    try:
+        with admission.slot(ticket, trace), trace.stage('model_retry'):
+            response = get_llm().invoke(prompt, **generation_kwargs())
+    except AdmissionError as e:
+        trace.detail(retry_skipped=e.reason)
+        return result
+    return finish_query(natural_language_query, history_context, response, prompt, trace)
+
+def translate_query(natural_language_query, conversation_history=None, conversation_id=None, ticket=None):
+    """
+    Convert natural language query to GraphQL and report where the answer came from
+    ('fast_path', 'cache' or 'llm'). The model call is admitted with the
+    request's admission Ticket (priority, deadline, client connection);
+    AdmissionError is raised when it is turned away.
+    """
+    trace = RequestTrace('sync')
+    try:
+        history_context, result, context, prompt = prepare_query(
+            natural_language_query, conversation_history, conversation_id, trace
+        )
+
+        if result is None:
+            # Generate query using LLM
+            with admission.slot(ticket, trace), trace.stage('model_invoke'):
+                response = get_llm().invoke(prompt, **generation_kwargs())
+            result = finish_query(natural_language_query, history_context, response, prompt, trace)
+
+            # Re-prompt once with the validation errors
+            if 'validation_errors' in result:
+                result = _retry_query(natural_language_query, history_context, context, result, ticket, trace)
+
+        end_turn(conversation_id, result)
+        trace.finish(result)
+        return result
+
+    except AdmissionError:
+        raise
+    except Exception as e:
+        trace.fail(e)
+        raise Exception(f"Error generating GraphQL query: {str(e)}")
+
+async def _ainvoke_llm(prompt):
+    global _generation_slots
+    # Created lazily so it binds to the server's running event loop
+    if _generation_slots is None:
+        _generation_slots = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
+    async with _generation_slots:
+        return await get_llm().ainvoke(prompt, **generation_kwargs())
+
+async def _coalesced_generation(key, prompt):
+    """
+    Run one generation per distinct prompt; concurrent identical prompts share it
+    """
+    task = _inflight_generations.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_ainvoke_llm(prompt))
+        _inflight_generations[key] = task
+
+        def _forget(done_task):
+            if _inflight_generations.get(key) is done_task:
+                del _inflight_generations[key]
+
+        task.add_done_callback(_forget)
+    else:
+        COALESCED.inc()
+
+    # Shielded so one caller giving up does not cancel the others
+    return await asyncio.shield(task)
+
+async def atranslate_query(natural_language_query, conversation_history=None, conversation_id=None):
+    """
+    Async version of translate_query for the asyncio server. The cache
+    lookup (embedding call), validation and registry write block, so
+    prepare_query, finish_query and end_turn run in a worker thread.
+    """
+    trace = RequestTrace('async')
+    try:
+        history_context, result, context, prompt = await asyncio.to_thread(
+            prepare_query, natural_language_query, conversation_history, conversation_id, trace
+        )
+
+        if result is None:
+            key = query_cache.make_key(natural_language_query, history_context)
+            with trace.stage('model_invoke'):
+                response = await _coalesced_generation(key, prompt)
+            result = await asyncio.to_thread(finish_query, natural_language_query, history_context, response, prompt, trace)
+
+            # Re-prompt once with the validation errors
+            if 'validation_errors' in result:
+                prompt = render_prompt(build_retry_context(context, result))
+                with trace.stage('model_retry'):
+                    response = await _ainvoke_llm(prompt)
+                result = await asyncio.to_thread(finish_query, natural_language_query, history_context, response, prompt, trace)
+
+        await asyncio.to_thread(end_turn, conversation_id, result)
+        trace.finish(result)
+        return result
+
     except Exception as e:
+        trace.fail(e)
         raise Exception(f"Error generating GraphQL query: {str(e)}")
 
+# Operation name at the start of a (possibly partial) query, complete once it is
+# followed by arguments, a selection set or whitespace
+OPERATION_PATTERN = re.compile(r'\b(query|mutation)\s*\{\s*([A-Za-z_]\w*)[\s({]', re.IGNORECASE)
+# Same for a JSON intent, complete once the closing quote has arrived
+INTENT_OPERATION_PATTERN = re.compile(r'"operation"\s*:\s*"([A-Za-z_]\w*)"')
+
+def detect_operation(text):
+    """
+    Recognize the operation in (partial) LLM output, e.g.
+    {'operation_type': 'query', 'operation': 'getAlumniByEmployer'}
+    """
+    if re.match(r'[\s`]*(?:graphql\s*)?NEED_INFO', text, re.IGNORECASE):
+        return {'operation_type': 'need_info', 'operation': None}
+
+    match = INTENT_OPERATION_PATTERN.search(text) if OUTPUT_MODE == 'intent' else None
+    if match:
+        name = match.group(1)
+        if name.upper() == 'NEED_INFO':
+            return {'operation_type': 'need_info', 'operation': None}
+        schema = schema_validator.get_schema()
+        operation = operation_catalog(schema).get(name) if schema is not None else None
+        if operation is not None:
+            return {'operation_type': operation['type'], 'operation': name}
+
+    match = OPERATION_PATTERN.search(text)
+    if not match:
+        return None
+
+    name = match.group(2)
+    if '_' in name:
+        # SCREAMING_SNAKE_CASE names are fixed the same way clean_graphql_response does
+        parts = name.lower().split('_')
+        name = parts[0] + ''.join(part.capitalize() for part in parts[1:])
+    return {'operation_type': match.group(1).lower(), 'operation': name}
+
+def _lookup_events(result):
+    events = []
+    intent = detect_operation(result['graphql_query'])
+    if intent:
+        events.append({'event': 'intent', 'data': intent})
+    events.append({'event': 'result', 'data': result})
+    return events
+
+def stream_query(natural_language_query, conversation_history=None, conversation_id=None, ticket=None):
+    """
+    Generate GraphQL token by token, yielding events:
+    'token' for each LLM chunk, 'intent' once the operation is recognizable,
+    then 'result' with the cleaned query (or 'error'; with status and
+    retry_after when admission turned the request away)
+    """
+    trace = RequestTrace('stream')
+    try:
+        history_context, result, context, prompt = prepare_query(
+            natural_language_query, conversation_history, conversation_id, trace
+        )
+        if result is not None:
+            end_turn(conversation_id, result)
+            trace.finish(result)
+            yield from _lookup_events(result)
+            return
+
+        chunks = []
+        intent = None
+        with admission.slot(ticket, trace), trace.stage('model_invoke'):
+            for chunk in get_llm().stream(prompt, **generation_kwargs()):
+                if not chunks:
+                    trace.observe('first_token', time.perf_counter() - trace.start)
+                chunks.append(chunk)
+                yield {'event': 'token', 'data': {'text': chunk}}
+                if intent is None:
+                    intent = detect_operation(''.join(chunks))
+                    if intent:
+                        yield {'event': 'intent', 'data': intent}
+
+        result = finish_query(natural_language_query, history_context, ''.join(chunks), prompt, trace)
+        if 'validation_errors' in result:
+            result = _retry_query(natural_language_query, history_context, context, result, ticket, trace)
+        if intent is None:
+            intent = detect_operation(result['graphql_query'])
+            if intent:
+                yield {'event': 'intent', 'data': intent}
+        end_turn(conversation_id, result)
+        trace.finish(result)
+        yield {'event': 'result', 'data': result}
+
+    except AdmissionError as e:
+        yield {'event': 'error', 'data': e.details()}
+    except Exception as e:
+        trace.fail(e)
+        yield {'event': 'error', 'data': {'error': f"Error generating GraphQL query: {str(e)}"}}
+
+async def astream_query(natural_language_query, conversation_history=None, conversation_id=None):
+    """
+    Async version of stream_query; streams share the LLM_MAX_CONCURRENCY limit
+    """
+    global _generation_slots
+    trace = RequestTrace('async_stream')
+    try:
+        history_context, result, context, prompt = await asyncio.to_thread(
+            prepare_query, natural_language_query, conversation_history, conversation_id, trace
+        )
+        if result is not None:
+            await asyncio.to_thread(end_turn, conversation_id, result)
+            trace.finish(result)
+            for event in _lookup_events(result):
+                yield event
+            return
+
+        if _generation_slots is None:
+            _generation_slots = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
+        chunks = []
+        intent = None
+        with trace.stage('model_invoke'):
+            async with _generation_slots:
+                async for chunk in get_llm().astream(prompt, **generation_kwargs()):
+                    if not chunks:
+                        trace.observe('first_token', time.perf_counter() - trace.start)
+                    chunks.append(chunk)
+                    yield {'event': 'token', 'data': {'text': chunk}}
+                    if intent is None:
+                        intent = detect_operation(''.join(chunks))
+                        if intent:
+                            yield {'event': 'intent', 'data': intent}
+
+        result = await asyncio.to_thread(finish_query, natural_language_query, history_context, ''.join(chunks), prompt, trace)
+        if 'validation_errors' in result:
+            prompt = render_prompt(build_retry_context(context, result))
+            with trace.stage('model_retry'):
+                response = await _ainvoke_llm(prompt)
+            result = await asyncio.to_thread(finish_query, natural_language_query, history_context, response, prompt, trace)
+        if intent is None:
+            intent = detect_operation(result['graphql_query'])
+            if intent:
+                yield {'event': 'intent', 'data': intent}
+        await asyncio.to_thread(end_turn, conversation_id, result)
+        trace.finish(result)
+        yield {'event': 'result', 'data': result}
+
+    except Exception as e:
+        trace.fail(e)
+        yield {'event': 'error', 'data': {'error': f"Error generating GraphQL query: {str(e)}"}}
+
+def _batch_item(entry):
+    """
+    (query, history) for one batch entry; raises ValueError for one that cannot be translated
+    """
+    if isinstance(entry, dict):
+        query, history = entry.get('query'), entry.get('history')
+    else:
+        query, history = entry, None
+    if not query:
+        raise ValueError('No query provided')
+    if not isinstance(query, str):
+        raise ValueError('query must be a string')
+    if history is not None and not (isinstance(history, list) and all(
+            isinstance(msg, dict) and isinstance(msg.get('content', ''), str) for msg in history)):
+        raise ValueError('history must be a list of {type, content} messages')
+    return query, history
+
+def _batch_items(queries):
+    """
+    Normalize batch input (strings or {'query', 'history'} dicts) and group duplicates.
+    Returns the items as (original query, history, error) and a map of dedupe
+    key -> input positions; invalid entries are kept apart, each with its error.
+    """
+    items = []
+    positions = {}
+    for index, entry in enumerate(queries):
+        try:
+            query, history = _batch_item(entry)
+            items.append((query, history, None))
+            key = query_cache.make_key(query, build_history_context(history))
+        except ValueError as e:
+            items.append((entry.get('query') if isinstance(entry, dict) else entry, None, str(e)))
+            key = ('invalid', index)
+        positions.setdefault(key, []).append(index)
+    return items, positions
+
+def batch_parallelism(parallelism):
+    """
+    Parallel translations for a batch (LLM_BATCH_PARALLELISM when not given);
+    raises ValueError unless it is an integer from 1 to LLM_BATCH_MAX_PARALLELISM
+    """
+    if parallelism is None:
+        return min(max(1, BATCH_PARALLELISM), BATCH_MAX_PARALLELISM)
+    if isinstance(parallelism, bool) or not isinstance(parallelism, int) \
+            or not 1 <= parallelism <= BATCH_MAX_PARALLELISM:
+        raise ValueError(f'parallelism must be an integer from 1 to {BATCH_MAX_PARALLELISM}')
+    return parallelism
+
+def _can_retry_admission(error, ticket):
+    """
+    Whether a batch item turned away with a 429 can wait Retry-After and try again
+    """
+    if error.status != 429 or ticket is None or ticket.client_gone():
+        return False
+    remaining = ticket.remaining(time.monotonic())
+    return remaining is None or remaining > error.retry_after
+
+def translate_queries(queries, parallelism=None, ticket=None):
+    """
+    Translate many natural language queries at once. Duplicates are generated once,
+    the fast path and cache are used where possible, the rest run in parallel.
+    Results come back in input order; a failed item does not abort the batch.
+    Every model call is admitted with the batch's ticket; items turned away
+    because the queue is full are retried after Retry-After, as long as the
+    batch's deadline allows and its client is still connected.
+    """
+    items, positions = _batch_items(queries)
+    results = [None] * len(items)
+
+    def run(indexes):
+        query, history, error = items[indexes[0]]
+        while True:
+            try:
+                if error:
+                    raise ValueError(error)
+                result = {'success': True, **translate_query(query, history, ticket=ticket)}
+            except AdmissionError as e:
+                if _can_retry_admission(e, ticket):
+                    time.sleep(e.retry_after)
+                    continue
+                result = {'success': False, 'error': str(e), 'retry_after': e.retry_after}
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            return indexes, result
+
+    with ThreadPoolExecutor(max_workers=batch_parallelism(parallelism)) as executor:
+        for indexes, result in executor.map(run, positions.values()):
+            for index in indexes:
+                results[index] = dict(result, original_query=items[index][0])
+
+    return results
+
+async def atranslate_queries(queries, parallelism=None):
+    """
+    Async version of translate_queries
+    """
+    items, positions = _batch_items(queries)
+    results = [None] * len(items)
+    slots = asyncio.Semaphore(batch_parallelism(parallelism))
+
+    async def run(indexes):
+        query, history, error = items[indexes[0]]
+        async with slots:
+            try:
+                if error:
+                    raise ValueError(error)
+                result = {'success': True, **(await atranslate_query(query, history))}
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+        for index in indexes:
+            results[index] = dict(result, original_query=items[index][0])
+
+    await asyncio.gather(*(run(indexes) for indexes in positions.values()))
+    return results
+
+def generate_graphql_query(natural_language_query, conversation_history=None):
+    """
+    Convert natural language query to GraphQL using LLM
+    """
+    return translate_query(natural_language_query, conversation_history)['graphql_query']
+
+# Fix common LLM mistakes: SCREAMING_SNAKE_CASE names -> correct camelCase query names
+QUERY_NAME_FIXES = [
+    ('GET_ALUMNI_BY_EMPLOYER', 'getAlumniByEmployer'),
+    ('GET_ALUMNI_BY_ID', 'getAlumniById'),
+    ('GET_ALUMNI_BY_ALUMNI_ID', 'getAlumniByAlumniId'),
+    ('GET_ALUMNI_BY_EMAIL', 'getAlumniByEmail'),
+    ('GET_ALUMNI', 'getAlumni'),
+    ('GET_EVENTS_BY_DATE', 'getEventsByDate'),
+    ('GET_EVENT_BY_ID', 'getEventById'),
+    ('GET_EVENT_BY_EVENT_ID', 'getEventByEventId'),
+    ('GET_EVENTS', 'getEvents'),
+    ('GET_RESERVATIONS_BY_ALUMNI', 'getReservationsByAlumni'),
+    ('GET_RESERVATIONS_BY_EVENT', 'getReservationsByEvent'),
+    ('GET_RESERVATION_BY_ID', 'getReservationById'),
+    ('GET_RESERVATIONS', 'getReservations'),
+    ('GET_PHOTOS_BY_EVENT', 'getPhotosByEvent'),
+    ('GET_PHOTOS_BY_ALUMNI', 'getPhotosByAlumni'),
+    ('GET_PHOTOS_BY_TAGS', 'getPhotosByTags'),
+    ('GET_PHOTO_BY_ID', 'getPhotoById'),
+    ('GET_PHOTOS', 'getPhotos'),
+    ('GET_ADMIN_BY_ID', 'getAdminById'),
+    ('GET_ADMINS', 'getAdmins'),
+    ('CREATE_ALUMNI', 'createAlumni'),
+    ('UPDATE_ALUMNI', 'updateAlumni'),
+    ('DELETE_ALUMNI', 'deleteAlumni'),
+    ('CREATE_EVENT', 'createEvent'),
+    ('UPDATE_EVENT', 'updateEvent'),
+    ('DELETE_EVENT', 'deleteEvent'),
+    ('CREATE_RESERVATION', 'createReservation'),
+    ('UPDATE_RESERVATION', 'updateReservation'),
+    ('DELETE_RESERVATION', 'deleteReservation'),
+]
+
+# One capture group per name, so group N+1 (after the fixed groups) is fix N
+_NAME_ALTERNATION = r'\b(?:' + '|'.join(f'({name})' for name, _ in QUERY_NAME_FIXES) + r')\b'
+
+# Patterns compiled once at import instead of on every call
+CODE_FENCE_PATTERN = re.compile(r'```graphql\s*')
+BARE_FENCE_PATTERN = re.compile(r'```\s*')
+NAME_FIX_PATTERN = re.compile(_NAME_ALTERNATION, re.IGNORECASE)
+# Whitespace runs, escaped quotes and operation names are disjoint token classes,
+# so one scan does what the separate substitutions used to
+REWRITE_PATTERN = re.compile(r'(\s+)|\\(["\'])|' + _NAME_ALTERNATION, re.IGNORECASE)
+NEED_INFO_PATTERN = re.compile(r'NEED_INFO:\s*(.+?)(?:\n|"|$)', re.IGNORECASE)
+PLEASE_PROVIDE_PATTERN = re.compile(r'please provide\s+(.+?)(?:\.|$)', re.IGNORECASE)
+OPERATION_BLOCK_PATTERN = re.compile(r'(query|mutation)\s*\{.+', re.DOTALL | re.IGNORECASE)
+
+def _fix_name(match):
+    return QUERY_NAME_FIXES[match.lastindex - 1][1]
+
+def _rewrite_token(match):
+    group = match.lastindex
+    if group == 1:
+        return ' '
+    if group == 2:
+        return match.group(2)
+    return QUERY_NAME_FIXES[group - 3][1]
+
+def _balance_braces(query):
+    missing = query.count('{') - query.count('}')
+    if missing > 0:
+        query += ' }' * missing
+    return query
+
 def clean_graphql_response(response):
     """
     Extract and clean the GraphQL query from LLM response
     """
+    return clean_graphql_response_with_path(response)[0]
+
+def clean_graphql_response_with_path(response):
+    """
+    clean_graphql_response that also reports which path produced the result:
+    'need_info', 'direct' (output started with query/mutation), 'extracted'
+    (operation found inside other text) or 'wrapped' (last resort)
+    """
     # Remove any markdown code blocks and backticks
-    response = re.sub(r'```graphql\s*', '', response)
-    response = re.sub(r'```\s*', '', response)
-    response = response.replace('`', '')  # Remove stray backticks
+    if '`' in response:
+        response = CODE_FENCE_PATTERN.sub('', response)
+        response = BARE_FENCE_PATTERN.sub('', response)
+        response = response.replace('`', '')  # Remove stray backticks
     response = response.strip()
-    
-    # Fix common LLM mistakes: convert SCREAMING_SNAKE_CASE to correct camelCase query names
-    query_name_fixes = {
-        r'\bGET_ALUMNI_BY_EMPLOYER\b': 'getAlumniByEmployer',
-        r'\bGET_ALUMNI_BY_ID\b': 'getAlumniById',
-        r'\bGET_ALUMNI_BY_ALUMNI_ID\b': 'getAlumniByAlumniId',
-        r'\bGET_ALUMNI_BY_EMAIL\b': 'getAlumniByEmail',
-        r'\bGET_ALUMNI\b': 'getAlumni',
-        r'\bGET_EVENTS_BY_DATE\b': 'getEventsByDate',
-        r'\bGET_EVENT_BY_ID\b': 'getEventById',
-        r'\bGET_EVENT_BY_EVENT_ID\b': 'getEventByEventId',
-        r'\bGET_EVENTS\b': 'getEvents',
-        r'\bGET_RESERVATIONS_BY_ALUMNI\b': 'getReservationsByAlumni',
-        r'\bGET_RESERVATIONS_BY_EVENT\b': 'getReservationsByEvent',
-        r'\bGET_RESERVATION_BY_ID\b': 'getReservationById',
-        r'\bGET_RESERVATIONS\b': 'getReservations',
-        r'\bGET_PHOTOS_BY_EVENT\b': 'getPhotosByEvent',
-        r'\bGET_PHOTOS_BY_ALUMNI\b': 'getPhotosByAlumni',
-        r'\bGET_PHOTOS_BY_TAGS\b': 'getPhotosByTags',
-        r'\bGET_PHOTO_BY_ID\b': 'getPhotoById',
-        r'\bGET_PHOTOS\b': 'getPhotos',
-        r'\bGET_ADMIN_BY_ID\b': 'getAdminById',
-        r'\bGET_ADMINS\b': 'getAdmins',
-        r'\bCREATE_ALUMNI\b': 'createAlumni',
-        r'\bUPDATE_ALUMNI\b': 'updateAlumni',
-        r'\bDELETE_ALUMNI\b': 'deleteAlumni',
-        r'\bCREATE_EVENT\b': 'createEvent',
-        r'\bUPDATE_EVENT\b': 'updateEvent',
-        r'\bDELETE_EVENT\b': 'deleteEvent',
-        r'\bCREATE_RESERVATION\b': 'createReservation',
-        r'\bUPDATE_RESERVATION\b': 'updateReservation',
-        r'\bDELETE_RESERVATION\b': 'deleteReservation',
-    }
-    
-    for pattern, replacement in query_name_fixes.items():
-        response = re.sub(pattern, replacement, response, flags=re.IGNORECASE)
-    
-    # If response is asking for info, extract just the NEED_INFO message
-    if 'NEED_INFO' in response.upper() or 'PLEASE PROVIDE' in response.upper():
+
+    # If response is asking for info, extract just the NEED_INFO message.
+    # Name fixes never add or remove these phrases, so checking first is safe.
+    upper = response.upper()
+    if 'NEED_INFO' in upper or 'PLEASE PROVIDE' in upper:
+        response = NAME_FIX_PATTERN.sub(_fix_name, response)
         # Extract the actual message
-        match = re.search(r'NEED_INFO:\s*(.+?)(?:\n|"|$)', response, re.IGNORECASE)
+        match = NEED_INFO_PATTERN.search(response)
         if match:
-            return f"NEED_INFO: {match.group(1).strip()}"
+            return f"NEED_INFO: {match.group(1).strip()}", 'need_info'
         # Fallback: look for "please provide"
-        match = re.search(r'please provide\s+(.+?)(?:\.|$)', response, re.IGNORECASE)
+        match = PLEASE_PROVIDE_PATTERN.search(response)
         if match:
-            return f"NEED_INFO: Please provide {match.group(1).strip()}"
-        return "NEED_INFO: Please provide more information"
-    
-    # Clean up whitespace
-    response = re.sub(r'\s+', ' ', response)
-    
-    # Remove escaped quotes
-    response = response.replace('\\"', '"')
-    response = response.replace("\\'", "'")
-    
-    # If response starts with query/mutation, validate and return
+            return f"NEED_INFO: Please provide {match.group(1).strip()}", 'need_info'
+        return "NEED_INFO: Please provide more information", 'need_info'
+
+    # Fix operation names, clean up whitespace and remove escaped quotes in one pass
+    response = REWRITE_PATTERN.sub(_rewrite_token, response)
+
+    # If response starts with query/mutation, balance braces and return
     if response.lower().startswith(('query', 'mutation')):
-        # Count braces to ensure they're balanced
-        open_braces = response.count('{')
-        close_braces = response.count('}')
-        
-        # Add missing closing braces
-        if open_braces > close_braces:
-            response += ' }' * (open_braces - close_braces)
-        
-        return response.strip()
-    
+        return _balance_braces(response).strip(), 'direct'
+
     # Try to find query or mutation block
-    match = re.search(r'(query|mutation)\s*\{.+', response, re.DOTALL | re.IGNORECASE)
-    
+    match = OPERATION_BLOCK_PATTERN.search(response)
     if match:
-        query = match.group(0)
-        # Balance braces
-        open_braces = query.count('{')
-        close_braces = query.count('}')
-        if open_braces > close_braces:
-            query += ' }' * (open_braces - close_braces)
-        return query.strip()
-    
+        return _balance_braces(match.group(0)).strip(), 'extracted'
+
     # Last resort: wrap in query
-    return f"query {{ {response.strip()} }}"
+    return f"query {{ {response.strip()} }}", 'wrapped'
 
 # Test function
 if __name__ == '__main__':
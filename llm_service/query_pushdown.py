@@ -0,0 +1,136 @@
+import re
+from graphql import GraphQLError, parse
+from graphql.language import FieldNode, OperationDefinitionNode
+from graphql.utilities import value_from_ast_untyped
+from graphql_builder import DEFAULT_PAGE_SIZE, PAGED_OPERATIONS, render_operation
+
+# Filter pushdown: list queries that fetch a whole collection ("Who graduated
+# in 2024?" answered with a bare getAlumni) are rewritten into the paginated
+# searchAlumni/searchEvents with the predicates found in the message, so
+# MongoDB filters and limits instead of the client.
+
+YEAR = r'(?P<year>(?:19|20)\d{2})'
+DATE = r'(\d{4}-\d{2}-\d{2})'
+# Names, places and fields of study must be capitalized ("John Smith", "Kansas City")
+PROPER = r'((?-i:[A-Z][\w.\'&-]*(?:\s+(?:of\s+|and\s+|&\s+)?[A-Z][\w.\'&-]*)*))'
+# US state (and DC) abbreviations, so "in IT" or "from HR" is not taken for one
+US_STATES = (
+    'AL AK AZ AR CA CO CT DE DC FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH '
+    'NJ NM NY NC ND OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY'
+).split()
+STATE = rf'(?P<state>(?-i:{"|".join(US_STATES)}))'
+# Capitalized words after "in"/"at" that are not places: months, days, seasons,
+# times of day, quarters, and short all-caps words ("IT", "HR", "AI", "Q1");
+# a state abbreviation is only taken after a city ("Denver, CO") or by STATE
+NOT_PLACE_WORDS = (
+    'the January February March April May June July August September October November December '
+    'Monday Tuesday Wednesday Thursday Friday Saturday Sunday Today Tomorrow Tonight Weekend '
+    'Spring Summer Fall Autumn Winter Noon Midnight Morning Afternoon Evening Night Quarter'
+).split()
+NOT_PLACE = rf'(?!(?:{"|".join(NOT_PLACE_WORDS)})\b)(?!(?-i:[A-Z][A-Z0-9]{{0,3}})\b)'
+
+def _year(match, offset=0):
+    return int(match.group('year')) + offset
+
+# (pattern, filter fields) per entity; searched anywhere in the message
+ALUMNI_PREDICATES = [
+    (rf'\b(?:graduated|graduating|graduates?|grads?)\s+(?:in\s+|of\s+)?{YEAR}\b',
+     lambda m: {'Graduation_year': _year(m)}),
+    (rf'\bclass\s+of\s+{YEAR}\b', lambda m: {'Graduation_year': _year(m)}),
+    (rf'\bgraduated\s+(?:after|since)\s+{YEAR}\b',
+     lambda m: {'Graduation_year_from': _year(m, 0 if 'since' in m.group(0).lower() else 1)}),
+    (rf'\bgraduated\s+before\s+{YEAR}\b', lambda m: {'Graduation_year_to': _year(m, -1)}),
+    (rf'\bgraduated\s+between\s+(?P<year>(?:19|20)\d{{2}})\s+and\s+(?P<to>(?:19|20)\d{{2}})\b',
+     lambda m: {'Graduation_year_from': _year(m), 'Graduation_year_to': int(m.group('to'))}),
+    (rf'\b(?:named|called)\s+["\']?{PROPER}', lambda m: {'Name': m.group(1)}),
+    (rf'\b(?:studied|majored\s+in|majoring\s+in|major\s+in|degrees?\s+in)\s+{PROPER}',
+     lambda m: {'Field_of_study': m.group(1)}),
+    (rf'\b(?:live|lives|living|located|based|working|work|works)\s+in\s+{NOT_PLACE}{PROPER}(?:,\s*{STATE})?\b',
+     lambda m: {'City': m.group(1), **({'State': m.group('state')} if m.group('state') else {})}),
+    (rf'\b(?:in|from)\s+(?:the\s+state\s+of\s+)?{STATE}\b', lambda m: {'State': m.group('state')}),
+    (rf'\b(?:working|work|works|employed)\s+(?:at|for|by)\s+{PROPER}', lambda m: {'Employer': m.group(1)}),
+]
+
+EVENT_PREDICATES = [
+    (rf'\bon\s+{DATE}', lambda m: {'Date': m.group(1)}),
+    (rf'\b(?:after|since|from)\s+{DATE}', lambda m: {'Date_from': m.group(1)}),
+    (rf'\b(?:before|until|through|to)\s+{DATE}', lambda m: {'Date_to': m.group(1)}),
+    (rf'\bbetween\s+{DATE}\s+and\s+{DATE}', lambda m: {'Date_from': m.group(1), 'Date_to': m.group(2)}),
+    (rf'\b(?:in|at)\s+{NOT_PLACE}{PROPER}', lambda m: {'Location': m.group(1)}),
+    (rf'\b(?:named|called)\s+["\']?{PROPER}', lambda m: {'Name': m.group(1)}),
+    (r'\b(?:organized|hosted)\s+by\s+(?:alumni\s+)?(A\d+)', lambda m: {'Organizer_id': m.group(1).upper()}),
+]
+
+COMPILED_PREDICATES = {
+    'searchAlumni': [(re.compile(pattern, re.IGNORECASE), build) for pattern, build in ALUMNI_PREDICATES],
+    'searchEvents': [(re.compile(pattern, re.IGNORECASE), build) for pattern, build in EVENT_PREDICATES],
+}
+
+# List operations and how their own arguments map onto the search filter
+LIST_OPERATIONS = {
+    'getAlumni': ('searchAlumni', {}),
+    'getAlumniByEmployer': ('searchAlumni', {'Employer': 'Employer'}),
+    'searchAlumni': ('searchAlumni', {}),
+    'getEvents': ('searchEvents', {}),
+    'getEventsByDate': ('searchEvents', {'Date': 'Date'}),
+    'searchEvents': ('searchEvents', {}),
+}
+
+def extract_filter(message, search):
+    """
+    Filter fields for a search operation found in a message, e.g.
+    {'Graduation_year': 2024} for "Who graduated in 2024?"
+    """
+    found = {}
+    for pattern, build in COMPILED_PREDICATES[search]:
+        for match in pattern.finditer(message):
+            for key, value in build(match).items():
+                found.setdefault(key, value)
+    # A named person/event is searched by name, not also by the words after "in"
+    if search == 'searchEvents' and 'Location' in found and found['Location'] == found.get('Name'):
+        del found['Location']
+    return found
+
+def push_down(message, query):
+    """
+    The query rewritten as a filtered, limited search when it lists a whole
+    collection (or filters less than the message asks for); None when it
+    needs no rewrite
+    """
+    if not query.startswith('query') or not message:
+        return None
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+    operation = document.definitions[0]
+    if len(document.definitions) != 1 or not isinstance(operation, OperationDefinitionNode) \
+            or len(operation.selection_set.selections) != 1:
+        return None
+    field = operation.selection_set.selections[0]
+    if not isinstance(field, FieldNode) or field.name.value not in LIST_OPERATIONS:
+        return None
+
+    search, argument_filters = LIST_OPERATIONS[field.name.value]
+    arguments = {argument.name.value: value_from_ast_untyped(argument.value) for argument in field.arguments}
+    current = dict(arguments.get('filter') or {})
+    for argument, key in argument_filters.items():
+        if argument in arguments:
+            current[key] = arguments[argument]
+
+    found = extract_filter(message, search)
+    added = {key: value for key, value in found.items() if key not in current}
+    if not added:
+        return None
+
+    # Keep the fields the query asked for
+    selections = field.selection_set.selections if field.selection_set else ()
+    if field.name.value in PAGED_OPERATIONS:
+        items = next((s for s in selections if isinstance(s, FieldNode) and s.name.value == 'items'), None)
+        selections = items.selection_set.selections if items is not None and items.selection_set else ()
+    fields = [s.name.value for s in selections if isinstance(s, FieldNode) and not s.selection_set] or None
+
+    args = {'filter': {**current, **added}, 'limit': arguments.get('limit') or DEFAULT_PAGE_SIZE}
+    if arguments.get('cursor'):
+        args['cursor'] = arguments['cursor']
+    return render_operation('query', search, args, fields)
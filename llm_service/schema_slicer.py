@@ -0,0 +1,160 @@
+import re
+
+# Splits SCHEMA_CONTEXT into fragments (types, operations, rules, few-shot
+# examples) and picks only the ones relevant to a message, so CPU-only Ollama
+# hosts do not spend most of each request evaluating the whole prompt.
+
+SECTION_HEADINGS = [
+    'Available Types:', 'Available Queries:', 'Available Mutations:',
+    'CRITICAL EXTRACTION RULES:', 'STEP-BY-STEP PROCESS:', 'Query Examples:',
+    'CREATE EVENT EXAMPLES:', 'RSVP EXAMPLES:', 'UPDATE EXAMPLES:', 'DELETE EXAMPLES:'
+]
+
+# Sections that are always kept whole when they are relevant
+RULE_SECTIONS = {'CRITICAL EXTRACTION RULES:', 'STEP-BY-STEP PROCESS:', 'CREATE EVENT EXAMPLES:'}
+
+ENTITY_KEYWORDS = {
+    'Alumni': {'alumni', 'alumnus', 'alumna', 'graduate', 'graduated', 'graduates', 'grad', 'grads',
+               'employer', 'work', 'works', 'working', 'employed', 'company', 'classmate',
+               'classmates', 'job', 'major', 'majored', 'studied', 'named', 'email', 'lives', 'living'},
+    'Event': {'event', 'events', 'gala', 'meetup', 'mixer', 'happening', 'workshop', 'seminar',
+              'upcoming', 'reception', 'conference'},
+    'Reservation': {'reservation', 'reservations', 'rsvp', 'rsvps', 'register', 'registered',
+                    'attendees', 'attending', 'booking', 'bookings'},
+    'Photo': {'photo', 'photos', 'picture', 'pictures', 'image', 'images', 'tag', 'tags',
+              'tagged', 'uploaded'},
+    'Admin': {'admin', 'admins', 'administrator', 'administrators'},
+}
+
+ACTION_KEYWORDS = {
+    'create': {'create', 'new', 'add', 'schedule', 'host', 'organize', 'plan'},
+    'update': {'update', 'change', 'edit', 'modify', 'set', 'rename'},
+    'delete': {'delete', 'remove', 'cancel'},
+    'rsvp': {'rsvp', 'register', 'reserve', 'attend', 'book'},
+    'login': {'login', 'log', 'signin'},
+}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'all', 'of', 'for', 'to', 'in', 'on', 'at', 'with', 'who', 'me', 'show',
+    'get', 'find', 'list', 'give', 'retrieve', 'is', 'are', 'and', 'or', 'by', 'from', 'my',
+    'please', 'i', 'want', 'what', 'which', 'id', 'query', 'mutation'
+}
+
+OPERATION_PATTERN = re.compile(r'\b(?:get|search|create|update|delete|login)([A-Z][a-z]+)')
+
+# Query examples kept per request
+MAX_QUERY_EXAMPLES = 3
+
+def tokenize(text):
+    return re.findall(r'[a-z0-9_]+', text.lower())
+
+def operation_entity(text):
+    """
+    Entity an operation line or example belongs to ('Alumni', 'Event', ...)
+    """
+    match = OPERATION_PATTERN.search(text)
+    if not match:
+        return None
+    name = match.group(1)
+    if name in ('Alumni', 'Admin'):
+        return name
+    for entity in ('Event', 'Reservation', 'Photo'):
+        if name.startswith(entity):
+            return entity
+    return name
+
+class Fragment:
+    __slots__ = ('section', 'text', 'entity', 'tokens')
+
+    def __init__(self, section, text):
+        self.section = section
+        self.text = text
+        self.entity = operation_entity(text)
+        if section == 'Available Types:':
+            self.entity = text.split(':', 1)[0].split('.', 1)[-1].strip()
+        # Examples are matched on the request side ("Find alumni at Google"), not the answer
+        example_input = text.split('->', 1)[0]
+        self.tokens = set(tokenize(example_input)) - STOPWORDS
+
+class SchemaSlicer:
+    """
+    Index of SCHEMA_CONTEXT fragments with keyword-based selection
+    """
+
+    def __init__(self, schema_context):
+        self.schema_context = schema_context
+        self.intro, self.sections = self._split(schema_context)
+
+    def _split(self, schema_context):
+        pattern = '(' + '|'.join(re.escape(heading) for heading in SECTION_HEADINGS) + ')'
+        parts = re.split(pattern, schema_context)
+        intro = parts[0]
+        sections = []
+        for heading, body in zip(parts[1::2], parts[2::2]):
+            if heading in RULE_SECTIONS:
+                items = [body.strip('\n')]
+            else:
+                items = [line for line in body.strip('\n').split('\n') if line.strip()]
+            sections.append((heading, [Fragment(heading, item) for item in items]))
+        return intro, sections
+
+    def select(self, context):
+        """
+        Return the prompt schema text for a message (same format as SCHEMA_CONTEXT),
+        or the full SCHEMA_CONTEXT when nothing in the message is recognized
+        """
+        tokens = set(tokenize(context))
+        entities = {entity for entity, words in ENTITY_KEYWORDS.items() if tokens & words}
+        actions = {action for action, words in ACTION_KEYWORDS.items() if tokens & words}
+
+        if not entities:
+            return self.schema_context
+
+        if 'rsvp' in actions:
+            entities |= {'Reservation', 'Event'}
+        creating_event = 'create' in actions and 'Event' in entities
+        mutating = bool(actions)
+
+        content_tokens = tokens - STOPWORDS
+        blocks = [self.intro.rstrip('\n')]
+
+        for heading, fragments in self.sections:
+            if heading == 'Available Types:':
+                chosen = [f for f in fragments if f.entity in entities]
+            elif heading == 'Available Queries:':
+                chosen = [f for f in fragments if f.entity in entities]
+            elif heading == 'Available Mutations:':
+                chosen = [f for f in fragments if mutating and (
+                    f.entity in entities or ('login' in actions and 'login' in f.text))]
+            elif heading in ('CRITICAL EXTRACTION RULES:', 'STEP-BY-STEP PROCESS:'):
+                chosen = fragments if mutating else []
+            elif heading == 'CREATE EVENT EXAMPLES:':
+                chosen = fragments if creating_event else []
+            elif heading == 'Query Examples:':
+                chosen = self._best_examples(fragments, entities, content_tokens)
+            elif heading == 'RSVP EXAMPLES:':
+                chosen = fragments if 'rsvp' in actions else []
+            elif heading == 'UPDATE EXAMPLES:':
+                chosen = fragments if 'update' in actions else []
+            elif heading == 'DELETE EXAMPLES:':
+                chosen = fragments if 'delete' in actions else []
+            else:
+                chosen = fragments
+
+            if chosen:
+                separator = '\n\n' if heading in RULE_SECTIONS else '\n'
+                blocks.append(heading + separator + '\n'.join(f.text for f in chosen))
+
+        return '\n\n'.join(blocks) + '\n'
+
+    def _best_examples(self, fragments, entities, content_tokens):
+        scored = []
+        for index, fragment in enumerate(fragments):
+            score = len(fragment.tokens & content_tokens)
+            if fragment.entity in entities:
+                score += 1
+            if score > 0:
+                scored.append((-score, index, fragment))
+        scored.sort()
+        best = sorted(scored[:MAX_QUERY_EXAMPLES], key=lambda item: item[1])
+        return [fragment for _, _, fragment in best]
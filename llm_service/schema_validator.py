@@ -0,0 +1,271 @@
+import difflib
+import os
+import re
+import threading
+from graphql import (
+    GraphQLError, build_schema, get_named_type, is_input_object_type, is_leaf_type,
+    is_object_type, parse, print_ast, validate
+)
+from graphql.language import (
+    FieldNode, NameNode, ObjectValueNode, ListValueNode, OperationDefinitionNode,
+    OperationType, SelectionSetNode
+)
+from graphql_builder import DEFAULT_FIELDS, PAGE_FIELDS
+from telemetry import log
+
+# The backend's SDL, shared so the LLM service validates against the real schema
+DEFAULT_SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'schema', 'typeDefs.js'
+)
+
+# typeDefs.js wraps the SDL in a gql`...` template literal
+SDL_PATTERN = re.compile(r'gql`([\s\S]*?)`')
+
+# Remembered validation results per query string (cleared on schema reload)
+MAX_MEMOIZED_RESULTS = 2048
+
+def load_sdl(path):
+    """
+    Read the GraphQL SDL from typeDefs.js (or a plain .graphql file)
+    """
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    match = SDL_PATTERN.search(source)
+    return match.group(1) if match else source
+
+def compact_print(document):
+    """
+    Print a document on one line in the same style as the generated queries
+    """
+    printed = ''
+    for line in print_ast(document).splitlines():
+        line = line.strip()
+        # Long argument lists are wrapped as "(\n  arg\n)"; join them back tightly
+        if printed and not printed.endswith('(') and not line.startswith(')'):
+            printed += ' '
+        printed += line
+    # print_ast uses the { ... } shorthand for anonymous queries
+    if printed.startswith('{'):
+        printed = 'query ' + printed
+    return printed
+
+class _Unrepairable(Exception):
+    """
+    An operation, argument or input field with no close match in the schema:
+    dropping it would change what the query does
+    """
+
+def _closest(name, candidates):
+    lowered = {candidate.lower(): candidate for candidate in candidates}
+    if name.lower() in lowered:
+        return lowered[name.lower()]
+    matches = difflib.get_close_matches(name, list(candidates), n=1, cutoff=0.6)
+    return matches[0] if matches else None
+
+class SchemaValidator:
+    """
+    Validates generated queries against the backend schema. The SDL is parsed
+    once and only re-read when the schema file's mtime changes.
+    """
+
+    def __init__(self, path=DEFAULT_SCHEMA_PATH):
+        self.path = path
+        self._schema = None
+        self._mtime = None
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def get_schema(self):
+        """
+        Return the parsed schema, reloading it if the file changed.
+        Returns None when the schema file is not available.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self._schema
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._schema = build_schema(load_sdl(self.path))
+                    self._mtime = mtime
+                    self._results = {}
+                    log('schema_loaded', path=self.path)
+        return self._schema
+
+    def validate(self, query):
+        """
+        Return a list of validation error messages (empty if the query is valid)
+        """
+        schema = self.get_schema()
+        if schema is None:
+            return []
+
+        errors = self._results.get(query)
+        if errors is None:
+            try:
+                errors = tuple(error.message for error in validate(schema, parse(query)))
+            except GraphQLError as e:
+                errors = (e.message,)
+            if len(self._results) >= MAX_MEMOIZED_RESULTS:
+                self._results = {}
+            self._results[query] = errors
+        return list(errors)
+
+    def repair(self, query):
+        """
+        Try to fix unknown operations, fields and arguments by snapping them to the
+        closest names in the schema. Unknown selected fields without a match are
+        dropped; an operation, argument or input field without one makes the
+        repair fail. Returns the repaired query if it now validates, otherwise None.
+        """
+        schema = self.get_schema()
+        if schema is None:
+            return None
+
+        try:
+            document = parse(query)
+        except GraphQLError:
+            return None
+
+        try:
+            for definition in document.definitions:
+                if isinstance(definition, OperationDefinitionNode):
+                    self._repair_operation(schema, definition)
+        except _Unrepairable:
+            return None
+
+        repaired = compact_print(document)
+        if self.validate(repaired):
+            return None
+        return repaired
+
+    def _repair_operation(self, schema, operation):
+        is_mutation = operation.operation == OperationType.MUTATION
+        root = schema.mutation_type if is_mutation else schema.query_type
+        other = schema.query_type if is_mutation else schema.mutation_type
+
+        selections = []
+        for node in operation.selection_set.selections:
+            if not isinstance(node, FieldNode):
+                selections.append(node)
+                continue
+
+            name = node.name.value
+            if name not in root.fields and len(operation.selection_set.selections) == 1 \
+                    and other is not None and name in other.fields:
+                # e.g. "query { createEvent(...) }": the operation type is wrong
+                operation.operation = OperationType.QUERY if is_mutation else OperationType.MUTATION
+                root = other
+            elif name not in root.fields:
+                # Prefer operations that take the arguments the model used
+                argument_names = {argument.name.value for argument in node.arguments or ()}
+                candidates = [
+                    candidate for candidate, root_field in root.fields.items()
+                    if argument_names <= set(root_field.args)
+                ]
+                name = _closest(name, candidates or root.fields)
+                if name is None:
+                    raise _Unrepairable(node.name.value)
+                node.name = NameNode(value=name)
+
+            self._repair_field(node, root.fields[name], DEFAULT_FIELDS.get(name))
+            selections.append(node)
+
+        operation.selection_set.selections = tuple(selections)
+
+    def _repair_field(self, node, field, default_fields=None):
+        arguments = []
+        for argument in node.arguments or ():
+            name = argument.name.value
+            if name not in field.args:
+                name = _closest(name, field.args)
+                if name is None:
+                    raise _Unrepairable(argument.name.value)
+                argument.name = NameNode(value=name)
+            self._repair_value(argument.value, field.args[name].type)
+            arguments.append(argument)
+        node.arguments = tuple(arguments)
+
+        named_type = get_named_type(field.type)
+        if is_leaf_type(named_type):
+            node.selection_set = None
+            return
+        if not is_object_type(named_type):
+            return
+
+        children = list(node.selection_set.selections) if node.selection_set else []
+        if 'items' in named_type.fields:
+            children = self._page_selections(children, named_type)
+
+        selections = []
+        for child in children:
+            if not isinstance(child, FieldNode) or child.name.value == '__typename':
+                selections.append(child)
+                continue
+            name = child.name.value
+            if name not in named_type.fields:
+                name = _closest(name, named_type.fields)
+                if name is None:
+                    continue
+                child.name = NameNode(value=name)
+            self._repair_field(child, named_type.fields[name], default_fields if name == 'items' else None)
+            selections.append(child)
+
+        if not selections:
+            names = [name for name in (default_fields or []) if name in named_type.fields]
+            if not names:
+                names = [
+                    name for name, child_field in named_type.fields.items()
+                    if name != '_id' and is_leaf_type(get_named_type(child_field.type))
+                ][:3]
+            selections = [FieldNode(name=NameNode(value=name), arguments=(), directives=()) for name in names]
+
+        node.selection_set = SelectionSetNode(selections=tuple(selections))
+
+    def _page_selections(self, children, page_type):
+        """
+        Selections for a page result: item fields written directly on the page
+        ("searchAlumni { Name Email }") move under items, and the page fields are added
+        """
+        item_type = get_named_type(page_type.fields['items'].type)
+        loose = [
+            child for child in children
+            if isinstance(child, FieldNode) and child.name.value not in page_type.fields
+            and child.name.value in item_type.fields
+        ]
+        children = [child for child in children if not any(child is item for item in loose)]
+        items = next((child for child in children
+                      if isinstance(child, FieldNode) and child.name.value == 'items'), None)
+        if items is None:
+            items = FieldNode(name=NameNode(value='items'), arguments=(), directives=())
+            children.insert(0, items)
+        if loose:
+            existing = list(items.selection_set.selections) if items.selection_set else []
+            items.selection_set = SelectionSetNode(selections=tuple(existing + loose))
+        names = {child.name.value for child in children if isinstance(child, FieldNode)}
+        children += [FieldNode(name=NameNode(value=name), arguments=(), directives=())
+                     for name in PAGE_FIELDS if name not in names]
+        return children
+
+    def _repair_value(self, value, input_type):
+        named_type = get_named_type(input_type)
+        if isinstance(value, ListValueNode):
+            for item in value.values:
+                self._repair_value(item, named_type)
+            return
+        if not isinstance(value, ObjectValueNode) or not is_input_object_type(named_type):
+            return
+
+        fields = []
+        for field in value.fields:
+            name = field.name.value
+            if name not in named_type.fields:
+                name = _closest(name, named_type.fields)
+                if name is None:
+                    raise _Unrepairable(field.name.value)
+                field.name = NameNode(value=name)
+            self._repair_value(field.value, named_type.fields[name].type)
+            fields.append(field)
+        value.fields = tuple(fields)
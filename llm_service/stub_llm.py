@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from intent_schema import IntentError, intent_from_graphql, intent_json
+
+# Offline stand-in for OllamaLLM used by the benchmarks and load tests.
+# It answers from a table of known messages (e.g. the benchmark corpus) and
+# sleeps like a model would: a fixed overhead, prompt evaluation proportional
+# to the prompt size, and a per-token generation cost.
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'corpus.jsonl')
+
+MESSAGE_MARKER = "User's Complete Message (may include context from previous messages): "
+DEFAULT_RESPONSE = 'NEED_INFO: Please provide more information'
+
+def extract_message(prompt):
+    """
+    Pull the user message back out of a rendered prompt
+    """
+    start = prompt.rfind(MESSAGE_MARKER)
+    if start == -1:
+        return prompt.strip()
+    return prompt[start + len(MESSAGE_MARKER):].split('\n', 1)[0].strip()
+
+def normalize_message(message):
+    return re.sub(r'\s+', ' ', message.strip().lower())
+
+def load_responses(corpus_path):
+    """
+    Build a message -> expected GraphQL table from a benchmark corpus (JSON lines)
+    """
+    responses = {}
+    with open(corpus_path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            history = [msg['content'] for msg in item.get('history', []) if msg.get('type') == 'user']
+            message = ' '.join(history + [item['prompt']])
+            # 'response' is what the model answers when the service is expected to
+            # return something else (e.g. refuse to accept an invalid query)
+            responses[normalize_message(message)] = item.get('response', item['expected'])
+    return responses
+
+class StubLLM:
+    """
+    Deterministic fake model with invoke/ainvoke/stream/astream like OllamaLLM
+    """
+
+    def __init__(self, responses=None, base_latency_ms=20.0, prompt_ms_per_char=0.005,
+                 token_ms=2.0, decorate=True, name='stub', failure_rate=0.0,
+                 slow_rate=0.0, slow_factor=10.0, seed=None):
+        self.responses = {normalize_message(key): value for key, value in (responses or {}).items()}
+        self.base_latency_ms = base_latency_ms
+        self.prompt_ms_per_char = prompt_ms_per_char
+        self.token_ms = token_ms
+        self.decorate = decorate
+        self.name = name
+        # Fault injection: failed calls and a slow tail, for exercising failover and hedging
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    def answer(self, prompt, output_format=None):
+        message = extract_message(prompt)
+        response = self.responses.get(normalize_message(message), DEFAULT_RESPONSE)
+        if output_format:
+            # Constrained decoding (intent mode): the answer is bare JSON
+            try:
+                return intent_json(intent_from_graphql(response))
+            except IntentError:
+                return response
+        if not self.decorate:
+            return response
+
+        # Vary the formatting the way real models do, so cleanup is exercised too
+        style = hashlib.md5(message.encode('utf-8')).digest()[0] % 3
+        if style == 1:
+            return f"```graphql\n{response}\n```"
+        if style == 2:
+            return f"Here is the query:\n{response}"
+        return response
+
+    def tokens(self, text):
+        return re.findall(r'\S+\s*|\s+', text)
+
+    def _delays(self, prompt, response):
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            raise ConnectionError(f'{self.name}: simulated backend failure')
+        scale = self.slow_factor if self.slow_rate and self.random.random() < self.slow_rate else 1.0
+        prefill = (self.base_latency_ms + len(prompt) * self.prompt_ms_per_char) / 1000
+        return prefill * scale, self.token_ms / 1000 * scale
+
+    def invoke(self, prompt, **kwargs):
+        self.calls += 1
+        response = self.answer(prompt, kwargs.get('format'))
+        prefill, per_token = self._delays(prompt, response)
+        time.sleep(prefill + per_token * len(self.tokens(response)))
+        return response
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        response = self.answer(prompt, kwargs.get('format'))
+        prefill, per_token = self._delays(prompt, response)
+        await asyncio.sleep(prefill + per_token * len(self.tokens(response)))
+        return response
+
+    def stream(self, prompt, **kwargs):
+        self.calls += 1
+        response = self.answer(prompt, kwargs.get('format'))
+        prefill, per_token = self._delays(prompt, response)
+        time.sleep(prefill)
+        for token in self.tokens(response):
+            time.sleep(per_token)
+            yield token
+
+    async def astream(self, prompt, **kwargs):
+        self.calls += 1
+        response = self.answer(prompt, kwargs.get('format'))
+        prefill, per_token = self._delays(prompt, response)
+        await asyncio.sleep(prefill)
+        for token in self.tokens(response):
+            await asyncio.sleep(per_token)
+            yield token
+
+def create_stub_llm(name='stub'):
+    """
+    StubLLM configured from LLM_STUB_* environment settings, answering from
+    LLM_STUB_CORPUS (the benchmark corpus by default)
+    """
+    corpus_path = os.getenv('LLM_STUB_CORPUS', DEFAULT_CORPUS)
+    return StubLLM(
+        load_responses(corpus_path) if os.path.exists(corpus_path) else {},
+        base_latency_ms=float(os.getenv('LLM_STUB_LATENCY_MS', 20)),
+        token_ms=float(os.getenv('LLM_STUB_TOKEN_MS', 2)),
+        failure_rate=float(os.getenv('LLM_STUB_FAILURE_RATE', 0)),
+        name=name
+    )
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+# Structured logging and Prometheus metrics for the LLM service.
+# Every request is measured, but only a sample (LLM_LOG_SAMPLE_RATE) is logged
+# with its context and model output; warnings and errors are always logged.
+
+LOG_LEVEL = os.getenv('LLM_LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(os.getenv('LLM_LOG_SAMPLE_RATE', 0.01))
+
+# From sub-millisecond stages (cleanup, lookups) up to slow CPU-only generations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+STAGE_SECONDS = Histogram(
+    'llm_stage_seconds', 'Time spent in each stage of a translation',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'llm_request_seconds', 'Total translation time by where the answer came from',
+    ['source'], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter('llm_requests_total', 'Translations by answer source', ['source'])
+NEED_INFO = Counter('llm_need_info_total', 'Answers asking the user for more information')
+FALLBACK_WRAPS = Counter('llm_fallback_wraps_total', 'Model outputs wrapped in "query { ... }" as a last resort')
+VALIDATIONS = Counter('llm_validation_total', 'Schema validation outcomes', ['outcome'])
+COALESCED = Counter('llm_coalesced_total', 'Requests that shared an in-flight generation')
+ERRORS = Counter('llm_errors_total', 'Failed translations', ['kind'])
+ADMISSIONS = Counter('llm_admission_total', 'Model call admission outcomes', ['outcome', 'priority'])
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'event': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+logger = logging.getLogger('llm_service')
+if not logger.handlers:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+def log(event, level=logging.INFO, exc_info=None, **fields):
+    """
+    Write one JSON log line, e.g. log('warm_up', seconds=1.2)
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, exc_info=exc_info, extra={'fields': fields})
+
+def metrics_payload():
+    """
+    Body and content type for a /metrics response. Under a pre-forking server
+    (PROMETHEUS_MULTIPROC_DIR set) the metrics of all workers are merged.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+class RequestTrace:
+    """
+    Timings and details of one translation. Stage timings always go to the
+    histograms; details are only kept (and logged) when the request is sampled.
+    """
+
+    def __init__(self, mode='sync'):
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.timings = {}
+        self.details = {}
+        self.sampled = logger.isEnabledFor(logging.DEBUG) or random.random() < LOG_SAMPLE_RATE
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        STAGE_SECONDS.labels(name).observe(seconds)
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def detail(self, **fields):
+        if self.sampled:
+            self.details.update(fields)
+
+    def _timings_ms(self):
+        return {name: round(seconds * 1000, 2) for name, seconds in self.timings.items()}
+
+    def finish(self, result):
+        total = time.perf_counter() - self.start
+        source = result.get('source', 'llm')
+        REQUEST_SECONDS.labels(source).observe(total)
+        REQUESTS.labels(source).inc()
+        if (result.get('graphql_query') or '').startswith('NEED_INFO'):
+            NEED_INFO.inc()
+
+        if self.sampled:
+            log('request', mode=self.mode, source=source, total_ms=round(total * 1000, 2),
+                stages_ms=self._timings_ms(), graphql_query=result.get('graphql_query'),
+                prompt_tokens=result.get('prompt_tokens'), **self.details)
+
+    def fail(self, error):
+        ERRORS.labels(type(error).__name__).inc()
+        log('request_failed', level=logging.ERROR, mode=self.mode, error=str(error),
+            total_ms=round((time.perf_counter() - self.start) * 1000, 2),
+            stages_ms=self._timings_ms(), **self.details)
@@ -0,0 +1,171 @@
+from pymongo import MongoClient, ReturnDocument
+from bson import encode, json_util
+import glob
+import gzip
+import json
+import os
+import shutil
+from indexes import create_indexes, index_metadata, verify_query_plans
+
+# Destinations for generated documents. generate_sample_data.py writes each
+# chunk through sink.open(collection, part); a sink is created once per worker
+# process, and the parent calls prepare() before and create_indexes() and
+# finish() after generation.
+
+DATABASE_NAME = 'clp_alumni'
+COLLECTIONS = ['alumni', 'events', 'reservations', 'photos', 'admins', 'counters']
+
+class MongoWriter:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def write(self, batch):
+        self.collection.insert_many(batch, ordered=False)
+
+    def close(self):
+        pass
+
+class MongoSink:
+    """
+    Insert straight into a live database
+    """
+
+    def __init__(self, uri):
+        self.db = MongoClient(uri)[DATABASE_NAME]
+
+    def describe(self):
+        return 'MongoDB'
+
+    def prepare(self):
+        """Clear all existing data"""
+        print("Clearing existing data...")
+        for collection in COLLECTIONS:
+            self.db[collection].delete_many({})
+        print("Data cleared successfully")
+
+    def open(self, collection, part=0):
+        return MongoWriter(self.db[collection])
+
+    def initialize_counters(self, counters):
+        self.db.counters.insert_many([{'_id': name, 'seq': seq} for name, seq in counters.items()])
+
+    def reserve_sequence_block(self, name, n):
+        """
+        Reserve n IDs with one $inc, like reserveSequenceBlock in
+        backend/models/Counter.js; returns the first
+        """
+        counter = self.db.counters.find_one_and_update(
+            {'_id': name}, {'$inc': {'seq': n}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return counter['seq'] - n + 1
+
+    def create_indexes(self):
+        create_indexes(self.db)
+
+    def verify_query_plans(self):
+        return verify_query_plans(self.db)
+
+    def finish(self):
+        pass
+
+class FileWriter:
+    def __init__(self, path, file_format):
+        self.file_format = file_format
+        if file_format == 'ndjson':
+            self.file = gzip.open(path, 'wb', compresslevel=6)
+        else:
+            self.file = open(path, 'wb')
+
+    def write(self, batch):
+        if self.file_format == 'ndjson':
+            lines = [json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS) for document in batch]
+            self.file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        else:
+            self.file.write(b''.join(encode(document) for document in batch))
+
+    def close(self):
+        self.file.close()
+
+class FileSink:
+    """
+    Write fixtures instead of a database:
+      bson:   mongodump layout, <dir>/clp_alumni/<collection>.bson and
+              <collection>.metadata.json, for mongorestore
+      ndjson: gzipped extended JSON, <dir>/<collection>.json.gz, for mongoimport
+    Every chunk goes to its own part file, so workers write in parallel without
+    sharing a file; finish() appends the parts in order. Concatenated BSON
+    documents and concatenated gzip members are both still valid files.
+    """
+
+    def __init__(self, directory, file_format='bson'):
+        if file_format not in ('bson', 'ndjson'):
+            raise ValueError(f'Unknown file format {file_format}')
+        self.file_format = file_format
+        self.directory = os.path.join(directory, DATABASE_NAME) if file_format == 'bson' else directory
+        self.with_indexes = False
+        self.sequences = {}
+
+    def describe(self):
+        return f'{self.file_format} files in {self.directory}'
+
+    def path(self, collection):
+        extension = 'json.gz' if self.file_format == 'ndjson' else 'bson'
+        return os.path.join(self.directory, f'{collection}.{extension}')
+
+    def prepare(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for collection in COLLECTIONS:
+            for path in [self.path(collection)] + glob.glob(self.path(collection) + '.part*'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def open(self, collection, part=0):
+        # Zero-padded so the parts sort in document order
+        return FileWriter(f'{self.path(collection)}.part{part:012d}', self.file_format)
+
+    def initialize_counters(self, counters):
+        # Kept in memory and written by finish() with their final values
+        self.sequences = dict(counters)
+
+    def reserve_sequence_block(self, name, n):
+        first = self.sequences.get(name, 0) + 1
+        self.sequences[name] = first + n - 1
+        return first
+
+    def create_indexes(self):
+        # Written to the mongodump metadata; mongorestore builds them after loading
+        self.with_indexes = True
+
+    def verify_query_plans(self):
+        return None
+
+    def finish(self):
+        if self.sequences:
+            writer = self.open('counters')
+            writer.write([{'_id': name, 'seq': seq} for name, seq in self.sequences.items()])
+            writer.close()
+
+        for collection in COLLECTIONS:
+            parts = sorted(glob.glob(self.path(collection) + '.part*'))
+            if not parts:
+                continue
+            with open(self.path(collection), 'wb') as output:
+                for part in parts:
+                    with open(part, 'rb') as source:
+                        shutil.copyfileobj(source, output, 1024 * 1024)
+                    os.remove(part)
+
+            if self.file_format == 'bson':
+                metadata = {
+                    'options': {},
+                    'indexes': index_metadata(collection if self.with_indexes else None),
+                    'collectionName': collection,
+                    'type': 'collection'
+                }
+                with open(os.path.join(self.directory, f'{collection}.metadata.json'), 'w') as f:
+                    json.dump(metadata, f)
+
+def create_sink(config):
+    if config.get('output'):
+        return FileSink(config['output'], config.get('format', 'bson'))
+    return MongoSink(config['uri'])
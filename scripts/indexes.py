@@ -0,0 +1,135 @@
+from datetime import datetime
+import json
+
+# Indexes for the seeded collections, mirroring backend/models (fields declared
+# `unique: true` plus each schema.index call), and the filters the GraphQL
+# resolvers in backend/schema/resolvers.js send. Seed data is written without
+# mongoose, so these are provisioned here rather than left to the first API start.
+
+INDEXES = {
+    'alumni': [
+        ([('Alumni_id', 1)], {'unique': True}),
+        ([('Email', 1)], {'unique': True}),
+        ([('Employer', 1), ('_id', 1)], {}),
+        ([('Graduation_year', 1), ('_id', 1)], {}),
+        # Field_of_study is an array (multikey)
+        ([('Field_of_study', 1), ('_id', 1)], {}),
+        ([('Employer_location.City', 1), ('_id', 1)], {}),
+        ([('Employer_location.State', 1), ('_id', 1)], {})
+    ],
+    'events': [
+        ([('Event_id', 1)], {'unique': True}),
+        ([('Date', 1), ('_id', 1)], {}),
+        ([('Organizer_id', 1), ('Date', 1), ('_id', 1)], {})
+    ],
+    'reservations': [
+        ([('Reservation_id', 1)], {'unique': True}),
+        ([('Alumni_id', 1)], {}),
+        ([('Event_id', 1)], {}),
+        ([('Alumni_id', 1), ('Event_id', 1)], {'unique': True})
+    ],
+    'photos': [
+        ([('Photo_id', 1)], {'unique': True}),
+        ([('Alumni_id', 1)], {}),
+        ([('Event_id', 1)], {}),
+        # Tags is an array, so this is a multikey index
+        ([('Tags', 1)], {})
+    ],
+    'admins': [
+        ([('Admin_id', 1)], {'unique': True}),
+        ([('Username', 1)], {'unique': True})
+    ]
+}
+
+# (resolver, collection, filter[, sort]); the values only need the right type.
+# searchAlumni pages in _id order and searchEvents in (Date, _id) order, so
+# their plans must not sort in memory either.
+ACCESS_PATTERNS = [
+    ('getAlumniByAlumniId / Photo.Uploader_name', 'alumni', {'Alumni_id': 'A1001'}),
+    ('getAlumniByEmail / login / register', 'alumni', {'Email': 'someone@example.com'}),
+    ('getAlumniByEmployer', 'alumni', {'Employer': 'Google'}),
+    ('searchAlumni (Graduation_year)', 'alumni', {'Graduation_year': 2024}, {'_id': 1}),
+    ('searchAlumni (Field_of_study)', 'alumni', {'Field_of_study': 'Computer Science'}, {'_id': 1}),
+    ('searchAlumni (City)', 'alumni', {'Employer_location.City': 'Kansas City'}, {'_id': 1}),
+    ('searchAlumni (State)', 'alumni', {'Employer_location.State': 'MO'}, {'_id': 1}),
+    ('searchAlumni (Employer)', 'alumni', {'Employer': 'Google'}, {'_id': 1}),
+    ('getEventByEventId', 'events', {'Event_id': 'E1001'}),
+    ('getEventsByDate', 'events', {'Date': datetime(2024, 1, 1)}),
+    ('searchEvents', 'events', {}, {'Date': 1, '_id': 1}),
+    ('searchEvents (Date range)', 'events',
+     {'Date': {'$gte': datetime(2024, 1, 1), '$lt': datetime(2025, 1, 1)}}, {'Date': 1, '_id': 1}),
+    ('searchEvents (Organizer_id)', 'events', {'Organizer_id': 'A1001'}, {'Date': 1, '_id': 1}),
+    ('getReservationsByAlumni', 'reservations', {'Alumni_id': 'A1001'}),
+    ('getReservationsByEvent', 'reservations', {'Event_id': 'E1001'}),
+    ('getPhotosByEvent', 'photos', {'Event_id': 'E1001'}),
+    ('getPhotosByAlumni', 'photos', {'Alumni_id': 'A1001'}),
+    ('getPhotosByTags', 'photos', {'Tags': {'$in': ['networking', 'alumni']}}),
+    ('adminLogin', 'admins', {'Username': 'admin_clp'})
+]
+
+# Name and Location searches are case-insensitive substring matches, which no
+# index can bound: they walk the sort index, filtering, until one page of
+# matches is found (the whole collection when there are fewer). Their plans
+# are listed on every check but do not fail it.
+KNOWN_SCANS = [
+    ('searchAlumni (Name)', 'alumni', {'Name': {'$regex': 'smith', '$options': 'i'}}, {'_id': 1}),
+    ('searchEvents (Name)', 'events', {'Name': {'$regex': 'mixer', '$options': 'i'}}, {'Date': 1, '_id': 1}),
+    ('searchEvents (Location)', 'events', {'Location': {'$regex': 'boston', '$options': 'i'}}, {'Date': 1, '_id': 1})
+]
+
+def index_name(keys):
+    # MongoDB's default name, which is also what mongoose creates
+    return '_'.join(f'{field}_{direction}' for field, direction in keys)
+
+def index_metadata(collection):
+    """
+    Index list for a mongodump <collection>.metadata.json
+    """
+    indexes = [{'v': 2, 'key': {'_id': 1}, 'name': '_id_'}]
+    for keys, options in INDEXES.get(collection, []):
+        indexes.append({'v': 2, 'key': dict(keys), 'name': index_name(keys), **options})
+    return indexes
+
+def create_indexes(db):
+    """
+    Build the indexes (after loading, so each is built once over the data)
+    """
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            db[collection].create_index(keys, name=index_name(keys), **options)
+        print(f"Indexed {collection}: {', '.join(index_name(keys) for keys, _ in indexes)}")
+
+def plan_stages(plan):
+    """
+    All stage names in a winning plan (classic or slot-based engine layout)
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+    return stages
+
+def verify_query_plans(db):
+    """
+    Explain every resolver access pattern; returns the ones that still scan a
+    whole collection (or sort a paginated search in memory). KNOWN_SCANS are
+    printed as 'known' and not returned.
+    """
+    scans = []
+    patterns = [(pattern, False) for pattern in ACCESS_PATTERNS] + [(pattern, True) for pattern in KNOWN_SCANS]
+    for (resolver, collection, query_filter, *sort), known in patterns:
+        command = {'find': collection, 'filter': query_filter}
+        if sort:
+            command['sort'] = sort[0]
+        explain = db.command('explain', command, verbosity='queryPlanner')
+        stages = plan_stages(explain['queryPlanner']['winningPlan'])
+        status = 'known' if known else 'COLLSCAN' if 'COLLSCAN' in stages else 'SORT' if 'SORT' in stages else 'ok'
+        print(f"  {status:8} {collection}.find({json.dumps(query_filter, default=str)})  [{resolver}]  {' <- '.join(stages)}")
+        if status not in ('ok', 'known'):
+            scans.append(resolver)
+    return scans
@@ -0,0 +1,358 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import requests
+from generate_sample_data import COMPANIES, EVENT_NAMES, TAGS_OPTIONS, CITIES_STATES
+
+# Replays chat prompts against the LLM service and runs the GraphQL it returns
+# against the backend, like the chat UI does. Arrivals are open-loop (Poisson
+# at a fixed rate, whether or not earlier requests have finished) and latency
+# is measured from each request's scheduled arrival, so queueing behind a
+# saturated service shows up in the numbers instead of slowing the load down.
+
+LLM_SERVICE_URL = os.getenv('LLM_SERVICE_URL', 'http://localhost:5000')
+GRAPHQL_URL = os.getenv('GRAPHQL_URL', 'http://localhost:4000/graphql')
+
+# (weight, prompt template): mostly request shapes the fast path answers, plus
+# free-form ones that need the model
+SYNTHETIC_MIX = [
+    (10, 'Show me all events'),
+    (8, 'Show alumni {alumni_id}'),
+    (8, 'Find alumni who work at {employer}'),
+    (6, 'Show events on {date}'),
+    (6, 'Show reservations for alumni {alumni_id}'),
+    (6, 'Show reservations for event {event_id}'),
+    (5, 'Show photos tagged {tag}'),
+    (5, 'Show photos for event {event_id}'),
+    (4, 'Get event {event_id}'),
+    (6, 'Which alumni graduated in {year} and work at {employer}?'),
+    (5, 'What events are coming up near {city}?'),
+    (3, 'Who is organizing event {event_id} and how many people have reserved?'),
+    (2, 'Create an event called {event_name} on {date} at 6pm')
+]
+
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+STAGE_METRIC_PATTERN = re.compile(r'^llm_stage_seconds_(sum|count)\{stage="([^"]+)"\}\s+(\S+)$', re.MULTILINE)
+
+def load_entities(args):
+    """
+    IDs and values to put in prompts: sampled from the seeded database when
+    --mongodb-uri is given, otherwise the ones generate_sample_data.py
+    produces for --alumni/--events
+    """
+    if args.mongodb_uri:
+        from pymongo import MongoClient
+        db = MongoClient(args.mongodb_uri)['clp_alumni']
+        alumni = list(db.alumni.aggregate([{'$sample': {'size': 1000}}, {'$project': {'Alumni_id': 1, 'Employer': 1, 'Graduation_year': 1}}]))
+        events = list(db.events.aggregate([{'$sample': {'size': 1000}}, {'$project': {'Event_id': 1, 'Date': 1}}]))
+        if not alumni or not events:
+            raise SystemExit('The database has no alumni or events; run generate_sample_data.py first')
+        return {
+            'alumni_id': [a['Alumni_id'] for a in alumni],
+            'employer': sorted({a['Employer'] for a in alumni if a.get('Employer')}) or COMPANIES,
+            'year': sorted({a['Graduation_year'] for a in alumni if a.get('Graduation_year')}),
+            'event_id': [e['Event_id'] for e in events],
+            'date': sorted({e['Date'].strftime('%Y-%m-%d') for e in events if e.get('Date')}),
+            'tag': db.photos.distinct('Tags') or sorted({tag for tags in TAGS_OPTIONS for tag in tags}),
+            'city': [city for city, _ in CITIES_STATES],
+            'event_name': EVENT_NAMES
+        }
+
+    today = datetime.now()
+    return {
+        'alumni_id': [f'A{1001 + i}' for i in range(args.alumni)],
+        'employer': COMPANIES,
+        'year': list(range(2015, 2025)),
+        'event_id': [f'E{1001 + i}' for i in range(args.events)],
+        'date': [(today + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(-180, 181, 7)],
+        'tag': sorted({tag for tags in TAGS_OPTIONS for tag in tags}),
+        'city': [city for city, _ in CITIES_STATES],
+        'event_name': EVENT_NAMES
+    }
+
+def load_workload(path):
+    """
+    Recorded prompts, one JSON object per line with "prompt" (or "query") and
+    optionally "history"; benchmarks/corpus.jsonl works as-is. Prompts may
+    contain the same {placeholders} as SYNTHETIC_MIX.
+    """
+    items = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                items.append({'prompt': record.get('prompt') or record['query'], 'history': record.get('history')})
+    if not items:
+        raise SystemExit(f'No prompts in {path}')
+    return items
+
+def fill(template, entities, rng):
+    def value(match):
+        name = match.group(1)
+        return str(rng.choice(entities[name])) if entities.get(name) else match.group(0)
+    return PLACEHOLDER_PATTERN.sub(value, template)
+
+def workload_items(workload, entities, rng):
+    """
+    Endless stream of requests: recorded prompts in order (repeating), or
+    synthetic prompts drawn from SYNTHETIC_MIX by weight
+    """
+    if workload is not None:
+        while True:
+            for item in workload:
+                yield {'prompt': fill(item['prompt'], entities, rng), 'history': item['history']}
+    weights = [weight for weight, _ in SYNTHETIC_MIX]
+    templates = [template for _, template in SYNTHETIC_MIX]
+    while True:
+        yield {'prompt': fill(rng.choices(templates, weights)[0], entities, rng), 'history': None}
+
+_local = threading.local()
+
+def session():
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+def execute(item, scheduled, args):
+    """
+    One chat turn: translate the prompt, then run the GraphQL it returned.
+    Times are in seconds; queue is the delay between the scheduled arrival and
+    the moment a client thread picked the request up.
+    """
+    started = time.perf_counter()
+    record = {'queue': started - scheduled, 'outcome': 'ok', 'source': None}
+    try:
+        payload = {'query': item['prompt']}
+        if args.deadline_ms:
+            payload['deadline_ms'] = args.deadline_ms
+        if item['history']:
+            payload['history'] = item['history']
+        else:
+            payload['conversation_id'] = str(uuid.uuid4())
+        response = session().post(f'{args.llm_url}/api/llm/query', json=payload, timeout=args.timeout)
+        record['llm'] = time.perf_counter() - started
+        data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+        if response.status_code in (429, 503) and response.headers.get('Retry-After'):
+            # Turned away by the service's admission control
+            record['outcome'] = 'shed'
+            return record
+        if response.status_code != 200 or not data.get('success'):
+            record['outcome'] = f'llm_http_{response.status_code}'
+            return record
+
+        record['source'] = data.get('source')
+        graphql_query = data.get('graphql_query') or ''
+        if graphql_query.startswith('NEED_INFO') or 'Please provide' in graphql_query:
+            record['outcome'] = 'need_info'
+            return record
+        if graphql_query.lstrip().lower().startswith('mutation') and not args.execute_mutations:
+            record['outcome'] = 'mutation_skipped'
+            return record
+
+        graphql_started = time.perf_counter()
+        headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+        if data.get('document_id') and not args.inline_queries:
+            # Persisted document: hash and variables only, like the chat UI
+            body = {
+                'variables': data.get('variables') or {},
+                'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': data['document_id']}}
+            }
+            response = session().post(args.graphql_url, json=body, headers=headers, timeout=args.timeout)
+            errors = response.json().get('errors') if response.status_code == 200 else None
+            if errors and any(error.get('message') == 'PersistedQueryNotFound' for error in errors):
+                body['query'] = data['document']
+                response = session().post(args.graphql_url, json=body, headers=headers, timeout=args.timeout)
+        else:
+            response = session().post(args.graphql_url, json={'query': graphql_query}, headers=headers, timeout=args.timeout)
+        record['graphql'] = time.perf_counter() - graphql_started
+        if response.status_code != 200 or response.json().get('errors'):
+            record['outcome'] = 'graphql_error'
+    except requests.Timeout:
+        record['outcome'] = 'timeout'
+    except (requests.RequestException, ValueError) as e:
+        record['outcome'] = f'error_{type(e).__name__}'
+    finally:
+        record['total'] = time.perf_counter() - scheduled
+        record['finished'] = time.perf_counter()
+    return record
+
+def scrape_stage_totals(llm_url):
+    """
+    Server-side (sum, count) of llm_stage_seconds per stage, or None when
+    /metrics is unavailable
+    """
+    try:
+        text = requests.get(f'{llm_url}/metrics', timeout=5).text
+    except requests.RequestException:
+        return None
+    totals = {}
+    for kind, stage, value in STAGE_METRIC_PATTERN.findall(text):
+        sums = totals.setdefault(stage, [0.0, 0.0])
+        sums[0 if kind == 'sum' else 1] += float(value)
+    return totals
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))]
+
+def ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+def run_step(rate, items, args):
+    """
+    Send Poisson arrivals at `rate` per second for args.duration seconds
+    """
+    rng = random.Random(f'{args.seed}:{rate}')
+    executor = ThreadPoolExecutor(max_workers=args.max_inflight, thread_name_prefix='load')
+    before = scrape_stage_totals(args.llm_url)
+
+    futures = []
+    start = time.perf_counter()
+    arrival = rng.expovariate(rate)
+    while arrival < args.duration:
+        scheduled = start + arrival
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append(executor.submit(execute, next(items), scheduled, args))
+        arrival += rng.expovariate(rate)
+    wait(futures)
+    executor.shutdown()
+
+    records = [future.result() for future in futures]
+    after = scrape_stage_totals(args.llm_url)
+    return summarize(rate, start, records, before, after, args)
+
+def summarize(rate, start, records, before, after, args):
+    completed = [r for r in records if r['outcome'] in ('ok', 'need_info', 'mutation_skipped')]
+    shed = sum(1 for r in records if r['outcome'] == 'shed')
+    errors = len(records) - len(completed) - shed
+    # Completions spread past the end of the step when the service falls behind
+    elapsed = max(args.duration, max((r['finished'] for r in records), default=start) - start)
+    totals = [r['total'] for r in completed]
+
+    outcomes = {}
+    sources = {}
+    for record in records:
+        outcomes[record['outcome']] = outcomes.get(record['outcome'], 0) + 1
+        if record['source']:
+            sources[record['source']] = sources.get(record['source'], 0) + 1
+
+    stages = {}
+    for stage in ('queue', 'llm', 'graphql'):
+        values = [r[stage] for r in completed if stage in r]
+        stages[stage] = {'p50_ms': ms(percentile(values, 50)), 'p95_ms': ms(percentile(values, 95))}
+
+    server_stages = None
+    if before is not None and after is not None:
+        server_stages = {}
+        for stage, (total, count) in after.items():
+            previous = before.get(stage, (0.0, 0.0))
+            if count - previous[1] > 0:
+                server_stages[stage] = ms((total - previous[0]) / (count - previous[1]))
+
+    summary = {
+        'offered_rate': rate,
+        'sent': len(records),
+        'sent_rate': round(len(records) / args.duration, 2),
+        'throughput': round(len(completed) / elapsed, 2) if elapsed > 0 else 0.0,
+        'error_rate': round(errors / len(records), 4) if records else 0.0,
+        'shed_rate': round(shed / len(records), 4) if records else 0.0,
+        'p50_ms': ms(percentile(totals, 50)),
+        'p95_ms': ms(percentile(totals, 95)),
+        'p99_ms': ms(percentile(totals, 99)),
+        'stages': stages,
+        'server_stages_mean_ms': server_stages,
+        'outcomes': outcomes,
+        'sources': sources
+    }
+
+    reasons = []
+    # Compared with what was actually sent, since Poisson arrivals vary around the rate
+    if summary['throughput'] < 0.9 * summary['sent_rate']:
+        reasons.append('throughput below 90% of arrival rate')
+    if summary['error_rate'] > args.max_error_rate:
+        reasons.append(f"error rate {summary['error_rate']:.1%}")
+    if summary['shed_rate'] > args.max_error_rate:
+        reasons.append(f"shed rate {summary['shed_rate']:.1%}")
+    if args.slo_ms and (summary['p95_ms'] is None or summary['p95_ms'] > args.slo_ms):
+        reasons.append(f"p95 above {args.slo_ms:g} ms")
+    summary['saturated'] = reasons
+    return summary
+
+def print_step(summary):
+    stages = summary['stages']
+    print(f"{summary['offered_rate']:>7g}/s  sent {summary['sent']:>5} ({summary['sent_rate']:.2f}/s)  "
+          f"done {summary['throughput']:>7.2f}/s  errors {summary['error_rate']:>6.1%}  shed {summary['shed_rate']:>6.1%}  "
+          f"p50 {summary['p50_ms']}  p95 {summary['p95_ms']}  p99 {summary['p99_ms']} ms")
+    print(f"          queue p95 {stages['queue']['p95_ms']}  llm p50/p95 {stages['llm']['p50_ms']}/{stages['llm']['p95_ms']}  "
+          f"graphql p50/p95 {stages['graphql']['p50_ms']}/{stages['graphql']['p95_ms']} ms  sources {summary['sources']}")
+    if summary['server_stages_mean_ms']:
+        print(f"          server stage means (ms): {summary['server_stages_mean_ms']}")
+    if set(summary['outcomes']) - {'ok'}:
+        print(f"          outcomes {summary['outcomes']}")
+    if summary['saturated']:
+        print(f"          SATURATED: {', '.join(summary['saturated'])}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Open-loop load test of the chat -> GraphQL path')
+    parser.add_argument('--llm-url', default=LLM_SERVICE_URL)
+    parser.add_argument('--graphql-url', default=GRAPHQL_URL)
+    parser.add_argument('--workload', help='JSONL of recorded prompts (default: synthetic mix)')
+    parser.add_argument('--rates', default='1,2,5,10', help='comma-separated arrival rates (requests/sec), run in order')
+    parser.add_argument('--duration', type=float, default=30, help='seconds per rate')
+    parser.add_argument('--max-inflight', type=int, default=256, help='client threads; more requests wait in the client queue')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request timeout in seconds')
+    parser.add_argument('--deadline-ms', type=float, help='deadline sent with each chat request (default: the service default)')
+    parser.add_argument('--slo-ms', type=float, help='p95 end-to-end latency above which a rate counts as saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--keep-going', action='store_true', help='run every rate even after saturation')
+    parser.add_argument('--execute-mutations', action='store_true', help='also run generated mutations (changes the data)')
+    parser.add_argument('--inline-queries', action='store_true',
+                        help='send the full query text instead of persisted document hashes')
+    parser.add_argument('--token', help='JWT sent to the backend as Authorization: Bearer')
+    parser.add_argument('--mongodb-uri', help='sample IDs from this seeded database')
+    parser.add_argument('--alumni', type=int, default=50, help='seeded alumni count when not sampling a database')
+    parser.add_argument('--events', type=int, default=10, help='seeded event count when not sampling a database')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the per-rate results to this file')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    rates = [float(rate) for rate in args.rates.split(',')]
+    entities = load_entities(args)
+    workload = load_workload(args.workload) if args.workload else None
+    items = workload_items(workload, entities, random.Random(args.seed))
+
+    print(f"LLM service: {args.llm_url}  GraphQL: {args.graphql_url}  "
+          f"workload: {args.workload or 'synthetic'}  {args.duration:g}s per rate")
+    results = []
+    for rate in rates:
+        summary = run_step(rate, items, args)
+        results.append(summary)
+        print_step(summary)
+        if summary['saturated'] and not args.keep_going:
+            break
+
+    healthy = [r['offered_rate'] for r in results if not r['saturated']]
+    saturated = [r['offered_rate'] for r in results if r['saturated']]
+    print(f"\nHighest sustained rate: {max(healthy):g}/s" if healthy else "\nNo rate was sustained")
+    if saturated:
+        print(f"Saturation point: {min(saturated):g}/s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
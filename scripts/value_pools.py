@@ -0,0 +1,101 @@
+from faker import Faker
+import numpy as np
+
+# Sources of the free-text values in generated documents (names, emails,
+# addresses, descriptions). Both providers are created once per worker process
+# and told when a new chunk starts, so the data stays reproducible per chunk.
+
+class FakerValues:
+    """
+    A fresh Faker value for every call (the default)
+    """
+
+    def __init__(self):
+        self.fake = Faker()
+
+    def start_chunk(self, chunk_seed, count):
+        self.fake.seed_instance(chunk_seed)
+
+    def name(self):
+        return self.fake.name()
+
+    def email(self):
+        return self.fake.email()
+
+    def street_address(self):
+        return self.fake.street_address()
+
+    def zipcode(self):
+        return self.fake.zipcode()
+
+    def phone_number(self):
+        return self.fake.phone_number()
+
+    def text(self):
+        return self.fake.text(max_nb_chars=200)
+
+    def token(self):
+        return self.fake.uuid4()[:8]
+
+class PooledValues:
+    """
+    Values sampled from vocabularies that are generated once per process.
+    Faker is by far the slowest part of generation; here each chunk costs one
+    vectorized NumPy draw per field instead of a Faker call per document.
+    Pools are built from the run seed, so every worker has the same ones.
+    Values repeat across documents; Email is made unique by the caller.
+    """
+
+    FIELDS = ('name', 'email', 'street_address', 'zipcode', 'phone_number', 'text')
+
+    def __init__(self, seed, size):
+        fake = Faker()
+        fake.seed_instance(f'{seed}:value-pools')
+        self.pools = {
+            'name': [fake.name() for _ in range(size)],
+            'email': [fake.email() for _ in range(size)],
+            'street_address': [fake.street_address() for _ in range(size)],
+            'zipcode': [fake.zipcode() for _ in range(size)],
+            'phone_number': [fake.phone_number() for _ in range(size)],
+            # Long texts are slow to generate and rarely read
+            'text': [fake.text(max_nb_chars=200) for _ in range(max(1, size // 10))]
+        }
+        self.draws = {}
+
+    def start_chunk(self, chunk_seed, count):
+        # Each document uses every field at most once
+        rng = np.random.default_rng(list(chunk_seed.encode('utf-8')))
+        self.draws = {
+            field: iter(rng.integers(0, len(pool), size=count).tolist())
+            for field, pool in self.pools.items()
+        }
+        self.draws['token'] = iter(rng.integers(0, 2 ** 32, size=count).tolist())
+
+    def _draw(self, field):
+        return self.pools[field][next(self.draws[field])]
+
+    def name(self):
+        return self._draw('name')
+
+    def email(self):
+        return self._draw('email')
+
+    def street_address(self):
+        return self._draw('street_address')
+
+    def zipcode(self):
+        return self._draw('zipcode')
+
+    def phone_number(self):
+        return self._draw('phone_number')
+
+    def text(self):
+        return self._draw('text')
+
+    def token(self):
+        return f"{next(self.draws['token']):08x}"
+
+def create_values(config):
+    if config.get('value_pool_size'):
+        return PooledValues(config['seed'], config['value_pool_size'])
+    return FakerValues()